@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from api.repositories import Repositories
+from api.session import create_session
+
+logger = logging.getLogger(__name__)
+
+# Default number of API calls allowed to be in flight at the same time
+DEFAULT_MAX_CONCURRENCY = 20
+
+
+class AsyncRepositories:
+    """
+    Asyncio counterpart of `Repositories` with the same surface, intended for fanning out
+    operations over many repositories at once.
+
+    Every call is delegated to a `Repositories` instance running in a worker thread, so request
+    building and response handling are shared with the sync client. A semaphore bounds the number
+    of calls in flight, and the underlying pooled session keeps a connection for each of them.
+    """
+
+    def __init__(self, auth, workspace, max_concurrency=DEFAULT_MAX_CONCURRENCY, session=None, base_url=None,
+                 scheduler=None, cache=None, hooks=None):
+        """
+        Initializes the AsyncRepositories object.
+
+        :param auth: Tuple containing the username and app password for authentication.
+        :param workspace: The Bitbucket workspace where the repositories will be created or accessed.
+        :param max_concurrency: Maximum number of API calls executed concurrently.
+        :param session: Optional requests session. When not given, a session whose pool can hold
+                        `max_concurrency` connections is created.
+        :param base_url: Optional API base URL overriding `config.BASE_API_URL`.
+        :param scheduler: Optional `api.scheduler.RequestScheduler`, see `Repositories`.
+        :param cache: Optional `api.cache.ResponseCache`, see `Repositories`.
+        :param hooks: Optional instrumentation hooks, see `Repositories`.
+        """
+        # Only a session created here is closed by `close`, a given one may be shared with other clients
+        self._owns_session = session is None
+        if session is None:
+            session = create_session(pool_maxsize=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.sync = Repositories(auth, workspace, session=session, base_url=base_url, scheduler=scheduler,
+                                 cache=cache, hooks=hooks)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async-repositories")
+        self._semaphore = None
+
+    @property
+    def workspace(self):
+        return self.sync.workspace
+
+    async def _call(self, method, *args):
+        # The semaphore is created lazily, so it is bound to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args))
+
+    async def create_repositories(self, repo_name):
+        """
+        Creates a new repository in the workspace, see `Repositories.create_repositories`.
+        """
+        return await self._call(self.sync.create_repositories, repo_name)
+
+    async def get_repo_details(self, repo_name, fields=None):
+        """
+        Fetches details for a specified repository, see `Repositories.get_repo_details`.
+        """
+        return await self._call(self.sync.get_repo_details, repo_name, fields)
+
+    async def get_branch(self, repo_name, branch_name, fields=None):
+        """
+        Fetches a branch of the repository, see `Repositories.get_branch`.
+        """
+        return await self._call(self.sync.get_branch, repo_name, branch_name, fields)
+
+    async def branch_exist(self, repo_name, branch_name):
+        """
+        Checks if a specific branch exists in the repository, see `Repositories.branch_exist`.
+        """
+        return await self._call(self.sync.branch_exist, repo_name, branch_name)
+
+    async def initialize_main_branch(self, repo_name, commit_name, files):
+        """
+        Initializes the 'main' branch with an initial commit, see `Repositories.initialize_main_branch`.
+        """
+        return await self._call(self.sync.initialize_main_branch, repo_name, commit_name, files)
+
+    async def create_branch(self, repo_name, branch_name):
+        """
+        Creates a new branch from the 'main' branch, see `Repositories.create_branch`.
+        """
+        return await self._call(self.sync.create_branch, repo_name, branch_name)
+
+    async def delete_repository(self, repo_name):
+        """
+        Deletes the specified repository, see `Repositories.delete_repository`.
+        """
+        return await self._call(self.sync.delete_repository, repo_name)
+
+    def close(self):
+        """
+        Shuts down the worker threads, and closes the underlying session and its pooled connections if it was
+        created by this client.
+        """
+        self._executor.shutdown(wait=True)
+        if self._owns_session:
+            self.sync.session.close()
@@ -0,0 +1,53 @@
+"""
+Benchmark of creating and deleting many repositories with `AsyncRepositories` at different concurrency levels.
+
+Runs against the local fake Bitbucket server. The artificial server latency stands in for the network round trip,
+so the wall-clock time should scale with the number of repositories divided by the concurrency:
+
+    python -m api.benchmarks.bench_async_fanout --repos 200 --latency 0.02
+"""
+import argparse
+import asyncio
+import time
+
+from api.async_repositories import AsyncRepositories
+from fake_bitbucket import FakeBitbucketServer
+
+WORKSPACE = "bench"
+
+
+async def fan_out(client, repo_names):
+    """
+    Creates and then deletes every repository concurrently.
+
+    :return: Wall-clock time in seconds.
+    """
+    started = time.perf_counter()
+    await asyncio.gather(*(client.create_repositories(name) for name in repo_names))
+    deleted = await asyncio.gather(*(client.delete_repository(name) for name in repo_names))
+    assert all(deleted), "Not all repositories were deleted"
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=200, help="Number of repositories to create and delete")
+    parser.add_argument("--latency", type=float, default=0.02, help="Artificial server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 20, 50],
+                        help="Concurrency levels to compare")
+    args = parser.parse_args()
+
+    repo_names = [f"bench-repo-{index}" for index in range(args.repos)]
+    with FakeBitbucketServer(latency=args.latency) as server:
+        for concurrency in args.concurrency:
+            client = AsyncRepositories(("bench", "bench"), WORKSPACE, max_concurrency=concurrency,
+                                       base_url=server.api_url)
+            elapsed = asyncio.run(fan_out(client, repo_names))
+            client.close()
+            calls = 2 * len(repo_names)
+            print(f"concurrency={concurrency:<4} repos={len(repo_names):<5} elapsed={elapsed:.3f}s "
+                  f"throughput={calls / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark comparing bytes transferred and parse time of `get_repo_details` with and without a `fields=` projection.
+
+Runs against the local fake Bitbucket server, which returns repository objects shaped like the real ones:
+
+    python -m api.benchmarks.bench_field_projection --calls 500
+"""
+import argparse
+import json
+import time
+
+from api.models import RepositoryInfo
+from api.repositories import Repositories
+from api.session import create_session
+from fake_bitbucket import FakeBitbucketServer
+
+WORKSPACE = "bench"
+REPO_NAME = "bench-repo"
+
+
+def run(client, calls, fields):
+    """
+    Calls `get_repo_details` repeatedly, collecting the raw response bodies through a session hook.
+
+    :return: Tuple of (total bytes received, parse time in seconds, wall-clock time in seconds).
+    """
+    bodies = []
+    client.session.hooks["response"] = [lambda response, *args, **kwargs: bodies.append(response.content)]
+    started = time.perf_counter()
+    for _ in range(calls):
+        client.get_repo_details(REPO_NAME, fields=fields)
+    elapsed = time.perf_counter() - started
+    client.session.hooks["response"] = []
+
+    # Parse the captured bodies again in isolation, so network time does not blur the comparison
+    parse_started = time.perf_counter()
+    for body in bodies:
+        RepositoryInfo(json.loads(body))
+    parse_time = time.perf_counter() - parse_started
+    return sum(len(body) for body in bodies), parse_time, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="Number of API calls per mode")
+    parser.add_argument("--fields", default="name", help="Projection used in the projected mode")
+    args = parser.parse_args()
+
+    with FakeBitbucketServer() as server:
+        auth = ("bench", "bench")
+        Repositories(auth, WORKSPACE, base_url=server.api_url).create_repositories(REPO_NAME)
+
+        for label, fields in (("full", None), ("projected", args.fields)):
+            client = Repositories(auth, WORKSPACE, session=create_session(), base_url=server.api_url)
+            total_bytes, parse_time, elapsed = run(client, args.calls, fields)
+            print(f"{label:<10} calls={args.calls:<6} bytes/call={total_bytes / args.calls:<8.0f} "
+                  f"parse/call={parse_time / args.calls * 1e6:.1f}us "
+                  f"throughput={args.calls / elapsed:.1f} req/s")
+            client.session.close()
+
+
+if __name__ == "__main__":
+    main()
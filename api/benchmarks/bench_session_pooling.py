@@ -0,0 +1,62 @@
+"""
+Benchmark comparing per-call latency and throughput of `Repositories` with and without connection pooling.
+
+Runs against the local fake Bitbucket server, so no credentials or network access are needed:
+
+    python -m api.benchmarks.bench_session_pooling --calls 500
+"""
+import argparse
+import statistics
+import time
+
+from api.repositories import Repositories
+from api.session import create_session
+from fake_bitbucket import FakeBitbucketServer
+
+WORKSPACE = "bench"
+REPO_NAME = "bench-repo"
+
+
+def run(client, calls):
+    """
+    Calls `get_repo_details` repeatedly and measures the latency of each call.
+
+    :return: Tuple of (list of latencies in seconds, total wall-clock time in seconds).
+    """
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        call_started = time.perf_counter()
+        client.get_repo_details(REPO_NAME)
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+
+def report(label, latencies, elapsed, connections):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10} calls={len(latencies):<6} connections={connections:<6} "
+          f"mean={statistics.mean(latencies) * 1000:.3f}ms p50={statistics.median(latencies) * 1000:.3f}ms "
+          f"p95={p95 * 1000:.3f}ms throughput={len(latencies) / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="Number of API calls per mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with FakeBitbucketServer(latency=args.latency) as server:
+        auth = ("bench", "bench")
+        Repositories(auth, WORKSPACE, base_url=server.api_url).create_repositories(REPO_NAME)
+
+        for label, session in (("unpooled", create_session(keep_alive=False)), ("pooled", create_session())):
+            client = Repositories(auth, WORKSPACE, session=session, base_url=server.api_url)
+            connections_before = server.connections
+            latencies, elapsed = run(client, args.calls)
+            report(label, latencies, elapsed, server.connections - connections_before)
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Time to live (in seconds) of cached responses per endpoint
+DEFAULT_TTLS = {
+    "repository": 30.0,
+    "branch": 10.0,
+}
+DEFAULT_TTL = 10.0
+DEFAULT_MAXSIZE = 1024
+
+# Only successful lookups and "not found" answers are worth caching
+CACHEABLE_STATUSES = (200, 404)
+
+
+class CacheEntry:
+    """
+    A cached response together with its expiry time and ETag.
+    """
+    __slots__ = ("response", "etag", "expires_at")
+
+    def __init__(self, response, etag, expires_at):
+        self.response = response
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class CacheStats:
+    """
+    Counters of the response cache, `round_trips_saved` is the number of requests that never left the client.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def round_trips_saved(self):
+        return self.hits
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses + self.revalidations
+        return self.hits / total if total else 0.0
+
+    def snapshot(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "round_trips_saved": self.round_trips_saved,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class ResponseCache:
+    """
+    Opt-in, thread safe read-through cache for read-only `Repositories` calls.
+
+    Entries expire after a per-endpoint TTL and the least recently used entry is evicted once
+    `maxsize` is reached. Expired entries carrying an ETag are revalidated with If-None-Match,
+    so an unchanged resource costs a cheap 304 instead of a full response.
+    """
+
+    def __init__(self, ttls=None, default_ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE, clock=time.monotonic):
+        """
+        :param ttls: Mapping of endpoint name ("repository", "branch") to TTL in seconds, merged with DEFAULT_TTLS.
+        :param default_ttl: TTL of endpoints missing in `ttls`.
+        :param maxsize: Maximum number of cached responses.
+        :param clock: Monotonic clock, replaceable in tests.
+        """
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fetch(self, key, endpoint, send):
+        """
+        Returns the response for `key`, from the cache when it is fresh, otherwise by calling `send`.
+
+        :param key: Tuple whose first element is the repository name, used for invalidation.
+        :param endpoint: Endpoint name selecting the TTL.
+        :param send: Callable taking a dict of extra request headers and returning a requests.Response.
+        :return: The (possibly cached) requests.Response.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.expires_at > self._clock():
+                    self.stats.hits += 1
+                    return entry.response
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        response = send(headers)
+
+        with self._lock:
+            if response.status_code == 304 and entry is not None:
+                self.stats.revalidations += 1
+                entry.expires_at = self._clock() + self.ttls.get(endpoint, self.default_ttl)
+                self._entries[key] = entry
+                return entry.response
+
+            self.stats.misses += 1
+            if response.status_code in CACHEABLE_STATUSES:
+                self._entries[key] = CacheEntry(response, response.headers.get("ETag"),
+                                                self._clock() + self.ttls.get(endpoint, self.default_ttl))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.stats.evictions += 1
+            else:
+                self._entries.pop(key, None)
+        return response
+
+    def invalidate(self, repo_name):
+        """
+        Drops every cached response belonging to the repository.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == repo_name]
+            for key in keys:
+                del self._entries[key]
+            self.stats.invalidations += len(keys)
+        if keys:
+            logger.debug(f"Invalidated {len(keys)} cached responses of '{repo_name}'")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
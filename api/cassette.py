@@ -0,0 +1,328 @@
+import bisect
+import collections
+import datetime
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+DEFAULT_CASSETTE_DIR = "cassettes"
+# Settings of the recording run that replaying needs, e.g. the workspace that is part of every recorded path
+METADATA_FILE = "metadata.json"
+
+# Index entry: SHA-256 of the request, occurrence of the request, offset and length of the compressed record
+INDEX_ENTRY = struct.Struct(">32sIQI")
+INDEX_MAGIC = b"CASSETTE1\n"
+BOUNDARY = re.compile(r"boundary=\"?([^\";]+)\"?")
+# Headers describing the body as sent over the wire, the recorded body is already decoded
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class CassetteMiss(requests.RequestException):
+    """
+    Raised in replay mode for a request that was not recorded. It is not a connection error, so the request
+    scheduler does not retry it: replaying again would miss again.
+    """
+
+
+def _body_bytes(request):
+    """
+    The body of a prepared request as bytes. Streamed bodies (e.g. a `MultipartStream`) are read and replaced
+    by their content, so they can be hashed and still be sent.
+    """
+    body = request.body
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, bytes):
+        return body
+    content = b"".join(iter(lambda: body.read(64 * 1024), b""))
+    request.body = content
+    return content
+
+
+def request_key(request):
+    """
+    Identifies a request independently of the host, the credentials and the multipart boundary:
+    the SHA-256 of the method, the path, the sorted query parameters and the body.
+
+    :param request: The prepared request.
+    :return: The key (32 bytes).
+    """
+    parts = urlsplit(request.url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    body = _body_bytes(request)
+    match = BOUNDARY.search(request.headers.get("Content-Type", ""))
+    if match:
+        # Multipart boundaries are random, they would make every upload unique
+        body = body.replace(match.group(1).encode(), b"boundary")
+    digest = hashlib.sha256(f"{request.method} {parts.path}?{query}\n".encode())
+    digest.update(hashlib.sha256(body).digest())
+    return digest.digest()
+
+
+class Cassette:
+    """
+    On-disk store of recorded responses, made of two files:
+
+    - `<name>.data`: the records, each compressed on its own (zlib), appended as they are recorded.
+    - `<name>.index`: fixed-size entries (request key, occurrence, offset, length) sorted by key and occurrence.
+
+    Replaying memory-maps both files, binary searches the index and only decompresses the records that are
+    requested, so opening a cassette costs the same whatever its size.
+
+    Requests are replayed in the order they were recorded: the n-th identical request gets the n-th recorded
+    response (e.g. a repository before and after its creation), later ones get the last recorded response.
+    """
+
+    def __init__(self, path, mode="replay"):
+        """
+        :param path: Path of the cassette without extension, e.g. "cassettes/api__tests__test_basic".
+        :param mode: "record" truncates the cassette and records into it, "replay" only reads it.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._occurrences = collections.Counter()
+        self._lock = threading.Lock()
+        self._entries = []
+        self._data = None
+        self._index = None
+        self._index_file = None
+        self._records = None
+        self._count = 0
+        if mode == "record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._data = open(f"{path}.data", "wb")
+        else:
+            self._open_index()
+
+    def _open_index(self):
+        try:
+            self._index_file = open(f"{self.path}.index", "rb")
+        except FileNotFoundError:
+            logger.warning(f"Cassette {self.path} does not exist, every request will miss")
+            return
+        size = os.fstat(self._index_file.fileno()).st_size
+        if size <= len(INDEX_MAGIC):
+            return
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{self.path}.index is not a cassette index")
+        self._count = (size - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        with open(f"{self.path}.data", "rb") as data:
+            self._records = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._entries) if self.mode == "record" else self._count
+
+    def next_occurrence(self, key):
+        """
+        :return: How many times the request was seen before in this cassette, counting this time.
+        """
+        with self._lock:
+            self._occurrences[key] += 1
+            return self._occurrences[key]
+
+    def _entry(self, position):
+        offset = len(INDEX_MAGIC) + position * INDEX_ENTRY.size
+        return INDEX_ENTRY.unpack_from(self._index, offset)
+
+    def _search(self, key, occurrence):
+        """
+        Binary search of the index for the entry of (key, occurrence), or the last occurrence of key.
+        """
+        position = bisect.bisect_right(range(self._count), (key, occurrence),
+                                       key=lambda index: self._entry(index)[:2]) - 1
+        if position >= 0:
+            entry = self._entry(position)
+            if entry[0] == key:
+                return entry
+        return None
+
+    def lookup(self, key, occurrence):
+        """
+        :return: The recorded response (a dictionary with "status", "reason", "headers", "url" and "body"),
+                 None if the request was not recorded.
+        """
+        if self._index is None:
+            return None
+        entry = self._search(key, occurrence)
+        if entry is None:
+            return None
+        _, _, offset, length = entry
+        header, _, body = zlib.decompress(self._records[offset:offset + length]).partition(b"\n")
+        record = json.loads(header)
+        record["body"] = body
+        return record
+
+    def append(self, key, occurrence, response):
+        """
+        Records a response, its body is read in full.
+        """
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in WIRE_HEADERS}
+        header = json.dumps({"method": response.request.method, "url": response.url, "status": response.status_code,
+                             "reason": response.reason, "headers": headers}).encode()
+        compressed = zlib.compress(header + b"\n" + response.content)
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(compressed)
+            self._entries.append((key, occurrence, offset, len(compressed)))
+
+    def close(self):
+        """
+        Writes the index of a recorded cassette (atomically), and releases the files.
+        """
+        with self._lock:
+            if self.mode == "record" and self._data is not None and not self._data.closed:
+                self._data.close()
+                if not self._entries:
+                    # Nothing was requested from the API, e.g. a module of hermetic tests
+                    for extension in ("data", "index"):
+                        if os.path.exists(f"{self.path}.{extension}"):
+                            os.remove(f"{self.path}.{extension}")
+                    return
+                temporary = f"{self.path}.index.tmp"
+                with open(temporary, "wb") as index:
+                    index.write(INDEX_MAGIC)
+                    for entry in sorted(self._entries):
+                        index.write(INDEX_ENTRY.pack(*entry))
+                os.replace(temporary, f"{self.path}.index")
+                logger.info(f"Recorded {len(self._entries)} responses into cassette {self.path}")
+            for mapping in (self._index, self._records):
+                if mapping is not None:
+                    mapping.close()
+            self._index = self._records = None
+            for file in (self._index_file, self._data):
+                if file is not None and not file.closed:
+                    file.close()
+
+
+def build_response(request, record):
+    """
+    Builds a `requests.Response` from a recorded response, without touching the network.
+    """
+    response = requests.Response()
+    response.status_code = record["status"]
+    response.reason = record["reason"]
+    response.headers = CaseInsensitiveDict(record["headers"])
+    response.headers["Content-Length"] = str(len(record["body"]))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.raw = io.BytesIO(record["body"])
+    response._content = record["body"]
+    response._content_consumed = True
+    response.elapsed = datetime.timedelta(0)
+    return response
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter recording the responses of a session into the active cassette, or replaying them from it.
+
+    Mount it on the prefix of the API only (see `mount`), so other traffic (e.g. local fake servers started by
+    tests) is unaffected. The active cassette can be switched at any time, e.g. per test module.
+    """
+
+    def __init__(self, mode, wrapped=None):
+        """
+        :param mode: "record" or "replay".
+        :param wrapped: Adapter sending the recorded requests, a pooled `HTTPAdapter` in record mode.
+        """
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.mode = mode
+        self.wrapped = wrapped
+        self.cassette = None
+        self.hits = 0
+        self.misses = 0
+
+    def mount(self, session, prefix):
+        """
+        Mounts the adapter on a session for every URL starting with `prefix`, wrapping the adapter used so far.
+        """
+        if self.wrapped is None:
+            self.wrapped = session.get_adapter(prefix)
+        session.mount(prefix, self)
+        return self
+
+    def use(self, cassette):
+        """
+        Makes a cassette the active one, returning the previous one.
+        """
+        previous, self.cassette = self.cassette, cassette
+        return previous
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        cassette = self.cassette
+        if cassette is None:
+            return self.wrapped.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        key = request_key(request)
+        occurrence = cassette.next_occurrence(key)
+        if self.mode == "replay":
+            record = cassette.lookup(key, occurrence)
+            if record is None:
+                self.misses += 1
+                raise CassetteMiss(f"{request.method} {request.url} is not recorded in {cassette.path}",
+                                   request=request)
+            self.hits += 1
+            return build_response(request, record)
+        response = self.wrapped.send(request, stream=False, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        cassette.append(key, occurrence, response)
+        return response
+
+    def close(self):
+        if self.wrapped is not None:
+            self.wrapped.close()
+
+
+def cassette_path(directory, name):
+    """
+    Path of the cassette of a test module or of another scope, e.g. "api/tests/test_basic.py" becomes
+    "<directory>/api__tests__test_basic".
+    """
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "__", name.removesuffix(".py")).strip("_")
+    return os.path.join(directory, name)
+
+
+def write_metadata(directory, **values):
+    """
+    Saves settings of the recording run next to its cassettes, e.g. `workspace="my-workspace"`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    temporary = os.path.join(directory, f"{METADATA_FILE}.tmp.{os.getpid()}")
+    with open(temporary, "w") as file:
+        json.dump(values, file, indent=2, sort_keys=True)
+    os.replace(temporary, os.path.join(directory, METADATA_FILE))
+
+
+def read_metadata(directory):
+    """
+    :return: The settings saved by `write_metadata`, an empty dictionary if there are none.
+    """
+    try:
+        with open(os.path.join(directory, METADATA_FILE)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
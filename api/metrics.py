@@ -0,0 +1,235 @@
+import bisect
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the latency histogram buckets, the last bucket is unbounded
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestEvent:
+    """
+    Outcome of a single client call, passed to the instrumentation hooks of `Repositories`.
+
+    `retries` counts the extra attempts made by the scheduler, `status` is None (and `error` set)
+    when no response was received at all.
+    """
+    __slots__ = ("method", "endpoint", "url", "status", "elapsed", "bytes_sent", "bytes_received", "retries",
+                 "error")
+
+    def __init__(self, method, endpoint, url, status=None, elapsed=0.0, bytes_sent=0, bytes_received=0, retries=0,
+                 error=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status = status
+        self.elapsed = elapsed
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.retries = retries
+        self.error = error
+
+    def __repr__(self):
+        return (f"RequestEvent({self.method} {self.endpoint} status={self.status} elapsed={self.elapsed:.4f}s "
+                f"sent={self.bytes_sent} received={self.bytes_received} retries={self.retries})")
+
+
+def body_size(body):
+    """
+    Size in bytes of a prepared request body (bytes, str or a sized stream such as `MultipartStream`).
+    """
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def response_size(response):
+    """
+    Size in bytes of a response body as sent over the wire, without decoding it.
+    """
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram, cheap enough to update on every request.
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation inside the bucket containing it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class EndpointMetrics:
+    """
+    Metrics of one (method, endpoint) pair.
+    """
+
+    def __init__(self, buckets):
+        self.latency = LatencyHistogram(buckets)
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.errors = 0
+
+    def snapshot(self):
+        return {
+            "requests": self.latency.count,
+            "latency": self.latency.snapshot(),
+            "statuses": dict(self.statuses),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class ClientMetrics:
+    """
+    Instrumentation hook aggregating per-endpoint latency histograms, transferred bytes, status codes
+    and retries. Pass it to `Repositories(hooks=[metrics])` and export with `to_json` or `to_prometheus`.
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS, prefix="bitbucket_client"):
+        """
+        :param buckets: Upper bounds (in seconds) of the latency histogram buckets.
+        :param prefix: Prefix of the exported Prometheus metric names.
+        """
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        self.record(event)
+
+    def record(self, event):
+        """
+        Adds a RequestEvent to the metrics of its endpoint.
+        """
+        with self._lock:
+            metrics = self._endpoints.get((event.method, event.endpoint))
+            if metrics is None:
+                metrics = self._endpoints[(event.method, event.endpoint)] = EndpointMetrics(self.buckets)
+            metrics.latency.observe(event.elapsed)
+            status = str(event.status) if event.status is not None else "error"
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.bytes_sent += event.bytes_sent
+            metrics.bytes_received += event.bytes_received
+            metrics.retries += event.retries
+            if event.error is not None:
+                metrics.errors += 1
+
+    def endpoint(self, method, endpoint):
+        """
+        Returns the EndpointMetrics of a (method, endpoint) pair, None if it was never called.
+        """
+        with self._lock:
+            return self._endpoints.get((method, endpoint))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """
+        :return: Dictionary keyed by "METHOD endpoint" with the metrics of every endpoint called so far.
+        """
+        with self._lock:
+            return {f"{method} {endpoint}": metrics.snapshot()
+                    for (method, endpoint), metrics in sorted(self._endpoints.items())}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        name = self.prefix
+        lines = [f"# HELP {name}_request_duration_seconds Latency of Bitbucket API calls, including retries.",
+                 f"# TYPE {name}_request_duration_seconds histogram"]
+        requests_lines, sent_lines, received_lines, retries_lines = [], [], [], []
+        with self._lock:
+            for (method, endpoint), metrics in sorted(self._endpoints.items()):
+                histogram = metrics.latency
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_request_duration_seconds_bucket"
+                                 f"{_labels(method=method, endpoint=endpoint, le=bound)} {cumulative}")
+                lines.append(f"{name}_request_duration_seconds_sum{_labels(method=method, endpoint=endpoint)} "
+                             f"{histogram.sum}")
+                lines.append(f"{name}_request_duration_seconds_count{_labels(method=method, endpoint=endpoint)} "
+                             f"{histogram.count}")
+                for status, count in sorted(metrics.statuses.items()):
+                    requests_lines.append(f"{name}_requests_total"
+                                          f"{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+                labels = _labels(method=method, endpoint=endpoint)
+                sent_lines.append(f"{name}_request_bytes_total{labels} {metrics.bytes_sent}")
+                received_lines.append(f"{name}_response_bytes_total{labels} {metrics.bytes_received}")
+                retries_lines.append(f"{name}_retries_total{labels} {metrics.retries}")
+
+        for metric, help_text, metric_lines in (
+                ("requests_total", "Bitbucket API calls by status code.", requests_lines),
+                ("request_bytes_total", "Bytes sent in request bodies.", sent_lines),
+                ("response_bytes_total", "Bytes received in response bodies.", received_lines),
+                ("retries_total", "Attempts repeated by the request scheduler.", retries_lines)):
+            lines += [f"# HELP {name}_{metric} {help_text}", f"# TYPE {name}_{metric} counter"] + metric_lines
+        return "\n".join(lines) + "\n"
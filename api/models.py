@@ -0,0 +1,114 @@
+def _lookup(data, path):
+    for name in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(name)
+    return data
+
+
+class ApiModel:
+    """
+    Lightweight, typed view of a Bitbucket JSON object.
+
+    Only the attributes listed in `FIELDS` are extracted, missing ones (e.g. left out by a `fields=`
+    projection) are None. Item access falls back to the raw JSON, so code written against plain
+    dictionaries keeps working.
+    """
+    __slots__ = ("raw",)
+
+    # Attribute name -> dotted path in the JSON object
+    FIELDS = {}
+
+    def __init__(self, raw):
+        self.raw = raw
+        for attribute, path in self.FIELDS.items():
+            setattr(self, attribute, _lookup(raw, path))
+
+    def __getitem__(self, key):
+        return self.raw[key]
+
+    def __contains__(self, key):
+        return key in self.raw
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.raw == other.raw
+
+    def __repr__(self):
+        attributes = ", ".join(f"{attribute}={getattr(self, attribute)!r}" for attribute in self.FIELDS)
+        return f"{type(self).__name__}({attributes})"
+
+
+class RepositoryInfo(ApiModel):
+    """
+    A Bitbucket repository.
+    """
+    __slots__ = ("name", "slug", "full_name", "uuid", "is_private", "main_branch")
+    FIELDS = {
+        "name": "name",
+        "slug": "slug",
+        "full_name": "full_name",
+        "uuid": "uuid",
+        "is_private": "is_private",
+        "main_branch": "mainbranch.name",
+    }
+
+
+class BranchInfo(ApiModel):
+    """
+    A branch of a Bitbucket repository.
+    """
+    __slots__ = ("name", "target_hash")
+    FIELDS = {
+        "name": "name",
+        "target_hash": "target.hash",
+    }
+
+
+class PullRequestInfo(ApiModel):
+    """
+    A Bitbucket pull request.
+    """
+    __slots__ = ("id", "title", "state", "source_branch", "destination_branch", "author")
+    FIELDS = {
+        "id": "id",
+        "title": "title",
+        "state": "state",
+        "source_branch": "source.branch.name",
+        "destination_branch": "destination.branch.name",
+        "author": "author.display_name",
+    }
+
+
+class CommitInfo(ApiModel):
+    """
+    A commit of a Bitbucket repository.
+    """
+    __slots__ = ("hash", "message", "date", "author")
+    FIELDS = {
+        "hash": "hash",
+        "message": "message",
+        "date": "date",
+        "author": "author.raw",
+    }
+
+
+class DiffStatInfo(ApiModel):
+    """
+    Change summary of one file in a diffstat: its status ("added", "removed", "modified", "renamed")
+    and the number of added and removed lines.
+    """
+    __slots__ = ("status", "old_path", "new_path", "lines_added", "lines_removed")
+    FIELDS = {
+        "status": "status",
+        "old_path": "old.path",
+        "new_path": "new.path",
+        "lines_added": "lines_added",
+        "lines_removed": "lines_removed",
+    }
+
+    @property
+    def path(self):
+        return self.new_path or self.old_path
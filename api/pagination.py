@@ -0,0 +1,54 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Largest page size accepted by the Bitbucket API for most collections
+DEFAULT_PAGELEN = 100
+
+
+def paginated_fields(fields):
+    """
+    Makes sure a `fields=` projection still returns the link to the next page.
+
+    :param fields: Comma separated Bitbucket field projection, or None.
+    :return: The projection including `next`, or None if no projection was requested.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if "next" not in names:
+        names.append("next")
+    return ",".join(names)
+
+
+def iter_paginated(get_page, url, params=None, prefetch=True):
+    """
+    Lazily iterates the values of a paginated Bitbucket collection, following the `next` links.
+
+    Only the current page (and, with `prefetch`, the next one being downloaded in the background)
+    is held in memory, so memory use does not depend on the size of the collection.
+
+    :param get_page: Callable taking (url, params) and returning the decoded JSON page.
+    :param url: URL of the first page.
+    :param params: Query parameters of the first page, the `next` links already carry them.
+    :param prefetch: If True, the next page is requested while the current one is consumed.
+    :return: Generator of the collection values.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") if prefetch else None
+    try:
+        page = get_page(url, params)
+        while True:
+            next_url = page.get("next")
+            prefetched = executor.submit(get_page, next_url, None) if next_url and executor is not None else None
+            logger.debug(f"Page {page.get('page')} with {len(page.get('values', []))} values, next={next_url}")
+
+            yield from page.get("values", [])
+
+            if not next_url:
+                return
+            page = prefetched.result() if prefetched is not None else get_page(next_url, None)
+    finally:
+        if executor is not None:
+            # Do not wait for a prefetch the consumer no longer needs
+            executor.shutdown(wait=False, cancel_futures=True)
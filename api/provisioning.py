@@ -0,0 +1,237 @@
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Kept below the default per-host pool size of the shared session, so no connection is discarded
+DEFAULT_MAX_WORKERS = 16
+
+
+@dataclass
+class PullRequestSpec:
+    """
+    Describes a pull request to open while provisioning a repository.
+
+    :param title: Title of the pull request.
+    :param source: Source branch, created from 'main' by the commit of `files` if it does not exist.
+    :param files: Files committed to the source branch first, in the `Repositories.commit_files` format,
+                  e.g. [("README.md", b"ab")].
+    :param destination: Destination branch.
+    :param approve: If True, the pull request is approved by the provisioning user.
+    """
+    title: str
+    source: str
+    files: list = field(default_factory=list)
+    destination: str = "main"
+    approve: bool = False
+
+
+@dataclass
+class RepositorySpec:
+    """
+    Describes a repository to provision.
+
+    :param name: The name of the repository.
+    :param files: Files for the initial commit on 'main', in the `requests` `files` format.
+                  When empty, the 'main' branch is not initialized.
+    :param branches: Branches to create from 'main' once it exists.
+    :param commit_message: Commit message of the initial commit.
+    :param recreate: If True, an existing repository with the same name is deleted first.
+    :param user_permissions: Mapping of user account id to "read", "write" or "admin".
+    :param group_permissions: Mapping of workspace group slug to "read", "write" or "admin".
+    :param pull_requests: PullRequestSpec objects, opened in order (so their ids are predictable).
+    """
+    name: str
+    files: dict = field(default_factory=dict)
+    branches: list = field(default_factory=list)
+    commit_message: str = "Initial commit to create main"
+    recreate: bool = True
+    user_permissions: dict = field(default_factory=dict)
+    group_permissions: dict = field(default_factory=dict)
+    pull_requests: list = field(default_factory=list)
+
+
+@dataclass
+class ProvisionResult:
+    """
+    Outcome of provisioning or tearing down a single repository.
+
+    :param name: The name of the repository.
+    :param ok: True if every step of the pipeline succeeded.
+    :param step: The last step that was executed (the failing one if `ok` is False).
+    :param error: The exception raised by the failing step, if any.
+    :param elapsed: Time spent on the repository in seconds.
+    :param details: Repository details returned by the API after creation.
+    :param pull_requests: PullRequestInfo of the opened pull requests, in the order of the spec.
+    """
+    name: str
+    ok: bool = True
+    step: str = None
+    error: Exception = None
+    elapsed: float = 0.0
+    details: dict = None
+    pull_requests: list = field(default_factory=list)
+
+
+class ProvisioningReport:
+    """
+    Per-repository results of a bulk operation, in the order the repositories were requested.
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, name):
+        return next(result for result in self.results if result.name == name)
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.ok]
+
+    def summary(self):
+        lines = [f"{len(self.results) - len(self.failures)}/{len(self.results)} repositories succeeded "
+                 f"in {self.elapsed:.2f}s"]
+        lines += [f"  {result.name}: failed at '{result.step}': {result.error!r}" for result in self.failures]
+        return "\n".join(lines)
+
+    def raise_for_failures(self):
+        """
+        Raises an AssertionError listing every failed repository, if there are any.
+        """
+        assert self.ok, self.summary()
+
+
+def _open_pull_requests(client, spec, result):
+    for pull_request in spec.pull_requests:
+        if pull_request.files:
+            client.commit_files(spec.name, pull_request.source, pull_request.files, pull_request.title)
+        info = client.create_pull_request(spec.name, pull_request.title, pull_request.source,
+                                          pull_request.destination)
+        if pull_request.approve:
+            assert client.approve_pull_request(spec.name, info.id), f"Pull request #{info.id} was not approved"
+        result.pull_requests.append(info)
+
+
+def _run_concurrently(steps, result):
+    """
+    Runs independent steps of one repository concurrently. The first failing step is recorded
+    in `result.step` and its exception raised.
+
+    :param steps: List of (step name, callable) tuples.
+    """
+    if len(steps) == 1:
+        result.step, step = steps[0]
+        step()
+        return
+    with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="provisioning-step") as executor:
+        futures = [(name, executor.submit(step)) for name, step in steps]
+    for name, future in futures:
+        if future.exception() is not None:
+            result.step = name
+            raise future.exception()
+
+
+def provision_repository(client, spec):
+    """
+    Runs the dependency chain of a single repository: delete, create, verify, initialize 'main', create branches,
+    then grants permissions and opens pull requests concurrently.
+    Errors are captured in the result instead of being raised.
+
+    :param client: The `Repositories` client.
+    :param spec: The RepositorySpec to provision.
+    :return: The ProvisionResult of the repository.
+    """
+    result = ProvisionResult(spec.name)
+    started = time.perf_counter()
+    try:
+        if spec.recreate:
+            result.step = "delete"
+            client.delete_repository(spec.name)
+
+        result.step = "create"
+        client.create_repositories(spec.name)
+
+        result.step = "details"
+        result.details = client.get_repo_details(spec.name)
+        assert result.details and result.details["name"] == spec.name, f"Repository {spec.name} was not created"
+
+        if spec.files:
+            result.step = "initialize_main_branch"
+            if not client.branch_exist(spec.name, "main"):
+                client.initialize_main_branch(spec.name, spec.commit_message, spec.files)
+
+        for branch_name in spec.branches:
+            result.step = f"create_branch:{branch_name}"
+            client.create_branch(spec.name, branch_name)
+
+        # Permissions and pull requests do not depend on each other, only on the repository and its branches
+        steps = [(f"user_permission:{user}", functools.partial(client.set_user_permission, spec.name, user, permission))
+                 for user, permission in spec.user_permissions.items()]
+        steps += [(f"group_permission:{group}",
+                   functools.partial(client.set_group_permission, spec.name, group, permission))
+                  for group, permission in spec.group_permissions.items()]
+        if spec.pull_requests:
+            steps.append(("pull_requests", functools.partial(_open_pull_requests, client, spec, result)))
+        if steps:
+            _run_concurrently(steps, result)
+    except Exception as e:
+        logger.error(f"Provisioning of '{spec.name}' failed at step '{result.step}': {e!r}")
+        result.ok = False
+        result.error = e
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def teardown_repository(client, name):
+    """
+    Deletes a single repository, capturing errors in the result.
+
+    :param client: The `Repositories` client.
+    :param name: The name of the repository to delete.
+    :return: The ProvisionResult of the repository.
+    """
+    result = ProvisionResult(name, step="delete")
+    started = time.perf_counter()
+    try:
+        result.ok = client.delete_repository(name)
+        if not result.ok:
+            result.error = RuntimeError(f"Repository {name} was not deleted")
+    except Exception as e:
+        logger.error(f"Teardown of '{name}' failed: {e!r}")
+        result.ok = False
+        result.error = e
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_parallel(task, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Runs `task` for every item on a thread pool and collects the results into a report.
+
+    :param task: Callable taking one item and returning a ProvisionResult.
+    :param items: Items to process.
+    :param max_workers: Maximum number of items processed concurrently.
+    :return: ProvisioningReport with the results in the order of `items`.
+    """
+    items = list(items)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items) or 1)),
+                            thread_name_prefix="provisioning") as executor:
+        results = list(executor.map(task, items))
+    report = ProvisioningReport(results, time.perf_counter() - started)
+    logger.info(report.summary())
+    return report
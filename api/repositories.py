@@ -1,11 +1,23 @@
+import functools
 import logging
-
-import requests
+import time
 
 import config
+from api.metrics import RequestEvent, body_size, response_size
+from api.provisioning import (DEFAULT_MAX_WORKERS, RepositorySpec, provision_repository, run_parallel,
+                              teardown_repository)
+from api.models import BranchInfo, CommitInfo, DiffStatInfo, PullRequestInfo, RepositoryInfo
+from api.pagination import DEFAULT_PAGELEN, iter_paginated, paginated_fields
+from api.scheduler import get_shared_scheduler
+from api.session import get_shared_session
+from api.uploads import (DEFAULT_MAX_BYTES_PER_COMMIT, DEFAULT_MAX_FILES_PER_COMMIT, MultipartStream,
+                         UploadProgress, collect_upload_files, iter_commit_batches)
 
 logger = logging.getLogger(__name__)
 
+# Description of the repositories created by the tests, only repositories carrying it are reaped as leaked
+TEST_REPOSITORY_DESCRIPTION = "Test repository of the Bitbucket automation, deleted when leaked"
+
 
 class Repositories:
     """
@@ -14,54 +26,147 @@ class Repositories:
     initializing branches, and deleting repositories.
     """
 
-    # Base URL for the Bitbucket repository API
-    REPO_BASE_URL = f"{config.BASE_API_URL}/repositories"
-
-    def __init__(self, auth, workspace):
+    def __init__(self, auth, workspace, session=None, base_url=None, scheduler=None, cache=None, hooks=None):
         """
         Initializes the Repositories object with authentication credentials and workspace.
 
         :param auth: Tuple containing the username and app password for authentication.
         :param workspace: The Bitbucket workspace where the repository will be created or accessed.
+        :param session: Optional requests session (see `api.session.create_session`). When not given,
+                        the process wide pooled session is used, so connections are shared between clients.
+        :param base_url: Optional API base URL overriding `config.BASE_API_URL` (e.g. a local stub server).
+        :param scheduler: Optional `api.scheduler.RequestScheduler` handling rate limiting and retries.
+                          When not given, the process wide scheduler is used.
+        :param cache: Optional `api.cache.ResponseCache` enabling read-through caching of
+                      `get_repo_details` and `branch_exist`. Disabled by default.
+        :param hooks: Optional callables receiving an `api.metrics.RequestEvent` after every request,
+                      e.g. an `api.metrics.ClientMetrics` collecting latency histograms and counters.
         """
         self.workspace = workspace
         self.auth = auth
+        self.session = session if session is not None else get_shared_session()
+        self.scheduler = scheduler if scheduler is not None else get_shared_scheduler()
+        self.cache = cache
+        self.hooks = list(hooks or [])
+        # Resolved per instance, so a `config.BASE_API_URL` changed after import (e.g. to a fake server) is honoured
+        self.API_BASE_URL = base_url or config.BASE_API_URL
+        self.REPO_BASE_URL = f"{self.API_BASE_URL}/repositories"
         super().__init__()
 
-    def create_repositories(self, repo_name):
+    def add_hook(self, hook):
+        """
+        Registers an instrumentation hook, called with an `api.metrics.RequestEvent` after every request.
+        """
+        self.hooks.append(hook)
+
+    def _request(self, method, url, endpoint="other", **kwargs):
+        """
+        Sends a request through the scheduler and the pooled session using the client credentials.
+        Throttled (429) and failed requests are retried by the scheduler before the response is returned.
+
+        :param method: HTTP method.
+        :param url: Full request URL.
+        :param endpoint: Endpoint name reported to the instrumentation hooks.
+        :return: The requests.Response object.
+        """
+        if not self.hooks:
+            return self.scheduler.send(self.session, method, url, workspace=self.workspace, auth=self.auth, **kwargs)
+
+        event = RequestEvent(method, endpoint, url)
+        started = time.perf_counter()
+        try:
+            response = self.scheduler.send(self.session, method, url, workspace=self.workspace, auth=self.auth,
+                                           **kwargs)
+        except Exception as e:
+            event.elapsed = time.perf_counter() - started
+            event.error = e
+            self._notify(event)
+            raise
+        event.elapsed = time.perf_counter() - started
+        event.status = response.status_code
+        event.bytes_sent = body_size(response.request.body)
+        # The body of a streamed response is read later by the caller
+        event.bytes_received = 0 if kwargs.get("stream") else response_size(response)
+        event.retries = getattr(response, "retries", 0)
+        self._notify(event)
+        return response
+
+    def _notify(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                # Instrumentation must never fail the request itself
+                logger.warning(f"Instrumentation hook {hook!r} failed: {e!r}")
+
+    @staticmethod
+    def _log_response(response, prefix="Response"):
+        """
+        Logs the status and body of a response. The body is only decoded when DEBUG logging is enabled.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{prefix}: {response.status_code} - {response.text}")
+
+    def _cached_get(self, endpoint, repo_name, url, params=None):
+        """
+        Sends a GET request, served from the response cache when one is configured.
+
+        :param endpoint: Endpoint name selecting the cache TTL, also reported to the instrumentation hooks.
+        :param repo_name: The repository the resource belongs to, used for invalidation.
+        :param url: Full request URL.
+        :param params: Optional query parameters, part of the cache key.
+        :return: The requests.Response object.
+        """
+        if self.cache is None:
+            return self._request("GET", url, endpoint, params=params)
+        key = (repo_name, endpoint, url, tuple(sorted((params or {}).items())))
+        return self.cache.fetch(key, endpoint, lambda headers: self._request("GET", url, endpoint, params=params,
+                                                                             headers=headers))
+
+    def _invalidate(self, repo_name):
+        if self.cache is not None:
+            self.cache.invalidate(repo_name)
+
+    def create_repositories(self, repo_name, description=TEST_REPOSITORY_DESCRIPTION):
         """
         Creates a new repository in the specified workspace.
 
         :param repo_name: The name of the repository to be created.
+        :param description: The description of the repository. The default one marks it as created by the tests,
+                            see `ResourceLeases.reap_stale`.
         """
         url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}"
 
         # I do not define project so it is assigned to last used one
         payload = {
             "scm": "git",
-            "is_private": True
+            "is_private": True,
+            "description": description
         }
 
         logger.info(f"Creating repository using url: {url}")
-        response = requests.post(url, json=payload, auth=self.auth)
-        logger.debug(f"Response: {response.status_code} - {response.text}")
+        response = self._request("POST", url, "repository", json=payload)
+        self._invalidate(repo_name)
+        self._log_response(response)
         assert response.status_code in [200, 201], f"Failed to create repo: {response.text}"
         assert response.json().get("name") == repo_name
 
-    def get_repo_details(self, repo_name):
+    def get_repo_details(self, repo_name, fields=None):
         """
         Fetches details for a specified repository.
 
         :param repo_name: The name of the repository to fetch details for.
-        :return: The JSON response containing repository details.
+        :param fields: Optional field projection (Bitbucket `fields=`), e.g. "name,mainbranch.name".
+                       Only the requested fields are transferred and parsed.
+        :return: RepositoryInfo with the repository details (the raw JSON is available through item access).
         """
         url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}"
 
         logger.info(f"Fetching repository details: {repo_name}")
-        response = requests.get(url, auth=self.auth)
+        response = self._cached_get("repository", repo_name, url, {"fields": fields} if fields else None)
 
         if response.status_code == 200:
-            return response.json()
+            return RepositoryInfo(response.json())
         elif response.status_code == 403:
             logger.warning(f"Repository access denied. response={response.text}")
         elif response.status_code == 404:
@@ -70,28 +175,39 @@ class Repositories:
         # All other codes are unexpected, so I want to raise exception
         response.raise_for_status()
 
-    def branch_exist(self, repo_name, branch_name):
+    def get_branch(self, repo_name, branch_name, fields=None):
         """
-        Checks if a specific branch exists in the repository.
+        Fetches a branch of the repository.
 
         :param repo_name: The name of the repository.
-        :param branch_name: The name of the branch to check.
-        :return: True if the branch exists, False if it does not.
+        :param branch_name: The name of the branch.
+        :param fields: Optional field projection (Bitbucket `fields=`), e.g. "name,target.hash".
+        :return: BranchInfo of the branch, None if it does not exist.
         """
         url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/refs/branches/{branch_name}"
         logger.debug(f"GET Request URL: {url}")
-        response = requests.get(url, auth=self.auth)
-        logger.debug(f"Response Status: {response.status_code}")
-        logger.debug(f"Response Body: {response.text}")
+        response = self._cached_get("branch", repo_name, url, {"fields": fields} if fields else None)
+        self._log_response(response)
 
         if response.status_code == 200:
-            return True
+            return BranchInfo(response.json())
         elif response.status_code == 404:
-            return False
+            return None
 
         # All other codes are unexpected, so I want to raise exception
         response.raise_for_status()
 
+    def branch_exist(self, repo_name, branch_name):
+        """
+        Checks if a specific branch exists in the repository.
+
+        :param repo_name: The name of the repository.
+        :param branch_name: The name of the branch to check.
+        :return: True if the branch exists, False if it does not.
+        """
+        # Only the status matters, so the smallest possible projection is requested
+        return self.get_branch(repo_name, branch_name, fields="name") is not None
+
     def initialize_main_branch(self, repo_name, commit_name, files):
         """
         Initializes the 'main' branch in the repository with an initial commit.
@@ -110,10 +226,11 @@ class Repositories:
         logger.debug(f"POST Request URL: {url}")
         logger.debug(f"Payload: {payload}")
 
-        response = requests.post(url, auth=self.auth, data=payload, files=files)
+        response = self._request("POST", url, "src", data=payload, files=files)
+        self._invalidate(repo_name)
 
         logger.info(f"Response Status: {response.status_code}")
-        logger.debug(f"Response Body: {response.text}")
+        self._log_response(response)
 
         if response.status_code == 201:
             logger.info("Successfully initialized 'main' branch with initial commit.")
@@ -121,6 +238,65 @@ class Repositories:
             logger.error(f"Failed to initialize 'main' branch: {response.text}")
             response.raise_for_status()
 
+    def commit_files(self, repo_name, branch_name, paths_or_iterable, message,
+                     max_files_per_commit=DEFAULT_MAX_FILES_PER_COMMIT,
+                     max_bytes_per_commit=DEFAULT_MAX_BYTES_PER_COMMIT, progress=None):
+        """
+        Commits files to a branch through the /src endpoint, streaming file bodies from disk.
+
+        File contents are never loaded into memory as a whole: each commit request body is a
+        multipart stream read in chunks while it is sent. Trees exceeding the per-commit limits are
+        split into several commits, each chained onto the previous one.
+
+        :param repo_name: The name of the repository.
+        :param branch_name: The branch to commit to (it is created if it does not exist).
+        :param paths_or_iterable: A directory, an iterable of local file paths, or an iterable of
+                                  (repo_path, local_path_or_bytes) tuples.
+        :param message: The commit message, suffixed with the part number when the tree is split.
+        :param max_files_per_commit: Maximum number of files in a single commit.
+        :param max_bytes_per_commit: Maximum total file size of a single commit.
+        :param progress: Optional callback receiving an `api.uploads.UploadProgress` as data is sent.
+        :return: List of the created commit hashes, oldest first.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/src"
+        batches = list(iter_commit_batches(collect_upload_files(paths_or_iterable),
+                                           max_files_per_commit, max_bytes_per_commit))
+        state = UploadProgress(total_files=sum(len(batch) for batch in batches))
+
+        def on_read(size):
+            state.bytes_sent += size
+            if progress is not None:
+                progress(state)
+
+        commits = []
+        for index, batch in enumerate(batches, start=1):
+            commit_message = message if len(batches) == 1 else f"{message} ({index}/{len(batches)})"
+            fields = [("message", commit_message), ("branch", branch_name)]
+            if commits:
+                fields.append(("parents", commits[-1]))
+            body = MultipartStream(fields, batch, on_read=on_read)
+
+            logger.info(f"Committing {len(batch)} files ({len(body)} bytes) to '{branch_name}' "
+                        f"[{index}/{len(batches)}]")
+            try:
+                response = self._request("POST", url, "src", data=body, headers={"Content-Type": body.content_type})
+            finally:
+                body.close()
+            self._invalidate(repo_name)
+
+            if response.status_code != 201:
+                logger.error(f"Failed to commit files to '{branch_name}': {response.text}")
+                response.raise_for_status()
+            commits.append(response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1])
+            state.commits += 1
+            state.files_committed += len(batch)
+            if progress is not None:
+                progress(state)
+
+        logger.info(f"Committed {state.files_committed} files in {state.commits} commits, "
+                    f"{state.bytes_sent / 1024 / 1024:.2f} MiB at {state.throughput / 1024 / 1024:.2f} MiB/s")
+        return commits
+
     def create_branch(self, repo_name, branch_name):
         """
         Creates a new branch in the repository from the 'main' branch.
@@ -134,10 +310,10 @@ class Repositories:
         logger.debug(f"POST Request URL: {url}")
         logger.debug(f"Payload: {payload}")
 
-        response = requests.post(url, json=payload, auth=self.auth)
+        response = self._request("POST", url, "branches", json=payload)
+        self._invalidate(repo_name)
 
-        logger.debug(f"Response Status: {response.status_code}")
-        logger.debug(f"Response Body: {response.text}")
+        self._log_response(response)
 
         if response.status_code == 201:
             logger.info(f"Successfully created the '{branch_name}' branch from 'main'.")
@@ -154,7 +330,339 @@ class Repositories:
         """
         url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/"
         logger.info(f"Deleting repository: {repo_name}")
-        response = requests.delete(url, auth=self.auth)
+        response = self._request("DELETE", url, "repository")
+        self._invalidate(repo_name)
+
+        self._log_response(response)
+        return response.status_code == 204
+
+    def get_file(self, repo_name, path, revision="main"):
+        """
+        Reads the raw content of a file.
+
+        :param repo_name: The name of the repository.
+        :param path: Path of the file in the repository.
+        :param revision: Branch name or commit hash to read the file at.
+        :return: The file content as bytes, None if the file does not exist.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/src/{revision}/{path}"
+        logger.info(f"Reading '{path}' at '{revision}' of {repo_name}")
+        response = self._request("GET", url, "src")
+
+        if response.status_code == 200:
+            return response.content
+        elif response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+    def get_commit(self, repo_name, revision, fields=None):
+        """
+        Fetches a commit. The response is never cached, so it can be polled until a pushed commit shows up.
+
+        :param repo_name: The name of the repository.
+        :param revision: Commit hash or branch name.
+        :param fields: Optional field projection (Bitbucket `fields=`), e.g. "hash,date".
+        :return: CommitInfo of the commit, None if it does not exist (yet).
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/commit/{revision}"
+        response = self._request("GET", url, "commit", params={"fields": fields} if fields else None)
+        self._log_response(response)
+
+        if response.status_code == 200:
+            return CommitInfo(response.json())
+        elif response.status_code == 404:
+            return None
+        response.raise_for_status()
 
-        logger.debug(f"Response: {response.status_code} - {response.text}")
+    def iter_diffstat(self, repo_name, spec, fields=None, pagelen=DEFAULT_PAGELEN, prefetch=True):
+        """
+        Lazily iterates the per-file change summary of a commit (against its parent) or of a `from..to` range.
+        Much cheaper than the diff itself, as no file content is transferred.
+
+        :param repo_name: The name of the repository.
+        :param spec: A commit hash, or two revisions separated by "..".
+        :param fields: Optional field projection (`fields=`), e.g. "values.status,values.new.path".
+        :param pagelen: Number of files requested per page.
+        :param prefetch: If True, the next page is downloaded in the background.
+        :return: Generator of DiffStatInfo objects.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/diffstat/{spec}"
+        return self._iter_collection("diffstat", DiffStatInfo, url, None, fields, pagelen, prefetch)
+
+    def _permission_url(self, repo_name, kind, subject):
+        return f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/permissions-config/{kind}/{subject}"
+
+    def _set_permission(self, repo_name, kind, subject, permission):
+        url = self._permission_url(repo_name, kind, subject)
+        logger.info(f"Granting '{permission}' on {repo_name} to {kind[:-1]} {subject}")
+        response = self._request("PUT", url, "permissions", json={"permission": permission})
+        self._log_response(response)
+        if response.status_code not in [200, 201]:
+            logger.error(f"Failed to grant '{permission}' to {subject}: {response.text}")
+            response.raise_for_status()
+
+    def _remove_permission(self, repo_name, kind, subject):
+        url = self._permission_url(repo_name, kind, subject)
+        logger.info(f"Removing the permission of {kind[:-1]} {subject} on {repo_name}")
+        response = self._request("DELETE", url, "permissions")
+        self._log_response(response)
         return response.status_code == 204
+
+    def set_user_permission(self, repo_name, user_id, permission):
+        """
+        Grants a user an explicit permission on the repository, replacing the previous one.
+
+        :param repo_name: The name of the repository.
+        :param user_id: Account id or UUID of the user (see `find_workspace_member`).
+        :param permission: "read", "write" or "admin".
+        """
+        self._set_permission(repo_name, "users", user_id, permission)
+
+    def get_user_permission(self, repo_name, user_id):
+        """
+        Fetches the explicit permission of a user on the repository.
+
+        :param repo_name: The name of the repository.
+        :param user_id: Account id or UUID of the user.
+        :return: "read", "write" or "admin", None if the user has no explicit permission.
+        """
+        response = self._request("GET", self._permission_url(repo_name, "users", user_id), "permissions")
+        self._log_response(response)
+        if response.status_code == 200:
+            return response.json().get("permission")
+        elif response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+    def remove_user_permission(self, repo_name, user_id):
+        """
+        Removes the explicit permission of a user on the repository.
+
+        :return: True if the permission was removed, False otherwise.
+        """
+        return self._remove_permission(repo_name, "users", user_id)
+
+    def set_group_permission(self, repo_name, group_slug, permission):
+        """
+        Grants a workspace group an explicit permission on the repository, replacing the previous one.
+
+        :param repo_name: The name of the repository.
+        :param group_slug: Slug of the group.
+        :param permission: "read", "write" or "admin".
+        """
+        self._set_permission(repo_name, "groups", group_slug, permission)
+
+    def remove_group_permission(self, repo_name, group_slug):
+        """
+        Removes the explicit permission of a workspace group on the repository.
+
+        :return: True if the permission was removed, False otherwise.
+        """
+        return self._remove_permission(repo_name, "groups", group_slug)
+
+    def find_workspace_member(self, name):
+        """
+        Looks up a member of the workspace by nickname, display name or account id.
+
+        :param name: Nickname, display name or account id of the user.
+        :return: The account id of the user, None if no member matches.
+        """
+        url = f"{self.API_BASE_URL}/workspaces/{self.workspace}/members"
+        for membership in iter_paginated(functools.partial(self._get_page, "members"), url,
+                                         {"pagelen": DEFAULT_PAGELEN}, prefetch=False):
+            user = membership.get("user", {})
+            if name in (user.get("nickname"), user.get("display_name"), user.get("account_id"), user.get("uuid")):
+                return user.get("account_id")
+        return None
+
+    def create_pull_request(self, repo_name, title, source_branch, destination_branch="main", description=""):
+        """
+        Opens a pull request.
+
+        :param repo_name: The name of the repository.
+        :param title: Title of the pull request.
+        :param source_branch: Branch with the changes.
+        :param destination_branch: Branch the changes are merged into.
+        :param description: Optional description of the pull request.
+        :return: PullRequestInfo of the created pull request.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/pullrequests"
+        payload = {
+            "title": title,
+            "description": description,
+            "source": {"branch": {"name": source_branch}},
+            "destination": {"branch": {"name": destination_branch}},
+        }
+        logger.info(f"Creating pull request '{title}' from '{source_branch}' to '{destination_branch}'")
+        response = self._request("POST", url, "pullrequests", json=payload)
+        self._log_response(response)
+        if response.status_code != 201:
+            logger.error(f"Failed to create pull request: {response.text}")
+            response.raise_for_status()
+        return PullRequestInfo(response.json())
+
+    def stream_diff(self, repo_name, spec, chunk_size=64 * 1024):
+        """
+        Downloads the unified diff of a commit (against its parent) or of a `from..to` range in chunks,
+        so large diffs are never held in memory. Parse it with `git_operations.diff_parser`.
+
+        :param repo_name: The name of the repository.
+        :param spec: A commit hash, or two revisions separated by "..".
+        :param chunk_size: Size in bytes of the chunks.
+        :return: Generator of byte chunks of the diff.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/diff/{spec}"
+        logger.info(f"Streaming diff {spec} of {repo_name}")
+        response = self._request("GET", url, "diff", stream=True)
+        with response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size)
+
+    def get_pull_request(self, repo_name, pr_id):
+        """
+        Fetches a pull request.
+
+        :return: PullRequestInfo of the pull request, None if it does not exist.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/pullrequests/{pr_id}"
+        response = self._request("GET", url, "pullrequest")
+        self._log_response(response)
+        if response.status_code == 200:
+            return PullRequestInfo(response.json())
+        elif response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+    def approve_pull_request(self, repo_name, pr_id):
+        """
+        Approves a pull request as the authenticated user.
+
+        :return: True if the pull request was approved.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/pullrequests/{pr_id}/approve"
+        logger.info(f"Approving pull request #{pr_id}")
+        response = self._request("POST", url, "pullrequest_approve")
+        self._log_response(response)
+        return response.status_code == 200
+
+    def merge_pull_request(self, repo_name, pr_id, merge_strategy="merge_commit", message=None):
+        """
+        Merges a pull request.
+
+        :param repo_name: The name of the repository.
+        :param pr_id: The ID of the pull request.
+        :param merge_strategy: "merge_commit", "squash" or "fast_forward".
+        :param message: Optional message of the merge commit.
+        :return: PullRequestInfo of the merged pull request.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/pullrequests/{pr_id}/merge"
+        payload = {"type": "pullrequest", "merge_strategy": merge_strategy}
+        if message:
+            payload["message"] = message
+        logger.info(f"Merging pull request #{pr_id}")
+        response = self._request("POST", url, "pullrequest_merge", json=payload)
+        self._log_response(response)
+        if response.status_code != 200:
+            logger.error(f"Failed to merge pull request #{pr_id}: {response.text}")
+            response.raise_for_status()
+        self._invalidate(repo_name)
+        return PullRequestInfo(response.json())
+
+    def _get_page(self, endpoint, url, params):
+        response = self._request("GET", url, endpoint, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def _iter_collection(self, endpoint, model, url, query=None, fields=None, pagelen=DEFAULT_PAGELEN, prefetch=True,
+                         **params):
+        params = {name: value for name, value in params.items() if value is not None}
+        params["pagelen"] = pagelen
+        if query:
+            params["q"] = query
+        if fields:
+            params["fields"] = paginated_fields(fields)
+        logger.info(f"Iterating {url} with params={params}")
+        get_page = functools.partial(self._get_page, endpoint)
+        return (model(value) for value in iter_paginated(get_page, url, params, prefetch=prefetch))
+
+    def iter_repositories(self, query=None, fields=None, sort=None, pagelen=DEFAULT_PAGELEN, prefetch=True):
+        """
+        Lazily iterates the repositories of the workspace, page by page.
+
+        :param query: Optional Bitbucket filter (`q=`), e.g. 'name ~ "test-"'.
+        :param fields: Optional field projection (`fields=`), e.g. "values.name,values.slug".
+        :param sort: Optional sort field, e.g. "-updated_on".
+        :param pagelen: Number of repositories requested per page.
+        :param prefetch: If True, the next page is downloaded in the background.
+        :return: Generator of RepositoryInfo objects.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}"
+        return self._iter_collection("repositories", RepositoryInfo, url, query, fields, pagelen, prefetch, sort=sort)
+
+    def iter_branches(self, repo_name, query=None, fields=None, sort=None, pagelen=DEFAULT_PAGELEN, prefetch=True):
+        """
+        Lazily iterates the branches of a repository, page by page.
+
+        :param repo_name: The name of the repository.
+        :param query: Optional Bitbucket filter (`q=`), e.g. 'name ~ "feature/"'.
+        :param fields: Optional field projection (`fields=`), e.g. "values.name".
+        :param sort: Optional sort field, e.g. "-target.date".
+        :param pagelen: Number of branches requested per page.
+        :param prefetch: If True, the next page is downloaded in the background.
+        :return: Generator of BranchInfo objects.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/refs/branches"
+        return self._iter_collection("branches", BranchInfo, url, query, fields, pagelen, prefetch, sort=sort)
+
+    def iter_pull_requests(self, repo_name, state=None, query=None, fields=None, pagelen=50, prefetch=True):
+        """
+        Lazily iterates the pull requests of a repository, page by page.
+
+        :param repo_name: The name of the repository.
+        :param state: Optional state filter ("OPEN", "MERGED", "DECLINED", "SUPERSEDED"), Bitbucket returns
+                      only open pull requests when not given.
+        :param query: Optional Bitbucket filter (`q=`), e.g. 'author.nickname = "bot"'.
+        :param fields: Optional field projection (`fields=`), e.g. "values.id,values.title".
+        :param pagelen: Number of pull requests requested per page (Bitbucket allows at most 50).
+        :param prefetch: If True, the next page is downloaded in the background.
+        :return: Generator of PullRequestInfo objects.
+        """
+        url = f"{self.REPO_BASE_URL}/{self.workspace}/{repo_name}/pullrequests"
+        return self._iter_collection("pullrequests", PullRequestInfo, url, query, fields, pagelen, prefetch,
+                                     state=state)
+
+    def find_pull_request_id(self, repo_name, source_branch, state="OPEN"):
+        """
+        Finds the pull request opened from a branch, so tests do not have to assume pull request ids.
+
+        :param repo_name: The name of the repository.
+        :param source_branch: The source branch of the pull request.
+        :param state: State of the pull request.
+        :return: The id of the most recent matching pull request, None if there is none.
+        """
+        pull_requests = self.iter_pull_requests(repo_name, state=state, query=f'source.branch.name = "{source_branch}"',
+                                                fields="values.id", prefetch=False)
+        return max((pull_request.id for pull_request in pull_requests), default=None)
+
+    def provision_many(self, specs, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Provisions many repositories in parallel. Each repository runs its own dependency chain
+        (delete, create, verify, initialize 'main', create branches) as a pipeline on a thread pool,
+        so a failure in one repository does not stop the others.
+
+        :param specs: Iterable of `RepositorySpec` objects or plain repository names.
+        :param max_workers: Maximum number of repositories provisioned concurrently.
+        :return: ProvisioningReport with a result (and error, if any) per repository.
+        """
+        specs = [spec if isinstance(spec, RepositorySpec) else RepositorySpec(spec) for spec in specs]
+        return run_parallel(lambda spec: provision_repository(self, spec), specs, max_workers)
+
+    def teardown_many(self, repo_names, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Deletes many repositories in parallel.
+
+        :param repo_names: Iterable of repository names.
+        :param max_workers: Maximum number of repositories deleted concurrently.
+        :return: ProvisioningReport with a result (and error, if any) per repository.
+        """
+        return run_parallel(lambda name: teardown_repository(self, name), repo_names, max_workers)
@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from api.provisioning import DEFAULT_MAX_WORKERS
+from api.repositories import TEST_REPOSITORY_DESCRIPTION
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every repository created by the tests, so leaked ones can be found and reaped
+DEFAULT_PREFIX = "qa"
+DEFAULT_TMP_ROOT = ".tmp"
+# Repositories of other runs are only reaped once they are this old, so concurrent runs are left alone
+DEFAULT_STALE_AGE = timedelta(hours=6)
+
+# Bitbucket repository slugs only keep lowercase letters, digits, dashes, underscores and dots
+INVALID_NAME_CHARACTERS = re.compile(r"[^a-z0-9_.-]+")
+# Length of the run ids in repository names, so leaked repositories can be told apart from other ones
+RUN_ID_LENGTH = 8
+
+
+def _sanitize(value):
+    return INVALID_NAME_CHARACTERS.sub("-", value.lower()).strip("-")
+
+
+class ResourceLeases:
+    """
+    Hands out test resources (repository names, local directories) that are unique per test run and
+    per pytest-xdist worker, and keeps track of them so they can be cleaned up in bulk at the end.
+
+    Repository names look like `qa-<run>-<worker>-<name>`: workers never collide, and repositories
+    leaked by crashed runs can be recognized by their prefix.
+    """
+
+    def __init__(self, run_id=None, worker_id=None, prefix=DEFAULT_PREFIX, tmp_root=DEFAULT_TMP_ROOT):
+        """
+        :param run_id: Identifier shared by all workers of a run, `PYTEST_XDIST_TESTRUNUID` (or random) if None.
+                       Its first 8 letters and digits are used.
+        :param worker_id: Identifier of this worker, `PYTEST_XDIST_WORKER` (or "main") if None.
+        :param prefix: Prefix of the repository names.
+        :param tmp_root: Directory under which the local directories are created.
+        """
+        run_id = run_id or os.getenv("PYTEST_XDIST_TESTRUNUID") or uuid.uuid4().hex
+        self.run_id = re.sub(r"[^a-z0-9]", "", run_id.lower())[:RUN_ID_LENGTH]
+        if len(self.run_id) != RUN_ID_LENGTH:
+            raise ValueError(f"The run id {run_id!r} has less than {RUN_ID_LENGTH} letters and digits")
+        self.worker_id = _sanitize(worker_id or os.getenv("PYTEST_XDIST_WORKER") or "main")
+        self.prefix = prefix
+        self.tmp_root = tmp_root
+        self.repositories = []
+        self.directories = []
+        self.pull_requests = {}
+        self._lock = threading.Lock()
+
+    @property
+    def namespace(self):
+        return f"{self.prefix}-{self.run_id}-{self.worker_id}"
+
+    def repo_name(self, name):
+        """
+        Leases a repository name unique to this run and worker. Leasing the same name twice returns the same
+        repository name, e.g. for the setup and the assertions of one test.
+
+        :param name: Readable name of the repository, e.g. "ui-test-permissions".
+        :return: The namespaced repository name.
+        """
+        repo_name = f"{self.namespace}-{_sanitize(name)}"
+        with self._lock:
+            if repo_name not in self.repositories:
+                self.repositories.append(repo_name)
+        return repo_name
+
+    def release(self, repo_name):
+        """
+        Forgets a leased repository, e.g. because the test already deleted it.
+        """
+        with self._lock:
+            if repo_name in self.repositories:
+                self.repositories.remove(repo_name)
+            self.pull_requests.pop(repo_name, None)
+
+    def temp_dir(self, name):
+        """
+        Leases an empty local directory unique to this run and worker. An existing directory is emptied first.
+
+        :param name: Readable name of the directory, e.g. "git_test_repo".
+        :return: The path of the directory.
+        """
+        path = os.path.join(self.tmp_root, self.namespace, _sanitize(name))
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        with self._lock:
+            if path not in self.directories:
+                self.directories.append(path)
+        return path
+
+    def track_pull_request(self, repo_name, pull_request_id):
+        """
+        Records a pull request opened by a test, so tests do not assume pull request ids.
+
+        :return: The pull request id.
+        """
+        with self._lock:
+            self.pull_requests.setdefault(repo_name, []).append(pull_request_id)
+        return pull_request_id
+
+    def reap(self, client, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Deletes every repository and local directory still leased, in parallel.
+
+        :param client: The `Repositories` client used to delete the repositories.
+        :param max_workers: Maximum number of repositories deleted concurrently.
+        :return: ProvisioningReport of the deleted repositories, None if there were none.
+        """
+        with self._lock:
+            repositories, self.repositories = self.repositories, []
+            directories, self.directories = self.directories, []
+            self.pull_requests.clear()
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+        if directories:
+            # The directory of the namespace may be shared, e.g. by the workers recording cassettes
+            try:
+                os.rmdir(os.path.join(self.tmp_root, self.namespace))
+            except OSError:
+                pass
+        if not repositories:
+            return None
+        report = client.teardown_many(repositories, max_workers=max_workers)
+        logger.info(f"Reaped test repositories: {report.summary()}")
+        return report
+
+    @property
+    def is_first_worker(self):
+        """
+        True for the process that cleans up after earlier runs: the only one, or the first pytest-xdist worker.
+        """
+        return self.worker_id in ("main", "gw0")
+
+    def reap_stale(self, client, max_age=DEFAULT_STALE_AGE, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Deletes repositories leaked by earlier runs (e.g. killed ones), i.e. repositories that belong to another
+        run and were not updated for `max_age`. Only repositories created by the tests are considered: their name
+        must be `<prefix>-<run>-<worker>-<name>` with an 8 character run id and a "main" or "gw<n>" worker, and
+        their description the one `Repositories.create_repositories` gives them.
+
+        :param client: The `Repositories` client used to find and delete the repositories.
+        :param max_age: Minimum age (a timedelta) of the repositories to delete.
+        :param max_workers: Maximum number of repositories deleted concurrently.
+        :return: ProvisioningReport of the deleted repositories, None if there were none.
+        """
+        own_run = f"{self.prefix}-{self.run_id}-"
+        pattern = re.compile(rf"^{re.escape(self.prefix)}-[a-z0-9]{{{RUN_ID_LENGTH}}}-(main|gw[0-9]+)-")
+        threshold = datetime.now(timezone.utc) - max_age
+        stale = []
+        for repository in client.iter_repositories(query=f'name ~ "{self.prefix}-"',
+                                                   fields="values.name,values.updated_on,values.description"):
+            name = repository.name
+            if not pattern.match(name) or name.startswith(own_run):
+                continue
+            if repository.get("description") != TEST_REPOSITORY_DESCRIPTION:
+                logger.warning(f"Keeping {name}: it looks like a test repository, but was not created by the tests")
+                continue
+            updated_on = repository.get("updated_on")
+            if updated_on and datetime.fromisoformat(updated_on) < threshold:
+                stale.append(name)
+        if not stale:
+            return None
+        report = client.teardown_many(stale, max_workers=max_workers)
+        logger.info(f"Reaped stale test repositories: {report.summary()}")
+        return report
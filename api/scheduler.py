@@ -0,0 +1,316 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying, 429 is always retried, server errors only for idempotent methods
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket limiting the request rate. The rate adapts to throttling:
+    it is halved on every 429 response and slowly grows back to the configured rate on success.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.5, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Maximum number of requests per second.
+        :param capacity: Maximum burst size, defaults to one second worth of requests.
+        :param min_rate: Lower bound of the adaptive rate.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._updated = clock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available.
+
+        :return: Time spent waiting in seconds.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """
+        Stops handing out tokens for the given time, e.g. until a rate limit window resets.
+        """
+        with self._lock:
+            self.paused_until = max(self.paused_until, self._clock() + seconds)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class SchedulerStats:
+    """
+    Counters describing how much the scheduler had to retry and wait.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.connection_errors = 0
+        self.backoff_time = 0.0
+        self.rate_limit_wait_time = 0.0
+        self.rate_limit = {}
+        self._lock = threading.Lock()
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def set_rate_limit(self, workspace, limits):
+        with self._lock:
+            self.rate_limit[workspace] = limits
+
+    @property
+    def throttled_time(self):
+        return self.backoff_time + self.rate_limit_wait_time
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "server_errors": self.server_errors,
+                "connection_errors": self.connection_errors,
+                "backoff_time": self.backoff_time,
+                "rate_limit_wait_time": self.rate_limit_wait_time,
+                "throttled_time": self.throttled_time,
+                "rate_limit": dict(self.rate_limit),
+            }
+
+
+class RequestScheduler:
+    """
+    Central scheduler every `Repositories` request goes through.
+
+    It spaces requests with a token bucket per workspace (when given a rate), tracks Bitbucket rate limit
+    headers, retries throttled and failed requests with jittered exponential backoff and honors Retry-After.
+    A scheduler can be shared by many clients, so they all respect the same per-workspace budget: the shared
+    scheduler (`get_shared_scheduler`) limits the requests to the Bitbucket API to `config.BITBUCKET_RATE_LIMIT`.
+    """
+
+    def __init__(self, rate=None, burst=None, max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                 retry_statuses=RETRY_STATUSES, sleep=time.sleep, clock=time.monotonic, rate_limited_url=None):
+        """
+        :param rate: Maximum requests per second per workspace, None disables client side rate limiting.
+        :param burst: Token bucket capacity, defaults to one second worth of requests.
+        :param max_retries: Maximum number of retries of a single request.
+        :param backoff_base: Base delay of the exponential backoff in seconds.
+        :param backoff_max: Upper bound of a single backoff delay in seconds.
+        :param retry_statuses: Response statuses that are retried.
+        :param sleep: Sleep function, replaceable in tests.
+        :param clock: Monotonic clock, replaceable in tests.
+        :param rate_limited_url: If given, only requests to URLs starting with it are rate limited, e.g. the
+                                 Bitbucket API but not local fake servers.
+        """
+        self.rate = rate
+        self.rate_limited_url = rate_limited_url
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self.stats = SchedulerStats()
+        self._sleep = sleep
+        self._clock = clock
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, workspace):
+        """
+        Returns the token bucket of a workspace, None if rate limiting is disabled.
+        """
+        if self.rate is None:
+            return None
+        with self._buckets_lock:
+            if workspace not in self._buckets:
+                self._buckets[workspace] = TokenBucket(self.rate, self.burst, clock=self._clock, sleep=self._sleep)
+            return self._buckets[workspace]
+
+    def backoff_delay(self, attempt):
+        """
+        Full-jitter exponential backoff delay for the given (zero based) retry attempt.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(response):
+        """
+        Parses the Retry-After header (seconds or HTTP date) of a response.
+
+        :return: Delay in seconds, None if the header is missing or invalid.
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _track_rate_limit(self, workspace, response, bucket):
+        headers = response.headers
+        limits = {name: headers[name] for name in ("X-RateLimit-Limit", "X-RateLimit-Remaining",
+                                                   "X-RateLimit-Reset", "X-RateLimit-NearLimit",
+                                                   "X-RateLimit-Resource") if name in headers}
+        if not limits:
+            return
+        self.stats.set_rate_limit(workspace, limits)
+        if bucket is None:
+            return
+        if limits.get("X-RateLimit-NearLimit", "").lower() == "true":
+            bucket.throttled()
+        if limits.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in limits:
+            try:
+                bucket.pause(max(0.0, float(limits["X-RateLimit-Reset"]) - time.time()))
+            except ValueError:
+                pass
+
+    def _should_retry(self, method, status):
+        if status not in self.retry_statuses:
+            return False
+        return status == 429 or method.upper() in IDEMPOTENT_METHODS
+
+    def send(self, session, method, url, workspace=None, **kwargs):
+        """
+        Sends a request, waiting for the workspace budget and retrying throttled or failed attempts.
+
+        :param session: The requests session to send the request with.
+        :param method: HTTP method.
+        :param url: Full request URL.
+        :param workspace: Workspace the request is accounted to.
+        :return: The final requests.Response (which may still be an error response once retries are exhausted),
+                 its `retries` attribute holds the number of repeated attempts.
+        """
+        rate_limited = self.rate_limited_url is None or url.startswith(self.rate_limited_url)
+        bucket = self.bucket(workspace) if rate_limited else None
+        attempt = 0
+        while True:
+            if bucket is not None:
+                self.stats.add(rate_limit_wait_time=bucket.acquire())
+            if attempt and hasattr(kwargs.get("data"), "seek"):
+                # Streamed bodies were consumed by the previous attempt
+                kwargs["data"].seek(0)
+            self.stats.add(requests=1)
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.add(connection_errors=1)
+                if attempt >= self.max_retries or method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed with {e!r}, retrying in {delay:.2f}s")
+            else:
+                self._track_rate_limit(workspace, response, bucket)
+                if response.status_code == 429:
+                    self.stats.add(throttled=1)
+                    if bucket is not None:
+                        bucket.throttled()
+                elif response.status_code >= 500:
+                    self.stats.add(server_errors=1)
+                elif bucket is not None:
+                    bucket.succeeded()
+
+                if attempt >= self.max_retries or not self._should_retry(method, response.status_code):
+                    # Exposed to instrumentation hooks (see `api.metrics`)
+                    response.retries = attempt
+                    return response
+
+                retry_after = self.retry_after(response)
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+                # A streamed response keeps its pooled connection until it is read or closed
+                response.close()
+                if response.status_code == 429 and bucket is not None:
+                    # Pausing the bucket holds back every request to the workspace, not only this one.
+                    # The wait itself happens in `acquire` and is counted as rate limit wait time.
+                    bucket.pause(delay)
+                    attempt += 1
+                    self.stats.add(retries=1)
+                    continue
+
+            attempt += 1
+            self.stats.add(retries=1, backoff_time=delay)
+            self._sleep(delay)
+
+
+def configured_rate():
+    """
+    The rate of the shared scheduler, `config.BITBUCKET_RATE_LIMIT` requests per second per workspace.
+
+    :return: The rate, None if rate limiting is disabled ("0").
+    :raises ConfigurationError: If the setting is not a number.
+    """
+    value = config.BITBUCKET_RATE_LIMIT
+    try:
+        rate = float(value)
+    except ValueError:
+        raise config.ConfigurationError(f"BITBUCKET_RATE_LIMIT must be a number of requests per second, "
+                                        f"not {value!r}") from None
+    return rate if rate > 0 else None
+
+
+def get_shared_scheduler():
+    """
+    Returns the process wide scheduler used by clients that were not given their own scheduler. It limits the
+    requests to every workspace of the API (`config.BASE_API_URL`) to `config.BITBUCKET_RATE_LIMIT` per second,
+    requests to other URLs (e.g. fake servers of hermetic tests) are not rate limited.
+
+    :return: The shared RequestScheduler, created on first use.
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler(rate=configured_rate(), rate_limited_url=config.BASE_API_URL)
+        return _shared_scheduler
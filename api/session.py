@@ -0,0 +1,67 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Number of distinct hosts whose connection pools are kept alive
+DEFAULT_POOL_CONNECTIONS = 10
+# Maximum number of connections kept open to a single host
+DEFAULT_POOL_MAXSIZE = 20
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   pool_block=False, keep_alive=True):
+    """
+    Creates a requests session backed by a connection pool.
+
+    Connections are kept open between calls, so only the first request to a host pays
+    for the TCP and TLS handshake. The session is thread safe for the way it is used here
+    and can be shared across several client instances.
+
+    :param pool_connections: Number of per-host pools to cache.
+    :param pool_maxsize: Maximum number of connections kept open to a single host.
+    :param pool_block: If True, callers wait for a free connection instead of opening
+                       more than `pool_maxsize` connections to a single host.
+    :param keep_alive: If False, every request closes its connection (useful as a baseline).
+    :return: The configured requests.Session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+
+    logger.debug(f"Created HTTP session: pool_connections={pool_connections}, pool_maxsize={pool_maxsize}, "
+                 f"pool_block={pool_block}, keep_alive={keep_alive}")
+    return session
+
+
+def get_shared_session():
+    """
+    Returns the process wide session used by clients that were not given their own session.
+
+    :return: The shared requests.Session, created on first use.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def close_shared_session():
+    """
+    Closes the process wide session and all of its pooled connections.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
@@ -0,0 +1,15 @@
+import pytest
+
+from fake_bitbucket import FakeBitbucketServer
+
+FAKE_AUTH = ("fake-user", "fake-app-password")
+FAKE_WORKSPACE = "fake-workspace"
+
+
+@pytest.fixture(scope="function")
+def fake_server():
+    """
+    Starts an in-process fake Bitbucket server for hermetic API client tests.
+    """
+    with FakeBitbucketServer() as server:
+        yield server
@@ -0,0 +1,55 @@
+import asyncio
+
+import allure
+import requests
+
+from api.async_repositories import AsyncRepositories
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Asyncio client')
+@allure.description('Creates repositories concurrently, initializes main, creates a branch and deletes them.')
+def test_async_repository_fan_out(fake_server):
+    client = AsyncRepositories(FAKE_AUTH, FAKE_WORKSPACE, max_concurrency=4, base_url=fake_server.api_url)
+    repo_names = [f"async-repo-{index}" for index in range(8)]
+
+    async def scenario():
+        await asyncio.gather(*(client.create_repositories(name) for name in repo_names))
+        details = await asyncio.gather(*(client.get_repo_details(name) for name in repo_names))
+        assert [detail["name"] for detail in details] == repo_names
+
+        await asyncio.gather(*(client.initialize_main_branch(name, "Initial commit",
+                                                             {'README.md': ('README.md', b'a')})
+                               for name in repo_names))
+        await asyncio.gather(*(client.create_branch(name, "test-branch") for name in repo_names))
+        assert all(await asyncio.gather(*(client.branch_exist(name, "test-branch") for name in repo_names)))
+        assert all(await asyncio.gather(*(client.delete_repository(name) for name in repo_names)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        client.close()
+    assert not fake_server.repositories
+
+
+@allure.epic('API operations')
+@allure.story('Asyncio client')
+@allure.description('Closing the client leaves a session given by the caller open for its other users.')
+def test_close_keeps_given_session(fake_server):
+    class TrackingSession(requests.Session):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    session = TrackingSession()
+    client = AsyncRepositories(FAKE_AUTH, FAKE_WORKSPACE, session=session, base_url=fake_server.api_url)
+    asyncio.run(client.create_repositories("shared-session-repo"))
+    client.close()
+
+    assert not session.closed
+    sync = Repositories(FAKE_AUTH, FAKE_WORKSPACE, session=session, base_url=fake_server.api_url)
+    assert sync.get_repo_details("shared-session-repo")["name"] == "shared-session-repo"
@@ -3,22 +3,21 @@ import logging
 import allure
 import pytest
 
+import config
 from api.repositories import Repositories
-from config import BITBUCKET_USERNAME, BITBUCKET_APP_PASSWORD, BITBUCKET_WORKSPACE
 
 # Initialize logger for the module
 logger = logging.getLogger(__name__)
 
-# Authentication tuple for Bitbucket API using username and app password
-AUTH = (BITBUCKET_USERNAME, BITBUCKET_APP_PASSWORD)
-
 
 @pytest.fixture(scope="module")
 def api_fixture():
     """
-    Fixture for setting up any necessary resources for API tests.
+    Fixture for setting up any necessary resources for API tests: the Repositories API client, authenticated
+    with the username and app password of the API settings.
     """
-    pass
+    api = config.settings("api")
+    return Repositories((api.username, api.app_password), api.workspace)
 
 
 @allure.epic('API operations')
@@ -28,7 +27,7 @@ def api_fixture():
     'This test checks the basic operations of creating a repository, initializing the "main" branch, '
     'creating a new branch, and deleting the repository in Bitbucket API.'
 )
-def test_basic_api_operation(api_fixture):
+def test_basic_api_operation(api_fixture, resources):
     """
     This test validates the following basic repository operations via the Bitbucket API:
     1. Creating a repository.
@@ -38,9 +37,8 @@ def test_basic_api_operation(api_fixture):
 
     The test ensures that these API operations are performed correctly.
     """
-    # Initialize the Repositories API client
-    repo = Repositories(AUTH, BITBUCKET_WORKSPACE)
-    repo_name = "test-api-repo"
+    repo = api_fixture
+    repo_name = resources.repo_name("test-api-repo")
 
     repo.delete_repository(repo_name)
 
@@ -63,3 +61,4 @@ def test_basic_api_operation(api_fixture):
     finally:
         # Delete the repository after the operations are complete
         assert repo.delete_repository(repo_name), f"Failed to delete repo"
+        resources.release(repo_name)
@@ -0,0 +1,38 @@
+import allure
+
+from api.provisioning import RepositorySpec
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Bulk provisioning')
+@allure.description('Provisions many repositories in parallel and tears them down again.')
+def test_provision_and_teardown_many(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    specs = [RepositorySpec(f"bulk-repo-{index}", files={'README.md': ('README.md', b'a')},
+                            branches=["test-branch"]) for index in range(20)]
+
+    report = repo.provision_many(specs, max_workers=8)
+    report.raise_for_failures()
+    assert [result.name for result in report] == [spec.name for spec in specs]
+    assert all(repo.branch_exist(spec.name, "test-branch") for spec in specs)
+
+    teardown = repo.teardown_many(spec.name for spec in specs)
+    teardown.raise_for_failures()
+    assert not fake_server.repositories
+
+
+@allure.epic('API operations')
+@allure.story('Bulk provisioning')
+@allure.description('A failing step is reported per repository without stopping the others.')
+def test_provision_many_reports_errors(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+
+    # Branches cannot be created from 'main' when it was never initialized
+    report = repo.provision_many([RepositorySpec("without-main", branches=["test-branch"]), "plain-repo"])
+
+    assert not report.ok
+    assert report["without-main"].step == "create_branch:test-branch"
+    assert report["without-main"].error is not None
+    assert report["plain-repo"].ok
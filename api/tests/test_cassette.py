@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+import time
+
+import allure
+import pytest
+import requests
+
+from api.cassette import Cassette, CassetteAdapter, CassetteMiss, read_metadata, request_key
+from api.repositories import Repositories
+from api.scheduler import RequestScheduler
+from api.session import create_session
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+from fake_bitbucket import FakeBitbucketServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def scenario(client):
+    """
+    Repository lifecycle whose responses depend on the order of the requests.
+    """
+    client.create_repositories("cassette-repo")
+    client.initialize_main_branch("cassette-repo", "Initial commit", {"README.md": ("README.md", b"a")})
+    before = client.branch_exist("cassette-repo", "feature")
+    commit_hash = client.commit_files("cassette-repo", "feature", [("docs/page.md", b"page")], "Add page")[-1]
+    return {
+        "before": before,
+        "after": client.branch_exist("cassette-repo", "feature"),
+        "details": client.get_repo_details("cassette-repo", fields="name,is_private"),
+        "branches": sorted(branch.name for branch in client.iter_branches("cassette-repo")),
+        "page": client.get_file("cassette-repo", "docs/page.md", commit_hash),
+        "diff": b"".join(client.stream_diff("cassette-repo", commit_hash)),
+    }
+
+
+def client_of(api_url, mode, cassette):
+    # The scheduler retries like the shared one, without limiting the rate
+    session = create_session()
+    adapter = CassetteAdapter(mode).mount(session, api_url)
+    adapter.use(cassette)
+    client = Repositories(FAKE_AUTH, FAKE_WORKSPACE, session=session, base_url=api_url,
+                          scheduler=RequestScheduler())
+    return client, adapter
+
+
+@allure.epic('API operations')
+@allure.story('Record and replay')
+@allure.description('Responses recorded against a server are replayed in order once the server is gone.')
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "cassettes" / "lifecycle")
+    with FakeBitbucketServer() as server:
+        cassette = Cassette(path, "record")
+        client, _ = client_of(server.api_url, "record", cassette)
+        recorded = scenario(client)
+        cassette.close()
+        requests_sent = len(server.requests)
+
+    assert not recorded["before"] and recorded["after"] and recorded["page"] == b"page"
+    assert os.path.getsize(f"{path}.index") > 0 and len(cassette) == requests_sent
+
+    # The server is stopped and replaying uses another host, the cassette alone answers
+    cassette = Cassette(path)
+    client, adapter = client_of("http://127.0.0.1:9/2.0", "replay", cassette)
+    started = time.perf_counter()
+    replayed = scenario(client)
+    elapsed = time.perf_counter() - started
+
+    assert replayed == recorded
+    assert adapter.misses == 0 and adapter.hits == requests_sent
+    assert elapsed < 1
+    with pytest.raises(CassetteMiss):
+        client.create_branch("cassette-repo", "never-recorded")
+    cassette.close()
+
+
+@allure.epic('API operations')
+@allure.story('Record and replay')
+@allure.description('A request missing from the cassette fails at once, the scheduler does not retry it.')
+def test_miss_is_not_retried(tmp_path):
+    cassette = Cassette(str(tmp_path / "empty"))
+    client, adapter = client_of("http://127.0.0.1:9/2.0", "replay", cassette)
+    sleeps = []
+    client.scheduler = RequestScheduler(sleep=sleeps.append)
+
+    with pytest.raises(CassetteMiss):
+        client.get_repo_details("never-recorded")
+
+    assert adapter.misses == 1 and sleeps == []
+    assert client.scheduler.stats.retries == 0
+    cassette.close()
+
+
+@allure.epic('API operations')
+@allure.story('Record and replay')
+@allure.description('Request keys ignore the host, the query order and the random multipart boundary.')
+def test_request_key():
+    def prepare(url, **kwargs):
+        return requests.Request("POST", url, **kwargs).prepare()
+
+    files = {"README.md": ("README.md", b"a")}
+    assert (request_key(prepare("https://api.bitbucket.org/2.0/r?b=2&a=1", files=files))
+            == request_key(prepare("http://127.0.0.1:8000/2.0/r?a=1&b=2", files=files)))
+    assert (request_key(prepare("https://api.bitbucket.org/2.0/r", json={"a": 1}))
+            != request_key(prepare("https://api.bitbucket.org/2.0/r", json={"a": 2})))
+
+
+def run_pytest(cassette_dir, *options):
+    """
+    Runs the basic API tests in a pytest subprocess with the minimal environment (the .env file is not read).
+    """
+    environment = {"PATH": os.environ.get("PATH", ""), "HOME": os.environ.get("HOME", ""),
+                   "BITBUCKET_DOTENV_LOADED": "1"}
+    return subprocess.run([sys.executable, "-m", "pytest", "-p", "no:cacheprovider", f"--cassette-dir={cassette_dir}",
+                           *options, "api/tests/test_basic_api_operations.py"],
+                          cwd=ROOT, env=environment, capture_output=True, text=True)
+
+
+@allure.epic('API operations')
+@allure.story('Record and replay')
+@allure.description('A suite recorded against the fake server is replayed without credentials in the environment.')
+def test_replay_without_credentials(tmp_path):
+    recorded = run_pytest(tmp_path, "-q", "-p", "no:xdist", "--fake-bitbucket", "--cassette", "record")
+    assert recorded.returncode == 0, recorded.stdout + recorded.stderr
+    assert read_metadata(str(tmp_path)) == {"workspace": "fake-workspace"}
+
+    replayed = run_pytest(tmp_path, "-q", "-p", "no:xdist", "--cassette", "replay")
+    assert replayed.returncode == 0, replayed.stdout + replayed.stderr
+    assert "1 passed" in replayed.stdout
+
+
+@allure.epic('API operations')
+@allure.story('Record and replay')
+@allure.description('Under pytest-xdist, cassettes are recorded and replayed with one worker per test module.')
+def test_record_and_replay_under_xdist(tmp_path):
+    pytest.importorskip("xdist")
+
+    recorded = run_pytest(tmp_path, "-v", "-n", "2", "--fake-bitbucket", "--cassette", "record")
+    assert recorded.returncode == 0, recorded.stdout + recorded.stderr
+    assert "LoadFileScheduling" in recorded.stdout
+    assert os.path.exists(tmp_path / "api__tests__test_basic_api_operations.index")
+
+    replayed = run_pytest(tmp_path, "-v", "-n", "3", "--cassette", "replay")
+    assert replayed.returncode == 0, replayed.stdout + replayed.stderr
+    assert "LoadFileScheduling" in replayed.stdout and "1 passed" in replayed.stdout
+
+    # Other distributions may split a module across workers
+    rejected = run_pytest(tmp_path, "-n", "2", "--dist", "loadscope", "--cassette", "replay")
+    assert rejected.returncode == pytest.ExitCode.USAGE_ERROR
+    assert "--dist loadfile" in rejected.stderr
@@ -0,0 +1,74 @@
+import json
+import logging
+
+import allure
+import pytest
+import requests
+
+from api.metrics import ClientMetrics, LatencyHistogram
+from api.repositories import Repositories
+from api.scheduler import RequestScheduler
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Client metrics')
+@allure.description('Latency, transferred bytes, status codes and retries are recorded per endpoint.')
+def test_metrics_per_endpoint(fake_server):
+    metrics = ClientMetrics()
+    scheduler = RequestScheduler(backoff_base=0.001, sleep=lambda delay: None)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, scheduler=scheduler,
+                        hooks=[metrics])
+
+    repo.create_repositories("metrics-repo")
+    fake_server.fail_next(2, status=503, method="GET")
+    repo.get_repo_details("metrics-repo")
+    assert not repo.branch_exist("metrics-repo", "main")
+
+    details = metrics.endpoint("GET", "repository")
+    assert details.latency.count == 1
+    assert details.retries == 2
+    assert details.statuses == {"200": 1}
+    assert details.bytes_received > 1000
+    assert metrics.endpoint("GET", "branch").statuses == {"404": 1}
+    assert metrics.endpoint("POST", "repository").bytes_sent > 0
+
+    snapshot = json.loads(metrics.to_json())
+    assert set(snapshot) == {"POST repository", "GET repository", "GET branch"}
+    assert snapshot["GET repository"]["latency"]["p50"] > 0
+
+    text = metrics.to_prometheus()
+    assert 'bitbucket_client_requests_total{method="GET",endpoint="branch",status="404"} 1' in text
+    assert 'bitbucket_client_retries_total{method="GET",endpoint="repository"} 2' in text
+    assert 'bitbucket_client_request_duration_seconds_count{method="GET",endpoint="repository"} 1' in text
+
+
+@allure.epic('API operations')
+@allure.story('Client metrics')
+@allure.description('Histogram quantiles are interpolated inside their bucket.')
+def test_latency_histogram_quantiles():
+    histogram = LatencyHistogram(buckets=(0.1, 0.2))
+    for value in (0.05, 0.15, 0.15, 0.3):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1]
+    assert histogram.quantile(0.5) == pytest.approx(0.15)
+    assert histogram.quantile(1.0) == 0.3
+
+
+@allure.epic('API operations')
+@allure.story('Client metrics')
+@allure.description('Response bodies are not decoded for logging unless DEBUG is enabled.')
+def test_response_body_is_not_decoded_without_debug(fake_server, monkeypatch):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("quiet-repo")
+    logging.getLogger("api.repositories").setLevel(logging.INFO)
+    try:
+        decoded = []
+        original_text = requests.Response.text
+        monkeypatch.setattr(requests.Response, "text",
+                            property(lambda response: decoded.append(response) or original_text.fget(response)))
+        repo.delete_repository("quiet-repo")
+        assert decoded == []
+    finally:
+        logging.getLogger("api.repositories").setLevel(logging.NOTSET)
@@ -0,0 +1,77 @@
+import os
+import tracemalloc
+
+import allure
+
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+from api.uploads import MultipartStream, UploadFile
+
+
+def write_tree(root, files):
+    for path, content in files.items():
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as file:
+            file.write(content)
+
+
+@allure.epic('API operations')
+@allure.story('Streaming commits')
+@allure.description('A directory tree is committed in several chained commits with progress reporting.')
+def test_commit_files_splits_tree_into_chained_commits(fake_server, tmp_path):
+    files = {f"docs/page-{index}.md": f"page {index}".encode() for index in range(5)}
+    files["README.md"] = b"# Fixture\n"
+    files["data/large.bin"] = os.urandom(3 * 1024 * 1024)
+    write_tree(tmp_path, files)
+
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("streamed-repo")
+    reports = []
+    commits = repo.commit_files("streamed-repo", "main", tmp_path, "Seed fixture tree",
+                                max_files_per_commit=3, progress=reports.append)
+
+    repository = fake_server.repositories[(FAKE_WORKSPACE, "streamed-repo")]
+    assert len(commits) == 3
+    assert repository.branches["main"] == commits[-1]
+    assert [repository.commit_info(commit)["parents"] for commit in commits[1:]] == [[commits[0]], [commits[1]]]
+    assert repository.commit_info(commits[-1])["files"] == files
+    assert repository.commit_info(commits[0])["message"] == "Seed fixture tree (1/3)"
+
+    assert reports[-1].commits == 3
+    assert reports[-1].files_committed == len(files)
+    assert reports[-1].bytes_sent > sum(len(content) for content in files.values())
+
+
+@allure.epic('API operations')
+@allure.story('Streaming commits')
+@allure.description('In-memory contents and explicit repository paths are accepted as well.')
+def test_commit_files_from_tuples(fake_server, tmp_path):
+    write_tree(tmp_path, {"local.txt": b"from disk"})
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("tuple-repo")
+
+    repo.commit_files("tuple-repo", "feature", [("a/b.txt", b"in memory"),
+                                                ("c.txt", tmp_path / "local.txt")], "Add files")
+
+    repository = fake_server.repositories[(FAKE_WORKSPACE, "tuple-repo")]
+    assert repository.commit_info("feature")["files"] == {"a/b.txt": b"in memory", "c.txt": b"from disk"}
+
+
+@allure.epic('API operations')
+@allure.story('Streaming commits')
+@allure.description('The multipart body is read in chunks without loading the files into memory.')
+def test_multipart_stream_memory_is_bounded(tmp_path):
+    large_file = tmp_path / "large.bin"
+    large_file.write_bytes(os.urandom(8 * 1024 * 1024))
+    stream = MultipartStream([("message", "Large file")], [UploadFile("large.bin", local_path=large_file)])
+
+    tracemalloc.start()
+    total = 0
+    while chunk := stream.read(64 * 1024):
+        total += len(chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert total == len(stream)
+    assert peak < 1024 * 1024
@@ -0,0 +1,43 @@
+import allure
+import requests
+from git import Repo
+
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('Fake Bitbucket server')
+@allure.story('Git smart HTTP')
+@allure.description('A pushed commit is visible through the branch, src and diff endpoints.')
+def test_clone_push_and_diff(fake_server, tmp_path):
+    fake_server.add_repository(FAKE_WORKSPACE, "git-repo", files={"README.md": b"Initial content\n"})
+
+    local = Repo.clone_from(fake_server.clone_url(FAKE_WORKSPACE, "git-repo"), tmp_path / "clone")
+    assert (tmp_path / "clone" / "README.md").read_bytes() == b"Initial content\n"
+
+    (tmp_path / "clone" / "README.md").write_text("Changed content\n")
+    local_diff = local.git.diff()
+    local.git.add(A=True)
+    commit = local.index.commit("Change README")
+    local.remotes.origin.push()
+
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    assert repo.get_branch("git-repo", "main").target_hash == commit.hexsha
+
+    repo_url = f"{fake_server.api_url}/repositories/{FAKE_WORKSPACE}/git-repo"
+    source = requests.get(f"{repo_url}/src/main/README.md")
+    assert source.content == b"Changed content\n"
+    diff = requests.get(f"{repo_url}/diff/{commit.hexsha}")
+    assert diff.text[:-1] == local_diff
+
+
+@allure.epic('Fake Bitbucket server')
+@allure.story('Git smart HTTP')
+@allure.description('Commits created through the API can be cloned.')
+def test_clone_api_commits(fake_server, tmp_path):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("api-repo")
+    repo.initialize_main_branch("api-repo", "Initial commit", {"docs/guide.md": "Guide"})
+
+    Repo.clone_from(fake_server.clone_url(FAKE_WORKSPACE, "api-repo"), tmp_path / "clone")
+    assert (tmp_path / "clone" / "docs" / "guide.md").read_text() == "Guide"
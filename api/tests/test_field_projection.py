@@ -0,0 +1,42 @@
+import allure
+
+from api.models import BranchInfo, RepositoryInfo
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Field projection')
+@allure.description('Only the requested fields are returned and exposed as typed attributes.')
+def test_get_repo_details_with_projection(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("projected-repo")
+    repo.initialize_main_branch("projected-repo", "Initial commit", {'README.md': ('README.md', b'a')})
+
+    full = repo.get_repo_details("projected-repo")
+    projected = repo.get_repo_details("projected-repo", fields="name,mainbranch.name")
+
+    assert isinstance(projected, RepositoryInfo)
+    assert projected.raw == {"name": "projected-repo", "mainbranch": {"name": "main"}}
+    assert projected.name == full.name == full["name"] == "projected-repo"
+    assert projected.main_branch == full.main_branch == "main"
+    assert projected.full_name is None
+    assert full.full_name == f"{FAKE_WORKSPACE}/projected-repo"
+
+
+@allure.epic('API operations')
+@allure.story('Field projection')
+@allure.description('Branch lookups return typed objects and branch_exist requests the minimal projection.')
+def test_get_branch_and_branch_exist(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("branch-repo")
+    repo.initialize_main_branch("branch-repo", "Initial commit", {'README.md': ('README.md', b'a')})
+
+    branch = repo.get_branch("branch-repo", "main")
+    assert isinstance(branch, BranchInfo)
+    assert branch.name == "main"
+    assert len(branch.target_hash) == 40
+
+    assert repo.get_branch("branch-repo", "missing") is None
+    assert repo.branch_exist("branch-repo", "main")
+    assert not repo.branch_exist("branch-repo", "missing")
@@ -0,0 +1,66 @@
+import allure
+
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+def seed_repositories(fake_server, names):
+    for name in names:
+        fake_server.add_repository(FAKE_WORKSPACE, name)
+
+
+def list_requests(fake_server):
+    return [path for method, path in fake_server.requests if method == "GET" and path.endswith(FAKE_WORKSPACE)]
+
+
+@allure.epic('API operations')
+@allure.story('Paginated iterators')
+@allure.description('Iterates every repository of the workspace following the next links.')
+def test_iter_repositories_follows_next_links(fake_server):
+    names = [f"test-{index:03}" for index in range(45)] + [f"keep-{index}" for index in range(5)]
+    seed_repositories(fake_server, names)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+
+    assert [repository.name for repository in repo.iter_repositories(pagelen=10)] == names
+    assert len(list_requests(fake_server)) == 5
+
+
+@allure.epic('API operations')
+@allure.story('Paginated iterators')
+@allure.description('Pages are fetched lazily, at most one page ahead of the consumer.')
+def test_iter_repositories_is_lazy(fake_server):
+    seed_repositories(fake_server, [f"test-{index:03}" for index in range(100)])
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+
+    iterator = repo.iter_repositories(pagelen=10, prefetch=False)
+    assert next(iterator).name == "test-000"
+    assert len(list_requests(fake_server)) == 1
+    iterator.close()
+
+
+@allure.epic('API operations')
+@allure.story('Paginated iterators')
+@allure.description('Query and field projection are applied by the server.')
+def test_iter_repositories_with_query_and_fields(fake_server):
+    seed_repositories(fake_server, [f"test-{index:03}" for index in range(30)] + ["keep-me"])
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+
+    repositories = list(repo.iter_repositories(query='name ~ "test-"', fields="values.name", pagelen=7))
+    assert len(repositories) == 30
+    assert all(repository.raw == {"name": repository.name} for repository in repositories)
+
+
+@allure.epic('API operations')
+@allure.story('Paginated iterators')
+@allure.description('Branches and pull requests are iterated the same way.')
+def test_iter_branches_and_pull_requests(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("paged-repo")
+    repo.initialize_main_branch("paged-repo", "Initial commit", {'README.md': ('README.md', b'a')})
+    for index in range(12):
+        repo.create_branch("paged-repo", f"feature/{index:02}")
+
+    branches = [branch.name for branch in repo.iter_branches("paged-repo", query='name ~ "feature/"',
+                                                                  pagelen=5)]
+    assert branches == [f"feature/{index:02}" for index in range(12)]
+    assert list(repo.iter_pull_requests("paged-repo")) == []
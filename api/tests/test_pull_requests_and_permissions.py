@@ -0,0 +1,70 @@
+import allure
+
+from api.provisioning import PullRequestSpec, RepositorySpec
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Pull requests')
+@allure.description('A pull request is created, approved and merged, and the merged file can be read.')
+def test_create_approve_and_merge_pull_request(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("pr-repo")
+    repo.initialize_main_branch("pr-repo", "Initial commit", {"README.md": ("README.md", b"a")})
+    repo.commit_files("pr-repo", "feature", [("README.md", b"ab")], "Change README")
+
+    pull_request = repo.create_pull_request("pr-repo", "Change README", "feature")
+    assert pull_request.id == 1
+    assert pull_request.state == "OPEN"
+    assert repo.find_pull_request_id("pr-repo", "feature") == 1
+    assert repo.find_pull_request_id("pr-repo", "main") is None
+    assert repo.approve_pull_request("pr-repo", pull_request.id)
+
+    merged = repo.merge_pull_request("pr-repo", pull_request.id)
+    assert merged.state == "MERGED"
+    assert repo.get_pull_request("pr-repo", 1).state == "MERGED"
+    assert repo.get_file("pr-repo", "README.md") == b"ab"
+    assert repo.get_file("pr-repo", "missing.md") is None
+
+
+@allure.epic('API operations')
+@allure.story('Permissions')
+@allure.description('User and group permissions are granted, changed and removed.')
+def test_user_and_group_permissions(fake_server):
+    account_id = fake_server.add_member(FAKE_WORKSPACE, "second-user", "Second User")
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    repo.create_repositories("permissions-repo")
+
+    assert repo.find_workspace_member("Second User") == account_id
+    assert repo.find_workspace_member("nobody") is None
+
+    repo.set_user_permission("permissions-repo", account_id, "read")
+    assert repo.get_user_permission("permissions-repo", account_id) == "read"
+    repo.set_user_permission("permissions-repo", account_id, "write")
+    assert repo.get_user_permission("permissions-repo", account_id) == "write"
+    assert repo.remove_user_permission("permissions-repo", account_id)
+    assert repo.get_user_permission("permissions-repo", account_id) is None
+
+    repo.set_group_permission("permissions-repo", "developers", "write")
+    assert repo.remove_group_permission("permissions-repo", "developers")
+    assert not repo.remove_group_permission("permissions-repo", "developers")
+
+
+@allure.epic('API operations')
+@allure.story('Bulk provisioning')
+@allure.description('Permissions and pull requests are part of a provisioned repository.')
+def test_provision_permissions_and_pull_requests(fake_server):
+    account_id = fake_server.add_member(FAKE_WORKSPACE, "second-user")
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    spec = RepositorySpec("hybrid-repo", files={"README.md": ("README.md", b"a")},
+                          user_permissions={account_id: "read"}, group_permissions={"developers": "write"},
+                          pull_requests=[PullRequestSpec("First", "first", [("README.md", b"ab")], approve=True),
+                                         PullRequestSpec("Second", "second", [("docs.md", b"docs")])])
+
+    report = repo.provision_many([spec])
+    report.raise_for_failures()
+
+    assert [pull_request.id for pull_request in report["hybrid-repo"].pull_requests] == [1, 2]
+    assert repo.get_user_permission("hybrid-repo", account_id) == "read"
+    assert repo.get_file("hybrid-repo", "README.md", "first") == b"ab"
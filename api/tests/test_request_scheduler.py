@@ -0,0 +1,149 @@
+import allure
+import pytest
+import requests
+
+import config
+from api.repositories import Repositories
+from api.scheduler import RequestScheduler, TokenBucket, configured_rate
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+class FakeClock:
+    """
+    Deterministic clock whose sleep advances the time instantly.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return FakeClock()
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('Throttled requests are retried honoring Retry-After and counted.')
+def test_retries_throttled_requests_with_retry_after(fake_server, clock):
+    scheduler = RequestScheduler(rate=100, sleep=clock.sleep, clock=clock)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, scheduler=scheduler)
+    repo.create_repositories("throttled-repo")
+
+    fake_server.fail_next(2, status=429, headers={"Retry-After": "3"})
+    assert repo.get_repo_details("throttled-repo")["name"] == "throttled-repo"
+
+    stats = scheduler.stats.snapshot()
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["throttled_time"] == pytest.approx(6.0)
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('Server errors are retried with backoff for idempotent requests only.')
+def test_retries_server_errors_for_idempotent_requests(fake_server, clock):
+    scheduler = RequestScheduler(sleep=clock.sleep, clock=clock)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, scheduler=scheduler)
+
+    fake_server.fail_next(1, status=503, method="POST")
+    with pytest.raises(AssertionError):
+        repo.create_repositories("server-error-repo")
+    repo.create_repositories("server-error-repo")
+
+    fake_server.fail_next(3, status=503, method="GET")
+    assert repo.get_repo_details("server-error-repo")["name"] == "server-error-repo"
+    assert scheduler.stats.retries == 3
+    assert all(delay <= scheduler.backoff_base * 2 ** attempt for attempt, delay in enumerate(clock.sleeps))
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('Exhausted retries surface the last error response.')
+def test_gives_up_after_max_retries(fake_server, clock):
+    scheduler = RequestScheduler(max_retries=2, sleep=clock.sleep, clock=clock)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, scheduler=scheduler)
+
+    fake_server.fail_next(3, status=500)
+    with pytest.raises(requests.HTTPError):
+        repo.branch_exist("missing-repo", "main")
+    assert scheduler.stats.retries == 2
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('The token bucket spaces requests and halves its rate when throttled.')
+def test_token_bucket_spaces_requests(clock):
+    bucket = TokenBucket(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(3)]
+    assert waits == [0.0, pytest.approx(0.1), pytest.approx(0.1)]
+
+    bucket.throttled()
+    assert bucket.rate == 5
+    assert bucket.acquire() == pytest.approx(0.2)
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('Streamed responses of retried attempts are closed, so their connections go back to the pool.')
+def test_closes_retried_streamed_responses(fake_server, clock):
+    class RecordingSession(requests.Session):
+        def __init__(self):
+            super().__init__()
+            self.responses = []
+
+        def request(self, *args, **kwargs):
+            response = super().request(*args, **kwargs)
+            self.responses.append(response)
+            return response
+
+    scheduler = RequestScheduler(sleep=clock.sleep, clock=clock)
+    session = RecordingSession()
+
+    fake_server.fail_next(2, status=503)
+    response = scheduler.send(session, "GET", f"{fake_server.api_url}/repositories/{FAKE_WORKSPACE}", stream=True)
+
+    assert [attempt.status_code for attempt in session.responses] == [503, 503, 200]
+    assert all(attempt.raw.closed for attempt in session.responses[:-1])
+    assert not response.raw.closed
+    response.close()
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('Only requests to the rate limited URL wait for the token bucket of their workspace.')
+def test_rate_limits_the_api_only(fake_server, clock):
+    scheduler = RequestScheduler(rate=1, sleep=clock.sleep, clock=clock, rate_limited_url=fake_server.api_url)
+    session = requests.Session()
+
+    for _ in range(3):
+        scheduler.send(session, "GET", f"{fake_server.api_url}/repositories/{FAKE_WORKSPACE}", FAKE_WORKSPACE)
+    assert scheduler.stats.rate_limit_wait_time == pytest.approx(2.0)
+    for _ in range(3):
+        scheduler.send(session, "GET", f"{fake_server.url}/{FAKE_WORKSPACE}/missing.git/info/refs", FAKE_WORKSPACE)
+    assert scheduler.stats.rate_limit_wait_time == pytest.approx(2.0)
+
+
+@allure.epic('API operations')
+@allure.story('Request scheduler')
+@allure.description('The shared scheduler takes its rate from BITBUCKET_RATE_LIMIT, "0" disables rate limiting.')
+def test_configured_rate(monkeypatch):
+    for value, rate in (("10", 10.0), ("2.5", 2.5), ("0", None)):
+        monkeypatch.setenv("BITBUCKET_RATE_LIMIT", value)
+        config.reload()
+        assert configured_rate() == rate
+    monkeypatch.setenv("BITBUCKET_RATE_LIMIT", "fast")
+    config.reload()
+    with pytest.raises(config.ConfigurationError, match="BITBUCKET_RATE_LIMIT"):
+        configured_rate()
+    monkeypatch.undo()
+    config.reload()
@@ -0,0 +1,79 @@
+import os
+from datetime import timedelta
+
+import allure
+import pytest
+
+from api.repositories import Repositories
+from api.resources import ResourceLeases
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Test resources')
+@allure.description('Workers of the same run get distinct repository names and local directories.')
+def test_leases_are_unique_per_worker(tmp_path):
+    first = ResourceLeases(run_id="Run-1234-abcd", worker_id="gw0", tmp_root=str(tmp_path))
+    second = ResourceLeases(run_id="Run-1234-abcd", worker_id="gw1", tmp_root=str(tmp_path))
+
+    assert first.repo_name("UI Test Permissions") == "qa-run1234a-gw0-ui-test-permissions"
+    assert first.repo_name("UI Test Permissions") == first.repo_name("ui-test-permissions")
+    assert first.repositories == ["qa-run1234a-gw0-ui-test-permissions"]
+    assert second.repo_name("ui-test-permissions") != first.repo_name("ui-test-permissions")
+
+    directory = first.temp_dir("git_test_repo")
+    assert os.path.isdir(directory) and os.listdir(directory) == []
+    assert directory != second.temp_dir("git_test_repo")
+    assert first.track_pull_request(first.repo_name("ui-test-permissions"), 3) == 3
+
+
+@allure.epic('API operations')
+@allure.story('Test resources')
+@allure.description('Leased repositories and directories are deleted in bulk, released ones are kept.')
+def test_reap_deletes_leased_resources(fake_server, tmp_path):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    leases = ResourceLeases(run_id="run00001", worker_id="gw0", tmp_root=str(tmp_path))
+    names = [leases.repo_name(f"repo-{index}") for index in range(5)]
+    for name in names:
+        repo.create_repositories(name)
+    directory = leases.temp_dir("clone")
+    leases.release(names[0])
+
+    report = leases.reap(repo)
+
+    assert report.ok and len(report) == 4
+    assert [repository.name for repository in repo.iter_repositories()] == [names[0]]
+    assert not os.path.exists(directory)
+    assert leases.reap(repo) is None
+
+
+@allure.epic('API operations')
+@allure.story('Test resources')
+@allure.description('Old repositories of other runs are reaped, the ones of the current run and others are kept.')
+def test_reap_stale_keeps_current_run(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url)
+    leases = ResourceLeases(run_id="current1", worker_id="gw0")
+    for name in ["qa-0a1b2c3d-gw0-ui-test-permissions", "qa-cassette-main-git_test_repo", leases.repo_name("api-repo"),
+                 "qa-project", "qa-release-notes-v2", "qa-old-gw0-short-run-id", "unrelated-repo"]:
+        repo.create_repositories(name)
+    # Shaped like a test repository, but created by someone else
+    repo.create_repositories("qa-teamrepo-main-service", description="Service of the QA team")
+
+    report = leases.reap_stale(repo)
+
+    assert sorted(result.name for result in report) == ["qa-0a1b2c3d-gw0-ui-test-permissions",
+                                                        "qa-cassette-main-git_test_repo"]
+    assert sorted(repository.name for repository in repo.iter_repositories()) == [
+        "qa-current1-gw0-api-repo", "qa-old-gw0-short-run-id", "qa-project", "qa-release-notes-v2",
+        "qa-teamrepo-main-service", "unrelated-repo"]
+    # The fake server reports every repository as updated in 2024
+    assert leases.reap_stale(repo, max_age=timedelta(days=365 * 100)) is None
+
+
+@allure.epic('API operations')
+@allure.story('Test resources')
+@allure.description('Run ids are always 8 characters long, so repository names can be recognized.')
+def test_run_id_length():
+    assert len(ResourceLeases().run_id) == 8
+    with pytest.raises(ValueError):
+        ResourceLeases(run_id="run-1")
@@ -0,0 +1,79 @@
+import allure
+
+from api.cache import ResponseCache
+from api.repositories import Repositories
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def count_requests(fake_server, method, path_suffix):
+    return sum(1 for request_method, path in fake_server.requests
+               if request_method == method and path.endswith(path_suffix))
+
+
+@allure.epic('API operations')
+@allure.story('Response cache')
+@allure.description('Repeated reads are served from the cache and revalidated with ETags once expired.')
+def test_cached_reads_and_revalidation(fake_server):
+    clock = FakeClock()
+    cache = ResponseCache(ttls={"repository": 5}, clock=clock)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, cache=cache)
+    repo.create_repositories("cached-repo")
+
+    for _ in range(10):
+        assert repo.get_repo_details("cached-repo")["name"] == "cached-repo"
+    assert count_requests(fake_server, "GET", "/cached-repo") == 1
+
+    clock.now = 10
+    assert repo.get_repo_details("cached-repo")["name"] == "cached-repo"
+    assert count_requests(fake_server, "GET", "/cached-repo") == 2
+
+    assert cache.stats.snapshot() == {"hits": 9, "misses": 1, "revalidations": 1, "evictions": 0,
+                                      "invalidations": 0, "round_trips_saved": 9, "hit_ratio": 9 / 11}
+
+
+@allure.epic('API operations')
+@allure.story('Response cache')
+@allure.description('Writes invalidate the cached entries of the repository they touch.')
+def test_writes_invalidate_cached_entries(fake_server):
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, cache=ResponseCache())
+    repo.create_repositories("invalidated-repo")
+
+    assert not repo.branch_exist("invalidated-repo", "main")
+    assert not repo.branch_exist("invalidated-repo", "main")
+    repo.initialize_main_branch("invalidated-repo", "Initial commit", {'README.md': ('README.md', b'a')})
+    assert repo.branch_exist("invalidated-repo", "main")
+
+    assert not repo.branch_exist("invalidated-repo", "test-branch")
+    repo.create_branch("invalidated-repo", "test-branch")
+    assert repo.branch_exist("invalidated-repo", "test-branch")
+
+    assert repo.delete_repository("invalidated-repo")
+    assert not repo.branch_exist("invalidated-repo", "main")
+
+
+@allure.epic('API operations')
+@allure.story('Response cache')
+@allure.description('The least recently used entry is evicted once the cache is full.')
+def test_lru_eviction(fake_server):
+    cache = ResponseCache(maxsize=2)
+    repo = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=fake_server.api_url, cache=cache)
+    for name in ("repo-a", "repo-b", "repo-c"):
+        repo.create_repositories(name)
+
+    repo.get_repo_details("repo-a")
+    repo.get_repo_details("repo-b")
+    repo.get_repo_details("repo-a")
+    repo.get_repo_details("repo-c")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    repo.get_repo_details("repo-a")
+    assert cache.stats.hits == 2
@@ -0,0 +1,36 @@
+import allure
+
+from api.repositories import Repositories
+from api.session import create_session
+from api.tests.conftest import FAKE_AUTH, FAKE_WORKSPACE
+
+
+@allure.epic('API operations')
+@allure.story('Connection pooling')
+@allure.description('Clients sharing a pooled session reuse a single keep-alive connection.')
+def test_shared_session_reuses_connection(fake_server):
+    session = create_session()
+    first = Repositories(FAKE_AUTH, FAKE_WORKSPACE, session=session, base_url=fake_server.api_url)
+    second = Repositories(FAKE_AUTH, FAKE_WORKSPACE, session=session, base_url=fake_server.api_url)
+
+    first.create_repositories("pooled-repo")
+    for _ in range(5):
+        assert first.get_repo_details("pooled-repo")["name"] == "pooled-repo"
+        assert second.get_repo_details("pooled-repo")["name"] == "pooled-repo"
+    assert second.delete_repository("pooled-repo")
+
+    assert fake_server.connections == 1
+
+
+@allure.epic('API operations')
+@allure.story('Connection pooling')
+@allure.description('Disabling keep-alive opens a new connection for every request.')
+def test_session_without_keep_alive_opens_new_connections(fake_server):
+    client = Repositories(FAKE_AUTH, FAKE_WORKSPACE, session=create_session(keep_alive=False),
+                          base_url=fake_server.api_url)
+
+    client.create_repositories("unpooled-repo")
+    for _ in range(3):
+        client.get_repo_details("unpooled-repo")
+
+    assert fake_server.connections == 4
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import allure
+import pytest
+
+import config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+API_ENVIRONMENT = {"BITBUCKET_USERNAME": "user", "BITBUCKET_APP_PASSWORD": "app-password",
+                   "BITBUCKET_WORKSPACE": "workspace"}
+
+
+@pytest.fixture
+def environment():
+    """
+    Isolates the environment of a test (the .env file is not read) and resolves the settings again afterwards.
+    """
+    with mock.patch.dict(os.environ, clear=True):
+        os.environ[config.DOTENV_LOADED] = "1"
+        config.reload()
+        yield os.environ
+    config.reload()
+
+
+@allure.epic('API operations')
+@allure.story('Settings')
+@allure.description('Importing the settings without any environment neither exits nor logs errors.')
+def test_import_does_not_exit_without_environment():
+    environment = {"PATH": os.environ.get("PATH", ""), config.DOTENV_LOADED: "1"}
+    result = subprocess.run([sys.executable, "-c", "import config, api.repositories; print(config.BASE_API_URL)"],
+                            cwd=ROOT, env=environment, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == config.DEFAULT_API_URL
+
+
+@allure.epic('API operations')
+@allure.story('Settings')
+@allure.description('Test modules are collected without any environment, only the tests using the settings fail.')
+def test_collection_does_not_need_environment():
+    environment = {"PATH": os.environ.get("PATH", ""), "HOME": os.environ.get("HOME", ""), config.DOTENV_LOADED: "1"}
+    result = subprocess.run([sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider"],
+                            cwd=ROOT, env=environment, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "api/tests/test_basic_api_operations.py::test_basic_api_operation" in result.stdout
+    assert "git_operations/test_git.py::test_git_operations" in result.stdout
+
+
+@allure.epic('API operations')
+@allure.story('Settings')
+@allure.description('Each profile only requires its own variables, and lists all the missing ones at once.')
+def test_profiles_validate_their_variables(environment):
+    environment.update(API_ENVIRONMENT)
+
+    api = config.settings("api")
+    assert (api.username, api.app_password, api.workspace) == ("user", "app-password", "workspace")
+    assert config.settings("git") is api
+    with pytest.raises(config.ConfigurationError) as error:
+        config.settings("ui")
+    assert "BITBUCKET_PASSWORD" in str(error.value) and "BITBUCKET_SECOND_USERNAME_NAME" in str(error.value)
+    assert "BITBUCKET_WORKSPACE" not in str(error.value)
+    with pytest.raises(ValueError):
+        config.settings("mobile")
+
+
+@allure.epic('API operations')
+@allure.story('Settings')
+@allure.description('Module attributes resolve lazily and are cached until the settings are reloaded.')
+def test_module_attributes_resolve_lazily(environment):
+    environment.update(API_ENVIRONMENT, BITBUCKET_API_URL="http://localhost:1/2.0")
+
+    assert config.BITBUCKET_WORKSPACE == "workspace"
+    assert config.BASE_API_URL == "http://localhost:1/2.0"
+    with pytest.raises(config.ConfigurationError, match="BITBUCKET_PASSWORD"):
+        config.BITBUCKET_PASSWORD
+
+    environment["BITBUCKET_WORKSPACE"] = "other"
+    assert config.BITBUCKET_WORKSPACE == "workspace"
+    config.reload()
+    assert config.BITBUCKET_WORKSPACE == "other"
+    with pytest.raises(AttributeError):
+        config.UNKNOWN_SETTING
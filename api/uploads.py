@@ -0,0 +1,209 @@
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Limits of a single /src commit before the tree is split into several chained commits
+DEFAULT_MAX_FILES_PER_COMMIT = 200
+DEFAULT_MAX_BYTES_PER_COMMIT = 50 * 1024 * 1024
+
+
+class UploadFile:
+    """
+    A file to upload: its path in the repository and either a local path or in-memory content.
+    """
+    __slots__ = ("repo_path", "local_path", "content", "size")
+
+    def __init__(self, repo_path, local_path=None, content=None):
+        self.repo_path = repo_path.replace(os.sep, "/").lstrip("/")
+        self.local_path = local_path
+        self.content = content
+        self.size = len(content) if content is not None else os.path.getsize(local_path)
+
+
+def collect_upload_files(paths_or_iterable):
+    """
+    Normalizes the input of `Repositories.commit_files` into UploadFile objects, lazily.
+
+    Accepted inputs:
+    - a directory: every file below it is uploaded with its path relative to the directory,
+    - an iterable of local file paths: uploaded under the same (relative) path,
+    - an iterable of (repo_path, source) tuples, where source is a local path or bytes.
+    """
+    if isinstance(paths_or_iterable, (str, os.PathLike)) and os.path.isdir(paths_or_iterable):
+        root = os.fspath(paths_or_iterable)
+        for directory, directory_names, file_names in os.walk(root):
+            directory_names[:] = sorted(name for name in directory_names if name != ".git")
+            for file_name in sorted(file_names):
+                local_path = os.path.join(directory, file_name)
+                yield UploadFile(os.path.relpath(local_path, root), local_path=local_path)
+        return
+
+    if isinstance(paths_or_iterable, (str, os.PathLike)):
+        paths_or_iterable = [paths_or_iterable]
+    for item in paths_or_iterable:
+        if isinstance(item, UploadFile):
+            yield item
+        elif isinstance(item, tuple):
+            repo_path, source = item
+            if isinstance(source, (bytes, bytearray)):
+                yield UploadFile(repo_path, content=bytes(source))
+            else:
+                yield UploadFile(repo_path, local_path=os.fspath(source))
+        else:
+            yield UploadFile(os.path.normpath(os.fspath(item)), local_path=os.fspath(item))
+
+
+def iter_commit_batches(files, max_files=DEFAULT_MAX_FILES_PER_COMMIT, max_bytes=DEFAULT_MAX_BYTES_PER_COMMIT):
+    """
+    Splits files into batches that each fit into a single commit request.
+    A file larger than `max_bytes` gets a batch of its own.
+    """
+    batch, batch_bytes = [], 0
+    for upload_file in files:
+        if batch and (len(batch) >= max_files or batch_bytes + upload_file.size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(upload_file)
+        batch_bytes += upload_file.size
+    if batch:
+        yield batch
+
+
+def _quote(value):
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class UploadProgress:
+    """
+    Progress of a (possibly multi-commit) upload, passed to progress callbacks.
+    """
+
+    def __init__(self, total_files=None):
+        self.bytes_sent = 0
+        self.files_committed = 0
+        self.commits = 0
+        self.total_files = total_files
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self):
+        """
+        Upload throughput in bytes per second.
+        """
+        return self.bytes_sent / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"UploadProgress(commits={self.commits}, files={self.files_committed}, "
+                f"bytes={self.bytes_sent}, throughput={self.throughput / 1024 / 1024:.2f} MiB/s)")
+
+
+class MultipartStream:
+    """
+    File-like multipart/form-data body that reads file contents from disk only while it is being sent.
+
+    Its length is known up front, so requests sends it with a Content-Length header in
+    fixed-size chunks instead of building the whole body in memory.
+    """
+
+    def __init__(self, fields, files, on_read=None):
+        """
+        :param fields: List of (name, value) form fields.
+        :param files: List of UploadFile objects, sent as file fields named after their repository path.
+        :param on_read: Optional callback receiving the number of bytes read from the stream.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.on_read = on_read
+        self._segments = []
+        for name, value in fields:
+            self._segments.append(self._part_header(name) + str(value).encode() + b"\r\n")
+        for upload_file in files:
+            self._segments.append(self._part_header(upload_file.repo_path, upload_file.repo_path))
+            self._segments.append(upload_file)
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode())
+        self._length = sum(segment.size if isinstance(segment, UploadFile) else len(segment)
+                           for segment in self._segments)
+        self.seek(0)
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, name, file_name=None):
+        disposition = f'form-data; name="{_quote(name)}"'
+        if file_name is not None:
+            disposition += f'; filename="{_quote(os.path.basename(file_name))}"'
+            return (f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+                    f"Content-Type: application/octet-stream\r\n\r\n").encode()
+        return f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n\r\n".encode()
+
+    def __len__(self):
+        return self._length
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """
+        Only rewinding to the start is supported, so a retried request can send the body again.
+        """
+        if offset != 0 or whence != os.SEEK_SET:
+            raise OSError("MultipartStream can only be rewound to the start")
+        self.close()
+        self._index = 0
+        self._offset = 0
+        self._handle = None
+        return 0
+
+    def tell(self):
+        return sum(segment.size if isinstance(segment, UploadFile) else len(segment)
+                   for segment in self._segments[:self._index]) + self._offset
+
+    def _read_segment(self, size):
+        segment = self._segments[self._index]
+        segment_size = segment.size if isinstance(segment, UploadFile) else len(segment)
+        if segment_size == 0:
+            self._index += 1
+            return b""
+        if isinstance(segment, UploadFile) and segment.content is None:
+            if self._handle is None:
+                self._handle = open(segment.local_path, "rb")
+            data = self._handle.read(min(size, segment.size - self._offset))
+            if not data:
+                raise OSError(f"File changed size while uploading: {segment.local_path}")
+        else:
+            content = segment.content if isinstance(segment, UploadFile) else segment
+            data = content[self._offset:self._offset + size]
+        self._offset += len(data)
+
+        if self._offset >= segment_size:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            self._index += 1
+            self._offset = 0
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        chunks = []
+        remaining = size
+        while remaining > 0 and self._index < len(self._segments):
+            data = self._read_segment(remaining)
+            chunks.append(data)
+            remaining -= len(data)
+        data = b"".join(chunks)
+        if data and self.on_read is not None:
+            self.on_read(len(data))
+        return data
+
+    def close(self):
+        handle = getattr(self, "_handle", None)
+        if handle is not None:
+            handle.close()
+            self._handle = None
@@ -1,48 +1,162 @@
+import functools
 import logging
 import os
-import sys
-
-from dotenv import load_dotenv
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
-# Load .env file
-load_dotenv()
-
-# TODO: add handling when env is not defined
-BITBUCKET_USERNAME = os.getenv("BITBUCKET_USERNAME")
-BITBUCKET_APP_PASSWORD = os.getenv("BITBUCKET_APP_PASSWORD")
-BITBUCKET_PASSWORD = os.getenv("BITBUCKET_PASSWORD")
-BITBUCKET_USERNAME_EMAIL = os.getenv("BITBUCKET_USERNAME_EMAIL")
-BITBUCKET_WORKSPACE = os.getenv("BITBUCKET_WORKSPACE")
-BITBUCKET_SECOND_USERNAME_EMAIL = os.getenv("BITBUCKET_SECOND_USERNAME_EMAIL")
-BITBUCKET_SECOND_USER_PASSWORD = os.getenv("BITBUCKET_SECOND_USER_PASSWORD")
-BITBUCKET_SECOND_USERNAME_NAME = os.getenv("BITBUCKET_SECOND_USERNAME_NAME")
-
-if not BITBUCKET_USERNAME:
-    logger.error("Environment variable BITBUCKET_USERNAME is not defined or is empty.")
-if not BITBUCKET_APP_PASSWORD:
-    logger.error("Environment variable BITBUCKET_APP_PASSWORD is not defined or is empty.")
-if not BITBUCKET_PASSWORD:
-    logger.error("Environment variable BITBUCKET_PASSWORD is not defined or is empty.")
-if not BITBUCKET_USERNAME_EMAIL:
-    logger.error("Environment variable BITBUCKET_USERNAME_EMAIL is not defined or is empty.")
-if not BITBUCKET_WORKSPACE:
-    logger.error("Environment variable BITBUCKET_WORKSPACE is not defined or is empty.")
-if not BITBUCKET_SECOND_USERNAME_EMAIL:
-    logger.error("Environment variable BITBUCKET_SECOND_USERNAME_EMAIL is not defined or is empty.")
-if not BITBUCKET_SECOND_USER_PASSWORD:
-    logger.error("Environment variable BITBUCKET_SECOND_USER_PASSWORD is not defined or is empty.")
-if not BITBUCKET_SECOND_USERNAME_NAME:
-    logger.error("Environment variable BITBUCKET_SECOND_USERNAME_NAME is not defined or is empty.")
-
-# If all required variables are set, log success
-if all([BITBUCKET_USERNAME, BITBUCKET_APP_PASSWORD, BITBUCKET_PASSWORD, BITBUCKET_USERNAME_EMAIL, BITBUCKET_WORKSPACE,
-        BITBUCKET_SECOND_USERNAME_EMAIL, BITBUCKET_SECOND_USER_PASSWORD, BITBUCKET_SECOND_USERNAME_NAME]):
-    logger.info("All environment variables are set up correctly.")
-else:
-    logger.info("Not all environment variables are set up correctly.")
-    sys.exit(1)
-
-BASE_API_URL = "https://api.bitbucket.org/2.0"
-BITBUCKET_UI_URL = "https://bitbucket.org"
+# Settings are resolved lazily: importing this module is cheap and never fails, a missing variable only raises
+# (a ConfigurationError) when a setting that needs it is used. `settings(profile)` validates at once every variable
+# a kind of test needs, e.g. `settings("api")` does not require the UI users. The module attributes
+# (`config.BITBUCKET_WORKSPACE`, ...) resolve to the fields of the shared, cached Settings object.
+
+# Set once the .env file was read, pytest-xdist workers inherit the environment and skip reading it again
+DOTENV_LOADED = "BITBUCKET_DOTENV_LOADED"
+
+DEFAULT_API_URL = "https://api.bitbucket.org/2.0"
+DEFAULT_UI_URL = "https://bitbucket.org"
+# Requests per second per workspace of the shared request scheduler, "0" disables client side rate limiting
+DEFAULT_RATE_LIMIT = "10"
+
+
+class ConfigurationError(RuntimeError):
+    """
+    Raised when a required environment variable is not defined or is empty.
+    """
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed view of the environment variables of the test suite, see `ENVIRONMENT` for their names.
+    """
+    username: str = None
+    app_password: str = None
+    password: str = None
+    username_email: str = None
+    workspace: str = None
+    second_username_email: str = None
+    second_user_password: str = None
+    second_username_name: str = None
+    # Can be pointed at a local fake server (see `fake_bitbucket` and `pytest --fake-bitbucket`)
+    api_url: str = DEFAULT_API_URL
+    ui_url: str = DEFAULT_UI_URL
+    rate_limit: str = DEFAULT_RATE_LIMIT
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        values = {name: environ.get(variable) or None for name, (variable, _) in ENVIRONMENT.items()}
+        return cls(**{name: value for name, value in values.items() if value is not None})
+
+    def missing(self, profile="all"):
+        """
+        :return: Names of the environment variables the profile needs but which are not set.
+        """
+        return [ENVIRONMENT[name][0] for name in PROFILES[profile] if not getattr(self, name)]
+
+    def require(self, profile="all"):
+        """
+        Validates that every variable of a profile is set.
+
+        :param profile: "api", "git", "ui" or "all".
+        :return: The settings themselves.
+        :raises ConfigurationError: Listing every missing variable.
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown settings profile {profile!r}, expected one of {', '.join(PROFILES)}")
+        missing = self.missing(profile)
+        if missing:
+            raise ConfigurationError(f"Environment variables required by the '{profile}' settings are not defined "
+                                     f"or are empty: {', '.join(missing)}")
+        return self
+
+
+# Settings field -> (environment variable, module attribute)
+ENVIRONMENT = {
+    "username": ("BITBUCKET_USERNAME", "BITBUCKET_USERNAME"),
+    "app_password": ("BITBUCKET_APP_PASSWORD", "BITBUCKET_APP_PASSWORD"),
+    "password": ("BITBUCKET_PASSWORD", "BITBUCKET_PASSWORD"),
+    "username_email": ("BITBUCKET_USERNAME_EMAIL", "BITBUCKET_USERNAME_EMAIL"),
+    "workspace": ("BITBUCKET_WORKSPACE", "BITBUCKET_WORKSPACE"),
+    "second_username_email": ("BITBUCKET_SECOND_USERNAME_EMAIL", "BITBUCKET_SECOND_USERNAME_EMAIL"),
+    "second_user_password": ("BITBUCKET_SECOND_USER_PASSWORD", "BITBUCKET_SECOND_USER_PASSWORD"),
+    "second_username_name": ("BITBUCKET_SECOND_USERNAME_NAME", "BITBUCKET_SECOND_USERNAME_NAME"),
+    "api_url": ("BITBUCKET_API_URL", "BASE_API_URL"),
+    "ui_url": ("BITBUCKET_UI_URL", "BITBUCKET_UI_URL"),
+    "rate_limit": ("BITBUCKET_RATE_LIMIT", "BITBUCKET_RATE_LIMIT"),
+}
+ATTRIBUTES = {attribute: name for name, (_, attribute) in ENVIRONMENT.items()}
+
+# Settings needed by each kind of test
+_API = ("username", "app_password", "workspace")
+PROFILES = {
+    "api": _API,
+    "git": _API,
+    "ui": _API + ("password", "username_email", "second_username_email", "second_user_password",
+                  "second_username_name"),
+    "all": tuple(name for name in ENVIRONMENT if name not in ("api_url", "ui_url", "rate_limit")),
+}
+
+
+def load_environment():
+    """
+    Reads the .env file into the environment, once per process tree. Variables already set are kept.
+    """
+    if os.environ.get(DOTENV_LOADED):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        logger.debug("python-dotenv is not installed, the .env file is not read")
+    else:
+        load_dotenv()
+    os.environ[DOTENV_LOADED] = "1"
+
+
+@functools.lru_cache(maxsize=None)
+def _load():
+    load_environment()
+    return Settings.from_environment()
+
+
+@functools.lru_cache(maxsize=None)
+def settings(profile=None):
+    """
+    The settings of the test suite, resolved from the environment on first use and cached.
+
+    :param profile: If given ("api", "git", "ui" or "all"), the variables of the profile are validated.
+    :raises ConfigurationError: If a variable of the profile is missing.
+    """
+    resolved = _load()
+    return resolved if profile is None else resolved.require(profile)
+
+
+def reload():
+    """
+    Drops the cached settings, so they are resolved again from the (changed) environment.
+    Module attributes assigned directly (e.g. `config.BASE_API_URL = ...`) are removed as well.
+    """
+    _load.cache_clear()
+    settings.cache_clear()
+    for attribute in ATTRIBUTES:
+        globals().pop(attribute, None)
+
+
+def __getattr__(attribute):
+    """
+    Resolves the module attributes (e.g. `config.BITBUCKET_WORKSPACE`) from the shared settings.
+    """
+    name = ATTRIBUTES.get(attribute)
+    if name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {attribute!r}")
+    value = getattr(settings(), name)
+    if value is None:
+        raise ConfigurationError(f"Environment variable {ENVIRONMENT[name][0]} is not defined or is empty.")
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(ATTRIBUTES))
+
+
@@ -0,0 +1,209 @@
+import logging
+import os
+
+import pytest
+
+from api.cassette import DEFAULT_CASSETTE_DIR, MODES
+
+logger = logging.getLogger(__name__)
+
+# Settings of the fake server and of replayed runs, only used when they are not defined already
+FAKE_ENVIRONMENT = {
+    "BITBUCKET_USERNAME": "fake-user",
+    "BITBUCKET_APP_PASSWORD": "fake-app-password",
+    "BITBUCKET_PASSWORD": "fake-password",
+    "BITBUCKET_USERNAME_EMAIL": "fake-user@bitbucket.invalid",
+    "BITBUCKET_WORKSPACE": "fake-workspace",
+    "BITBUCKET_SECOND_USERNAME_EMAIL": "fake-second-user@bitbucket.invalid",
+    "BITBUCKET_SECOND_USER_PASSWORD": "fake-password",
+    "BITBUCKET_SECOND_USERNAME_NAME": "fake-second-user",
+    # Neither the fake server nor replayed cassettes limit the rate of requests
+    "BITBUCKET_RATE_LIMIT": "0",
+}
+
+# Tests using one of these fixtures drive a browser against the Bitbucket web application
+BROWSER_FIXTURES = {"ui_fixture", "login", "driver_pool"}
+# Tests using one of these fixtures talk to Bitbucket outside of the API client, so they cannot be replayed
+REPLAY_UNSUPPORTED_FIXTURES = BROWSER_FIXTURES | {"clone_manager"}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--fake-bitbucket", action="store_true",
+                     default=os.getenv("BITBUCKET_FAKE", "").lower() in ("1", "true", "yes"),
+                     help="Run API and git tests against an in-process fake Bitbucket server instead of bitbucket.org "
+                          "(also enabled by BITBUCKET_FAKE=1). UI tests are skipped.")
+    parser.addoption("--browser-profile", choices=("default", "performance"),
+                     default=os.getenv("BITBUCKET_BROWSER_PROFILE", "default"),
+                     help="Browser profile of the UI tests: 'default' (maximized, regular Chrome) or 'performance' "
+                          "(headless, fixed viewport, no images, extensions or analytics, also selected by "
+                          "BITBUCKET_BROWSER_PROFILE=performance).")
+    parser.addoption("--push-verification", choices=("api", "diff"), default="api",
+                     help="How the git tests verify a push: 'api' checks the commit, its diffstat and file hashes with "
+                          "lightweight API calls, 'diff' downloads and compares the full diff of the commit.")
+    parser.addoption("--cassette", choices=MODES, default=os.getenv("BITBUCKET_CASSETTE", "off"),
+                     help="Record the API responses of the tests into on-disk cassettes, or replay them from there "
+                          "without network access (also selected by BITBUCKET_CASSETTE). Git and UI tests are "
+                          "skipped in replay mode.")
+    parser.addoption("--cassette-dir", default=os.getenv("BITBUCKET_CASSETTE_DIR", DEFAULT_CASSETTE_DIR),
+                     help="Directory of the cassettes, one per test module.")
+
+
+def pytest_cmdline_main(config):
+    """
+    Keeps each test module on one pytest-xdist worker when cassettes are recorded or replayed: a module cassette is
+    written by a single process, and its requests are replayed in the order they were recorded.
+    Runs after the hook of pytest-xdist (tryfirst), which turns `-n` into `--dist load`.
+    """
+    if config.getoption("--cassette") == "off" or getattr(config.option, "dist", "no") in ("no", "loadfile"):
+        return
+    if config.option.dist != "load":
+        raise pytest.UsageError(f"--cassette {config.getoption('--cassette')} needs --dist loadfile, "
+                                f"not --dist {config.option.dist}")
+    # The default distribution of `-n` splits modules across the workers
+    config.option.dist = "loadfile"
+
+
+def pytest_configure(config):
+    """
+    Starts one fake Bitbucket server per process (i.e. per pytest-xdist worker) and points `config` at it,
+    before any test module imports the settings. Replaying cassettes needs no credentials either.
+    """
+    if config.getoption("--cassette") == "replay":
+        _replay_environment(config.getoption("--cassette-dir"))
+    if not config.getoption("--fake-bitbucket"):
+        return
+
+    from fake_bitbucket import FakeBitbucketServer
+
+    server = FakeBitbucketServer().start()
+    config.fake_bitbucket_server = server
+    for name, value in FAKE_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    os.environ["BITBUCKET_API_URL"] = server.api_url
+    os.environ["BITBUCKET_UI_URL"] = server.url
+
+    import config as settings
+    # The settings may have been resolved already, e.g. by a plugin importing the API client
+    settings.reload()
+
+
+def _replay_environment(cassette_dir):
+    """
+    Nothing is sent in replay mode, so placeholders stand in for the credentials that are not defined.
+    The workspace is part of the recorded paths, the one of the recording run is used.
+    """
+    import config as settings
+    from api.cassette import read_metadata
+
+    # Variables of the .env file take precedence over the placeholders
+    settings.load_environment()
+    for name, value in FAKE_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    workspace = read_metadata(cassette_dir).get("workspace")
+    if workspace:
+        os.environ["BITBUCKET_WORKSPACE"] = workspace
+    settings.reload()
+
+
+def pytest_unconfigure(config):
+    server = getattr(config, "fake_bitbucket_server", None)
+    if server is not None:
+        server.stop()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cassette_adapter(request):
+    """
+    Records the responses of the Bitbucket API (`config.BASE_API_URL` on the shared session) into cassettes,
+    or replays them, depending on `--cassette`. Requests made outside of test modules (e.g. by the `resources`
+    fixture) go to a cassette of the session.
+    """
+    mode = request.config.getoption("--cassette")
+    if mode == "off":
+        yield None
+        return
+
+    import config as settings
+    from api.cassette import Cassette, CassetteAdapter, cassette_path, write_metadata
+    from api.session import get_shared_session
+
+    cassette_dir = request.config.getoption("--cassette-dir")
+    if mode == "record":
+        write_metadata(cassette_dir, workspace=settings.settings("api").workspace)
+    adapter = CassetteAdapter(mode).mount(get_shared_session(), settings.BASE_API_URL)
+    worker_id = os.getenv("PYTEST_XDIST_WORKER", "main")
+    cassette = Cassette(cassette_path(cassette_dir, f"session-{worker_id}"), mode)
+    adapter.use(cassette)
+    yield adapter
+    adapter.use(None)
+    cassette.close()
+    if mode == "replay":
+        logger.info(f"Replayed {adapter.hits} responses, {adapter.misses} requests were not recorded")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cassette_module(request, cassette_adapter):
+    """
+    Switches the cassette adapter to the cassette of the test module, e.g. `cassettes/api__tests__test_basic`.
+    """
+    if cassette_adapter is None:
+        yield None
+        return
+
+    from api.cassette import Cassette, cassette_path
+
+    cassette = Cassette(cassette_path(request.config.getoption("--cassette-dir"), request.node.nodeid),
+                        cassette_adapter.mode)
+    previous = cassette_adapter.use(cassette)
+    yield cassette
+    cassette_adapter.use(previous)
+    cassette.close()
+
+
+@pytest.fixture(scope="session")
+def resources(cassette_adapter):
+    """
+    Leases repository names and local directories unique to this run and pytest-xdist worker, so workers
+    never share a resource. Leaked repositories of earlier runs are reaped first, and everything leased
+    is deleted in bulk when the session ends.
+    """
+    import config as settings
+    from api.repositories import Repositories
+    from api.resources import ResourceLeases
+
+    if cassette_adapter is None:
+        leases = ResourceLeases()
+    else:
+        # Recorded requests name the repositories, so the names depend neither on the run nor on the worker
+        # a module runs on. Modules never share a repository name, and each runs on a single worker.
+        leases = ResourceLeases(run_id="cassette", worker_id="main")
+    api = settings.settings("api")
+    client = Repositories((api.username, api.app_password), api.workspace)
+    # Replayed runs create nothing, and must not depend on what earlier runs left behind
+    replaying = cassette_adapter is not None and cassette_adapter.mode == "replay"
+    first_worker = os.getenv("PYTEST_XDIST_WORKER", "main") in ("main", "gw0")
+    if first_worker and not replaying:
+        try:
+            leases.reap_stale(client)
+        except Exception as e:
+            logger.warning(f"Failed to reap stale test repositories: {e!r}")
+    yield leases
+    if replaying:
+        return
+    report = leases.reap(client)
+    if report is not None and not report.ok:
+        logger.warning(report.summary())
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--cassette") == "replay":
+        skip_replay = pytest.mark.skip(reason="Git transport and browsers are not recorded in cassettes")
+        for item in items:
+            if REPLAY_UNSUPPORTED_FIXTURES.intersection(getattr(item, "fixturenames", ())):
+                item.add_marker(skip_replay)
+    if not config.getoption("--fake-bitbucket"):
+        return
+    skip_ui = pytest.mark.skip(reason="UI tests need the real Bitbucket web application")
+    for item in items:
+        if BROWSER_FIXTURES.intersection(getattr(item, "fixturenames", ())):
+            item.add_marker(skip_ui)
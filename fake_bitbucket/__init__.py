@@ -0,0 +1,3 @@
+from fake_bitbucket.server import FakeBitbucketServer
+
+__all__ = ["FakeBitbucketServer"]
@@ -0,0 +1,101 @@
+import copy
+import re
+
+# A single BBQL comparison, e.g. name ~ "test-" or state = "OPEN"
+CONDITION = re.compile(r'^\s*(?P<field>[\w.]+)\s*(?P<op>!=|!~|=|~)\s*(?P<value>"[^"]*"|\S+)\s*$')
+
+
+def _lookup(obj, path):
+    for name in path.split("."):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(name)
+    return obj
+
+
+def _condition_matches(obj, condition):
+    match = CONDITION.match(condition)
+    if match is None:
+        raise ValueError(f"Unsupported query: {condition}")
+    actual = _lookup(obj, match["field"])
+    expected = match["value"].strip('"')
+    actual = "" if actual is None else str(actual)
+    op = match["op"]
+    if op == "=":
+        return actual == expected
+    if op == "!=":
+        return actual != expected
+    if op == "~":
+        return expected.lower() in actual.lower()
+    return expected.lower() not in actual.lower()
+
+
+def matches_query(obj, query):
+    """
+    Evaluates a subset of the Bitbucket query language (`q=`): comparisons with =, !=, ~ and !~
+    joined by AND / OR (AND binds tighter, no parentheses).
+    """
+    if not query:
+        return True
+    return any(all(_condition_matches(obj, condition) for condition in re.split(r"\s+AND\s+", alternative))
+               for alternative in re.split(r"\s+OR\s+", query))
+
+
+def _include(obj, path):
+    if isinstance(obj, list):
+        return [_include(item, path) for item in obj]
+    if not isinstance(obj, dict) or not path:
+        return obj
+    name, rest = path[0], path[1:]
+    if name == "*":
+        return {key: _include(value, rest) for key, value in obj.items()}
+    if name not in obj:
+        return {}
+    return {name: _include(obj[name], rest)}
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif isinstance(value, list) and isinstance(target.get(key), list):
+            for target_item, source_item in zip(target[key], value):
+                if isinstance(target_item, dict) and isinstance(source_item, dict):
+                    _merge(target_item, source_item)
+        else:
+            target[key] = value
+    return target
+
+
+def _exclude(obj, path):
+    if isinstance(obj, list):
+        for item in obj:
+            _exclude(item, path)
+    elif isinstance(obj, dict) and path:
+        if len(path) == 1:
+            obj.pop(path[0], None)
+        elif path[0] in obj:
+            _exclude(obj[path[0]], path[1:])
+
+
+def project(obj, fields):
+    """
+    Applies a Bitbucket partial response projection (`fields=`) to a JSON document.
+
+    Plain names select only the listed fields (`values.name,next`), `*` matches any field,
+    while `+name` / `-name` add to or remove from the full document.
+    """
+    if not fields:
+        return obj
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if all(name[0] in "+-" for name in names):
+        result = copy.deepcopy(obj)
+        for name in names:
+            if name.startswith("-"):
+                _exclude(result, name[1:].split("."))
+        return result
+
+    result = {}
+    for name in names:
+        _merge(result, _include(obj, name.lstrip("+").split(".")))
+    return result
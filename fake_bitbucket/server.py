@@ -0,0 +1,592 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode, unquote
+
+from fake_bitbucket.query import matches_query, project
+from fake_bitbucket.storage import FakeRepository, GitError
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_PATH = r"^/2\.0/repositories/(?P<workspace>[^/]+)"
+REPO_PATH = WORKSPACE_PATH + r"/(?P<repo>[^/]+)"
+GIT_PATH = r"^/(?P<workspace>[^/]+)/(?P<repo>[^/]+?)\.git"
+DEFAULT_PAGELEN = 10
+MAX_PAGELEN = 100
+
+
+class FakeBitbucketHandler(BaseHTTPRequestHandler):
+    """
+    Request handler emulating the subset of the Bitbucket REST API used by `api.repositories.Repositories`,
+    plus git smart HTTP for clones and pushes.
+    HTTP/1.1 is used so that clients can keep connections alive between requests.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", re.compile(WORKSPACE_PATH + r"/?$"), "list_repositories"),
+        ("GET", re.compile(REPO_PATH + r"/refs/branches/?$"), "list_branches"),
+        ("GET", re.compile(REPO_PATH + r"/pullrequests/?$"), "list_pull_requests"),
+        ("GET", re.compile(REPO_PATH + r"/?$"), "get_repository"),
+        ("POST", re.compile(REPO_PATH + r"/?$"), "create_repository"),
+        ("DELETE", re.compile(REPO_PATH + r"/?$"), "delete_repository"),
+        ("GET", re.compile(REPO_PATH + r"/refs/branches/(?P<branch>.+)$"), "get_branch"),
+        ("POST", re.compile(REPO_PATH + r"/refs/branches/?$"), "create_branch"),
+        ("POST", re.compile(REPO_PATH + r"/src/?$"), "create_commit"),
+        ("GET", re.compile(REPO_PATH + r"/src/(?P<revision>[^/]+)/(?P<path>.*)$"), "get_source"),
+        ("GET", re.compile(REPO_PATH + r"/diff/(?P<spec>.+)$"), "get_diff"),
+        ("GET", re.compile(REPO_PATH + r"/diffstat/(?P<spec>.+)$"), "get_diffstat"),
+        ("GET", re.compile(REPO_PATH + r"/commit/(?P<revision>[^/]+)/?$"), "get_commit"),
+        ("POST", re.compile(REPO_PATH + r"/pullrequests/?$"), "create_pull_request"),
+        ("GET", re.compile(REPO_PATH + r"/pullrequests/(?P<pullrequest_id>\d+)/?$"), "get_pull_request"),
+        ("POST", re.compile(REPO_PATH + r"/pullrequests/(?P<pullrequest_id>\d+)/approve/?$"), "approve_pull_request"),
+        ("POST", re.compile(REPO_PATH + r"/pullrequests/(?P<pullrequest_id>\d+)/merge/?$"), "merge_pull_request"),
+        ("GET", re.compile(REPO_PATH + r"/permissions-config/(?P<kind>users|groups)/(?P<subject>[^/]+)$"),
+         "get_permission"),
+        ("PUT", re.compile(REPO_PATH + r"/permissions-config/(?P<kind>users|groups)/(?P<subject>[^/]+)$"),
+         "set_permission"),
+        ("DELETE", re.compile(REPO_PATH + r"/permissions-config/(?P<kind>users|groups)/(?P<subject>[^/]+)$"),
+         "delete_permission"),
+        ("GET", re.compile(r"^/2\.0/workspaces/(?P<workspace>[^/]+)/members/?$"), "list_members"),
+        ("GET", re.compile(GIT_PATH + r"/(?P<service>info/refs)$"), "git_http"),
+        ("POST", re.compile(GIT_PATH + r"/(?P<service>git-upload-pack|git-receive-pack)$"), "git_http"),
+    ]
+
+    def setup(self):
+        super().setup()
+        self.server.fake.record_connection()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Skip the (empty) trailer section
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        parts = urlsplit(self.path)
+        self.query = parse_qs(parts.query)
+        self.body = self._read_body()
+        fake.record_request(method, parts.path)
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        fault = fake.take_fault(method, parts.path)
+        if fault is not None:
+            status, headers = fault
+            self.send_json(status, {"type": "error", "error": {"message": f"Injected fault {status}"}}, headers)
+            return
+
+        for route_method, pattern, handler_name in self.ROUTES:
+            match = pattern.match(parts.path)
+            if route_method == method and match:
+                try:
+                    getattr(self, handler_name)(**{name: unquote(value) for name, value in match.groupdict().items()})
+                except GitError as e:
+                    logger.error(e)
+                    self.send_error_json(500, str(e))
+                return
+        self.send_error_json(404, f"No route for {method} {parts.path}")
+
+    def send_bytes(self, status, body, content_type=None, headers=None):
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload=None, headers=None):
+        if status == 200 and "fields" in self.query:
+            payload = project(payload, self.query["fields"][-1])
+        body = b"" if payload is None else json.dumps(payload).encode()
+        headers = dict(headers or {})
+        if self.command == "GET" and status == 200:
+            headers["ETag"] = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                status, body, payload = 304, b"", None
+        self.send_bytes(status, body, "application/json" if payload is not None else None, headers)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {"type": "error", "error": {"message": message}})
+
+    def form_fields(self):
+        """
+        Parses a multipart or url-encoded request body into a mapping of field name to bytes.
+        """
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser(policy=HTTP).parsebytes(
+                b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + self.body)
+            return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                    for part in message.iter_parts()}
+        return {name: values[-1].encode() for name, values in parse_qs(self.body.decode()).items()}
+
+    def send_page(self, values):
+        """
+        Sends one page of a paginated collection, filtered by the `q` query parameter.
+        """
+        query = self.query.get("q", [None])[-1]
+        try:
+            values = [value for value in values if matches_query(value, query)]
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        pagelen = min(int(self.query.get("pagelen", [DEFAULT_PAGELEN])[-1]), MAX_PAGELEN)
+        page = int(self.query.get("page", [1])[-1])
+        page_values = values[(page - 1) * pagelen:page * pagelen]
+        payload = {"pagelen": pagelen, "page": page, "size": len(values), "values": page_values}
+        if page * pagelen < len(values):
+            params = {name: value[-1] for name, value in self.query.items()}
+            params["page"] = page + 1
+            payload["next"] = f"{self.server.fake.url}{urlsplit(self.path).path}?{urlencode(params)}"
+        self.send_json(200, payload)
+
+    def _repository(self, workspace, repo):
+        repository = self.server.fake.repositories.get((workspace, repo))
+        if repository is None:
+            self.send_error_json(404, "Repository not found")
+        return repository
+
+    def list_repositories(self, workspace):
+        fake = self.server.fake
+        with fake.lock:
+            repositories = [repository for (repo_workspace, _), repository in fake.repositories.items()
+                            if repo_workspace == workspace]
+        self.send_page([repository.to_json() for repository in repositories])
+
+    def list_branches(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is not None:
+            branches = repository.branches
+            self.send_page([repository.branch_to_json(name, branches[name]) for name in sorted(branches)])
+
+    def list_pull_requests(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is not None:
+            states = self.query.get("state", ["OPEN"])
+            self.send_page([pullrequest for pullrequest in repository.pullrequests if pullrequest["state"] in states])
+
+    def get_repository(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is not None:
+            self.send_json(200, repository.to_json())
+
+    def create_repository(self, workspace, repo):
+        repository = self.server.fake.add_repository(workspace, repo, json.loads(self.body or b"{}"))
+        if repository is None:
+            self.send_error_json(400, "Repository with this Slug and Owner already exists.")
+            return
+        self.send_json(200, repository.to_json())
+
+    def delete_repository(self, workspace, repo):
+        if not self.server.fake.remove_repository(workspace, repo):
+            self.send_error_json(404, "Repository not found")
+            return
+        self.send_json(204)
+
+    def get_branch(self, workspace, repo, branch):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        commit_hash = repository.branches.get(branch)
+        if commit_hash is None:
+            self.send_error_json(404, f"Branch not found: {branch}")
+            return
+        self.send_json(200, repository.branch_to_json(branch, commit_hash))
+
+    def create_branch(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        payload = json.loads(self.body or b"{}")
+        with repository.lock:
+            target = repository.resolve(payload.get("target", {}).get("hash", ""))
+            if target is None:
+                self.send_error_json(400, "Target of the branch does not exist")
+                return
+            if payload["name"] in repository.branches:
+                self.send_error_json(400, f"Branch {payload['name']} already exists")
+                return
+            repository.create_branch(payload["name"], target)
+        self.send_json(201, repository.branch_to_json(payload["name"], target))
+
+    def create_commit(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        fields = self.form_fields()
+        message = fields.pop("message", b"").decode()
+        branch = fields.pop("branch", b"main").decode()
+        parent = fields.pop("parents", b"").decode() or None
+        fields.pop("author", None)
+        deleted = [path.decode() for path in fields.pop("files", b"").split(b"\n") if path]
+        files = dict(fields)
+        files.update({path: None for path in deleted})
+        commit_hash = repository.commit(branch, message, files, parent=parent)
+        self.send_json(201, headers={"Location": f"{self.server.fake.api_url}/repositories/{workspace}/{repo}/"
+                                                 f"commit/{commit_hash}"})
+
+    def get_source(self, workspace, repo, revision, path):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        commit_hash = repository.resolve(revision)
+        content = repository.read_file(commit_hash, path) if commit_hash else None
+        if content is None:
+            self.send_error_json(404, f"No such file or directory: {path}")
+            return
+        self.send_bytes(200, content, "text/plain")
+
+    def get_diff(self, workspace, repo, spec):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        if not all(repository.resolve(revision) for revision in spec.split("..")):
+            self.send_error_json(404, f"Commit not found: {spec}")
+            return
+        self.send_bytes(200, repository.diff(spec), "text/plain")
+
+    def get_diffstat(self, workspace, repo, spec):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        if not all(repository.resolve(revision) for revision in spec.split("..")):
+            self.send_error_json(404, f"Commit not found: {spec}")
+            return
+        self.send_page(repository.diffstat(spec))
+
+    def get_commit(self, workspace, repo, revision):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        commit = repository.commit_to_json(revision)
+        if commit is None:
+            self.send_error_json(404, f"Commit not found: {revision}")
+            return
+        self.send_json(200, commit)
+
+    def _pull_request(self, repository, pullrequest_id):
+        index = int(pullrequest_id) - 1
+        if not 0 <= index < len(repository.pullrequests):
+            self.send_error_json(404, f"Pull request not found: {pullrequest_id}")
+            return None
+        return repository.pullrequests[index]
+
+    def create_pull_request(self, workspace, repo):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        payload = json.loads(self.body or b"{}")
+        source = payload.get("source", {}).get("branch", {}).get("name")
+        destination = payload.get("destination", {}).get("branch", {}).get("name") or "main"
+        if repository.resolve(source) is None or repository.resolve(destination) is None:
+            self.send_error_json(400, "Source or destination branch does not exist")
+            return
+        if repository.resolve(source) == repository.resolve(destination):
+            self.send_error_json(400, "There are no changes to be pulled")
+            return
+        pullrequest = repository.create_pull_request(payload.get("title", ""), source, destination,
+                                                     payload.get("description", ""))
+        self.send_json(201, pullrequest)
+
+    def get_pull_request(self, workspace, repo, pullrequest_id):
+        repository = self._repository(workspace, repo)
+        pullrequest = repository and self._pull_request(repository, pullrequest_id)
+        if pullrequest is not None:
+            self.send_json(200, pullrequest)
+
+    def approve_pull_request(self, workspace, repo, pullrequest_id):
+        repository = self._repository(workspace, repo)
+        pullrequest = repository and self._pull_request(repository, pullrequest_id)
+        if pullrequest is None:
+            return
+        participant = {"type": "participant", "role": "REVIEWER", "approved": True, "state": "approved",
+                       "user": {"display_name": "fake-user"}}
+        pullrequest["participants"].append(participant)
+        self.send_json(200, participant)
+
+    def merge_pull_request(self, workspace, repo, pullrequest_id):
+        repository = self._repository(workspace, repo)
+        pullrequest = repository and self._pull_request(repository, pullrequest_id)
+        if pullrequest is None:
+            return
+        if pullrequest["state"] != "OPEN":
+            self.send_error_json(400, f"Pull request is {pullrequest['state']}")
+            return
+        payload = json.loads(self.body or b"{}")
+        message = payload.get("message") or f"Merged in {pullrequest['source']['branch']['name']} (pull request " \
+                                            f"#{pullrequest['id']})"
+        try:
+            commit_hash = repository.merge(pullrequest["source"]["branch"]["name"],
+                                           pullrequest["destination"]["branch"]["name"], message)
+        except GitError:
+            self.send_error_json(409, "Merge conflict")
+            return
+        pullrequest["state"] = "MERGED"
+        pullrequest["merge_commit"] = {"type": "commit", "hash": commit_hash}
+        self.send_json(200, pullrequest)
+
+    def _permission_json(self, repository, kind, subject, permission):
+        member = self.server.fake.member(subject) if kind == "users" else None
+        subject_json = ({"type": "user", **(member or {"account_id": subject})} if kind == "users"
+                        else {"type": "group", "slug": subject})
+        return {"type": f"repository_{kind[:-1]}_permission", "permission": permission, kind[:-1]: subject_json,
+                "repository": {"type": "repository", "full_name": f"{repository.workspace}/{repository.slug}"}}
+
+    def get_permission(self, workspace, repo, kind, subject):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        permissions = repository.user_permissions if kind == "users" else repository.group_permissions
+        if subject not in permissions:
+            self.send_error_json(404, f"No explicit permission for {subject}")
+            return
+        self.send_json(200, self._permission_json(repository, kind, subject, permissions[subject]))
+
+    def set_permission(self, workspace, repo, kind, subject):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        permission = json.loads(self.body or b"{}").get("permission")
+        if permission not in ("read", "write", "admin"):
+            self.send_error_json(400, f"Invalid permission: {permission}")
+            return
+        permissions = repository.user_permissions if kind == "users" else repository.group_permissions
+        status = 200 if subject in permissions else 201
+        permissions[subject] = permission
+        self.send_json(status, self._permission_json(repository, kind, subject, permission))
+
+    def delete_permission(self, workspace, repo, kind, subject):
+        repository = self._repository(workspace, repo)
+        if repository is None:
+            return
+        permissions = repository.user_permissions if kind == "users" else repository.group_permissions
+        if permissions.pop(subject, None) is None:
+            self.send_error_json(404, f"No explicit permission for {subject}")
+            return
+        self.send_json(204)
+
+    def list_members(self, workspace):
+        self.send_page([{"type": "workspace_membership", "user": {"type": "user", **member},
+                         "workspace": {"type": "workspace", "slug": workspace}}
+                        for member in self.server.fake.members.get(workspace, [])])
+
+    def git_http(self, workspace, repo, service):
+        """
+        Serves git smart HTTP (clone, fetch and push) by delegating to `git http-backend` as a CGI program.
+        """
+        fake = self.server.fake
+        repository = fake.repositories.get((workspace, repo))
+        if repository is None:
+            self.send_bytes(404, b"Repository not found\n", "text/plain")
+            return
+        repository.ensure_git()
+
+        env = dict(os.environ,
+                   GIT_PROJECT_ROOT=fake.git_root,
+                   GIT_HTTP_EXPORT_ALL="1",
+                   PATH_INFO=f"/{workspace}/{repo}.git/{service}",
+                   QUERY_STRING=urlsplit(self.path).query,
+                   REQUEST_METHOD=self.command,
+                   CONTENT_TYPE=self.headers.get("Content-Type", ""),
+                   CONTENT_LENGTH=str(len(self.body)),
+                   REMOTE_USER="fake",
+                   REMOTE_ADDR=self.client_address[0])
+        if self.headers.get("Content-Encoding"):
+            env["HTTP_CONTENT_ENCODING"] = self.headers["Content-Encoding"]
+        if self.headers.get("Git-Protocol"):
+            env["GIT_PROTOCOL"] = self.headers["Git-Protocol"]
+
+        with repository.lock:
+            result = subprocess.run(["git", "http-backend"], input=self.body, env=env, capture_output=True)
+        raw_headers, _, body = result.stdout.partition(b"\r\n\r\n")
+        status, headers = 200, {}
+        for line in raw_headers.decode().splitlines():
+            name, _, value = line.partition(":")
+            if name.lower() == "status":
+                status = int(value.split()[0])
+            else:
+                headers[name] = value.strip()
+        if result.returncode != 0 and status == 200:
+            logger.error(f"git http-backend failed: {result.stderr.decode(errors='replace')}")
+            status = 500
+        self.send_bytes(status, body, headers.pop("Content-Type", None), headers)
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many short lived connections, the default backlog of 5 is too small for that
+    request_queue_size = 128
+
+
+class FakeBitbucketServer:
+    """
+    In-process fake of Bitbucket, served from a background thread: the REST API plus git smart HTTP.
+    Repositories are backed by bare git repositories, so API commits, clones and pushes share history.
+
+    Intended for hermetic tests and benchmarks. Use it as a context manager and pass `server.api_url`
+    as the `base_url` of `Repositories`, or point `config.BASE_API_URL` / `config.BITBUCKET_UI_URL`
+    at `server.api_url` / `server.url`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, git_root=None):
+        """
+        :param host: Interface to bind to.
+        :param port: Port to bind to, 0 picks a free port.
+        :param latency: Artificial delay (in seconds) added to every request.
+        :param git_root: Directory of the bare repositories, a temporary one removed on stop if None.
+        """
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.repositories = {}
+        self.connections = 0
+        self.requests = []
+        self.faults = []
+        self.members = {}
+        self._owns_git_root = git_root is None
+        self.git_root = git_root or tempfile.mkdtemp(prefix="fake-bitbucket-")
+        self._httpd = _FakeHTTPServer((host, port), FakeBitbucketHandler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/2.0"
+
+    def clone_url(self, workspace, repo):
+        return f"{self.url}/{workspace}/{repo}.git"
+
+    def add_repository(self, workspace, repo, payload=None, files=None):
+        """
+        Creates a repository, optionally with an initial commit on the main branch.
+
+        :param payload: Repository settings as sent to the create endpoint.
+        :param files: Optional mapping of path to bytes for the initial commit.
+        :return: The new FakeRepository, None if it already exists.
+        """
+        with self.lock:
+            if (workspace, repo) in self.repositories:
+                return None
+            repository = FakeRepository(workspace, repo, payload or {}, self.api_url, self.url, self.git_root)
+            self.repositories[(workspace, repo)] = repository
+        if files:
+            repository.commit("main", "Initial commit", files)
+        return repository
+
+    def add_member(self, workspace, nickname, display_name=None):
+        """
+        Adds a user to a workspace, so it can be found through the members endpoint.
+
+        :return: The account id of the user.
+        """
+        digest = hashlib.md5(nickname.encode()).hexdigest()
+        member = {"account_id": f"557058:{digest}", "uuid": "{" + digest + "}", "nickname": nickname,
+                  "display_name": display_name or nickname}
+        with self.lock:
+            self.members.setdefault(workspace, []).append(member)
+        return member["account_id"]
+
+    def member(self, account_id):
+        with self.lock:
+            return next((member for members in self.members.values() for member in members
+                         if account_id in (member["account_id"], member["uuid"])), None)
+
+    def remove_repository(self, workspace, repo):
+        with self.lock:
+            repository = self.repositories.pop((workspace, repo), None)
+        if repository is None:
+            return False
+        repository.delete()
+        return True
+
+    def record_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def record_request(self, method, path):
+        with self.lock:
+            self.requests.append((method, path))
+
+    def fail_next(self, count=1, status=429, headers=None, method=None, path=None):
+        """
+        Makes the next `count` matching requests fail with the given status instead of being handled.
+
+        :param status: Status code of the injected failure, e.g. 429 or 503.
+        :param headers: Extra response headers, e.g. {"Retry-After": "1"}.
+        :param method: Only fail requests with this method, any method if None.
+        :param path: Only fail requests whose path contains this string, any path if None.
+        """
+        with self.lock:
+            self.faults.extend([(status, headers or {}, method, path)] * count)
+
+    def take_fault(self, method, path):
+        with self.lock:
+            for index, (status, headers, fault_method, fault_path) in enumerate(self.faults):
+                if (fault_method is None or fault_method == method) and (fault_path is None or fault_path in path):
+                    del self.faults[index]
+                    return status, headers
+        return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-bitbucket", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Bitbucket server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        if self._owns_git_root:
+            shutil.rmtree(self.git_root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,348 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Hash of the empty tree, used as the diff base of root commits
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+FAKE_AUTHOR = "Fake Bitbucket <fake@bitbucket.invalid>"
+
+
+def _quote_path(path):
+    """
+    Quotes a path for the fast-import stream.
+    """
+    escaped = path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+class GitError(Exception):
+    """
+    Raised when a git command of the fake storage fails.
+    """
+
+
+class FakeRepository:
+    """
+    State of a single fake repository. Metadata and pull requests live in memory, while branches,
+    commits and files are stored in a bare git repository on disk, so API commits, clones and pushes
+    all see the same history.
+
+    The bare repository is only initialized when it is first needed, so creating and deleting
+    thousands of repositories in load tests stays cheap.
+    """
+
+    def __init__(self, workspace, slug, payload, api_url, ui_url, git_root):
+        self.workspace = workspace
+        self.slug = slug
+        self.payload = payload
+        self.api_url = api_url
+        self.ui_url = ui_url
+        self.git_dir = os.path.join(git_root, workspace, f"{slug}.git")
+        self.pullrequests = []
+        # Account id / group slug -> "read", "write" or "admin"
+        self.user_permissions = {}
+        self.group_permissions = {}
+        self.lock = threading.RLock()
+
+    def git(self, *args, input=None, check=True):
+        """
+        Runs a git command in the bare repository.
+
+        :return: The standard output as bytes.
+        """
+        result = subprocess.run(["git", "--git-dir", self.git_dir, *args], input=input, capture_output=True)
+        if check and result.returncode != 0:
+            raise GitError(f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace')}")
+        return result.stdout
+
+    @property
+    def initialized(self):
+        return os.path.isdir(self.git_dir)
+
+    def ensure_git(self):
+        """
+        Creates the bare repository, accepting pushes over smart HTTP, if it does not exist yet.
+        """
+        with self.lock:
+            if not self.initialized:
+                subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=main", self.git_dir],
+                               check=True, capture_output=True)
+                self.git("config", "http.receivepack", "true")
+                # Partial clones (--filter=blob:none) fetch the missing file contents by hash later on
+                self.git("config", "uploadpack.allowFilter", "true")
+                self.git("config", "uploadpack.allowAnySHA1InWant", "true")
+                # Identity of the merge commits created through the API
+                self.git("config", "user.name", FAKE_AUTHOR.split(" <")[0])
+                self.git("config", "user.email", FAKE_AUTHOR.split("<")[1].rstrip(">"))
+        return self.git_dir
+
+    def delete(self):
+        shutil.rmtree(self.git_dir, ignore_errors=True)
+
+    @property
+    def branches(self):
+        """
+        Mapping of branch name to the hash of its head commit.
+        """
+        if not self.initialized:
+            return {}
+        output = self.git("for-each-ref", "--format=%(refname:short) %(objectname)", "refs/heads").decode()
+        return dict(line.rsplit(" ", 1) for line in output.splitlines())
+
+    def resolve(self, revision):
+        """
+        Resolves a branch name or commit hash to a commit hash, None if it does not exist.
+        """
+        if not self.initialized or not revision:
+            return None
+        output = self.git("rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}", check=False).strip()
+        return output.decode() or None
+
+    def create_branch(self, name, target):
+        self.git("update-ref", f"refs/heads/{name}", target, "0" * 40)
+
+    def commit(self, branch, message, files, parent=None):
+        """
+        Creates a commit on top of `branch` (or `parent`), creating the branch from 'main' if needed.
+
+        :param files: Mapping of path to content, None content deletes the file.
+        :return: The new commit hash.
+        """
+        with self.lock:
+            self.ensure_git()
+            # Like Bitbucket, a new branch starts from the main branch
+            parent = parent or self.resolve(branch) or self.resolve("main")
+            stream = [f"commit refs/heads/{branch}".encode(),
+                      f"committer {FAKE_AUTHOR} {int(time.time())} +0000".encode(),
+                      f"data {len(message.encode())}".encode(), message.encode()]
+            if parent:
+                stream.append(f"from {parent}".encode())
+            for path, content in files.items():
+                if content is None:
+                    stream.append(f"D {_quote_path(path)}".encode())
+                else:
+                    stream += [f"M 100644 inline {_quote_path(path)}".encode(),
+                               f"data {len(content)}".encode(), content]
+            self.git("fast-import", "--quiet", "--force", input=b"\n".join(stream) + b"\n")
+            return self.resolve(branch)
+
+    def merge(self, source, destination, message):
+        """
+        Merges branch `source` into branch `destination` with a merge commit.
+
+        :return: The merge commit hash.
+        :raises GitError: If the branches conflict.
+        """
+        with self.lock:
+            source_hash, destination_hash = self.resolve(source), self.resolve(destination)
+            tree = self.git("merge-tree", "--write-tree", destination_hash, source_hash).decode().split()[0]
+            commit_hash = self.git("commit-tree", tree, "-p", destination_hash, "-p", source_hash,
+                                   input=message.encode()).decode().strip()
+            self.git("update-ref", f"refs/heads/{destination}", commit_hash, destination_hash)
+            return commit_hash
+
+    def create_pull_request(self, title, source, destination, description="", author=None):
+        """
+        Opens a pull request between two branches.
+
+        :return: The pull request JSON object.
+        """
+        with self.lock:
+            pullrequest_id = len(self.pullrequests) + 1
+            html_url = f"{self.ui_url}/{self.workspace}/{self.slug}/pull-requests/{pullrequest_id}"
+            pullrequest = {
+                "type": "pullrequest",
+                "id": pullrequest_id,
+                "title": title,
+                "description": description,
+                "state": "OPEN",
+                "author": {"display_name": author or self.workspace},
+                "source": {"branch": {"name": source}, "commit": {"hash": self.resolve(source)}},
+                "destination": {"branch": {"name": destination}, "commit": {"hash": self.resolve(destination)}},
+                "participants": [],
+                "merge_commit": None,
+                "links": {
+                    "self": {"href": f"{self.api_url}/repositories/{self.workspace}/{self.slug}/pullrequests/"
+                                     f"{pullrequest_id}"},
+                    "html": {"href": html_url},
+                },
+            }
+            self.pullrequests.append(pullrequest)
+            return pullrequest
+
+    def commit_info(self, revision):
+        """
+        Reads a commit: its hash, message, parents and the full content of its tree.
+        """
+        commit_hash = self.resolve(revision)
+        if commit_hash is None:
+            return None
+        parents = self.git("rev-list", "--parents", "-n", "1", commit_hash).decode().split()[1:]
+        message = self.git("log", "-1", "--format=%B", commit_hash).decode().rstrip("\n")
+        paths = self.git("ls-tree", "-r", "-z", "--name-only", commit_hash).decode().split("\0")
+        files = {path: self.read_file(commit_hash, path) for path in paths if path}
+        return {"hash": commit_hash, "message": message, "parents": parents, "files": files}
+
+    def read_file(self, revision, path):
+        """
+        Reads the content of a file at a revision, None if it does not exist.
+        """
+        if not self.initialized:
+            return None
+        result = subprocess.run(["git", "--git-dir", self.git_dir, "cat-file", "blob", f"{revision}:{path}"],
+                                capture_output=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def _diff_range(self, spec):
+        """
+        The (base, target) pair of a diff spec: a single commit against its first parent, or a `from..to` range.
+        """
+        if ".." in spec:
+            base, target = spec.split("..", 1)
+            return self.resolve(base), self.resolve(target)
+        commit_hash = self.resolve(spec)
+        parents = self.git("rev-list", "--parents", "-n", "1", commit_hash).decode().split()[1:]
+        return parents[0] if parents else EMPTY_TREE, commit_hash
+
+    def diff(self, spec):
+        """
+        Unified diff of a single commit against its first parent, or of a `from..to` range.
+        """
+        return self.git("diff", "--no-color", *self._diff_range(spec))
+
+    def diffstat(self, spec):
+        """
+        Per-file change summary of a diff spec, in the format of the Bitbucket diffstat endpoint.
+        """
+        base, target = self._diff_range(spec)
+        statuses = dict(line.split("\t", 1)[::-1] for line in
+                        self.git("diff", "--name-status", "--no-renames", base, target).decode().splitlines())
+        stats = []
+        for line in self.git("diff", "--numstat", "--no-renames", base, target).decode().splitlines():
+            added, removed, path = line.split("\t", 2)
+            status = {"A": "added", "D": "removed"}.get(statuses.get(path), "modified")
+            commit_file = {"path": path, "type": "commit_file"}
+            stats.append({
+                "type": "diffstat",
+                "status": status,
+                # Binary files have no line counts
+                "lines_added": int(added) if added.isdigit() else 0,
+                "lines_removed": int(removed) if removed.isdigit() else 0,
+                "old": None if status == "added" else commit_file,
+                "new": None if status == "removed" else commit_file,
+            })
+        return stats
+
+    def commit_to_json(self, revision):
+        """
+        A commit in the format of the Bitbucket commit endpoint, None if it does not exist.
+        """
+        commit_hash = self.resolve(revision)
+        if commit_hash is None:
+            return None
+        output = self.git("log", "-1", "--format=%H%x00%P%x00%an <%ae>%x00%cI%x00%B", commit_hash).decode()
+        commit_hash, parents, author, date, message = output.split("\0", 4)
+        repo_url = f"{self.api_url}/repositories/{self.workspace}/{self.slug}"
+        return {
+            "type": "commit",
+            "hash": commit_hash,
+            "date": date,
+            "message": message,
+            "author": {"type": "author", "raw": author},
+            "parents": [{"type": "commit", "hash": parent} for parent in parents.split()],
+            "links": {
+                "self": {"href": f"{repo_url}/commit/{commit_hash}"},
+                "diff": {"href": f"{repo_url}/diff/{commit_hash}"},
+                "html": {"href": f"{self.ui_url}/{self.workspace}/{self.slug}/commits/{commit_hash}"},
+            },
+        }
+
+    def to_json(self):
+        mainbranch = {"type": "branch", "name": "main"} if self.resolve("main") else None
+        repo_url = f"{self.api_url}/repositories/{self.workspace}/{self.slug}"
+        html_url = f"{self.ui_url}/{self.workspace}/{self.slug}"
+        # Mirrors the shape (and roughly the size) of a real Bitbucket repository object
+        return {
+            "type": "repository",
+            "uuid": "{" + hashlib.md5(f"{self.workspace}/{self.slug}".encode()).hexdigest() + "}",
+            "name": self.slug,
+            "slug": self.slug,
+            "full_name": f"{self.workspace}/{self.slug}",
+            "description": self.payload.get("description", ""),
+            "scm": self.payload.get("scm", "git"),
+            "is_private": self.payload.get("is_private", True),
+            "fork_policy": self.payload.get("fork_policy", "no_public_forks"),
+            "language": self.payload.get("language", ""),
+            "has_issues": False,
+            "has_wiki": False,
+            "created_on": "2024-01-01T00:00:00.000000+00:00",
+            "updated_on": "2024-01-01T00:00:00.000000+00:00",
+            "mainbranch": mainbranch,
+            "owner": {
+                "type": "team",
+                "display_name": self.workspace,
+                "username": self.workspace,
+                "links": {
+                    "self": {"href": f"{self.api_url}/workspaces/{self.workspace}"},
+                    "html": {"href": f"{self.ui_url}/{self.workspace}/"},
+                    "avatar": {"href": f"{self.ui_url}/account/{self.workspace}/avatar/"},
+                },
+            },
+            "workspace": {
+                "type": "workspace",
+                "slug": self.workspace,
+                "name": self.workspace,
+                "links": {
+                    "self": {"href": f"{self.api_url}/workspaces/{self.workspace}"},
+                    "html": {"href": f"{self.ui_url}/{self.workspace}/"},
+                    "avatar": {"href": f"{self.ui_url}/workspaces/{self.workspace}/avatar/"},
+                },
+            },
+            "project": {
+                "type": "project",
+                "key": "PROJ",
+                "name": "Untitled project",
+                "links": {
+                    "self": {"href": f"{self.api_url}/workspaces/{self.workspace}/projects/PROJ"},
+                    "html": {"href": f"{self.ui_url}/{self.workspace}/workspace/projects/PROJ"},
+                    "avatar": {"href": f"{self.ui_url}/{self.workspace}/workspace/projects/PROJ/avatar/32"},
+                },
+            },
+            "links": {
+                "self": {"href": repo_url},
+                "html": {"href": html_url},
+                "avatar": {"href": f"{self.ui_url}/{self.workspace}/{self.slug}/avatar/32/"},
+                "pullrequests": {"href": f"{repo_url}/pullrequests"},
+                "commits": {"href": f"{repo_url}/commits"},
+                "forks": {"href": f"{repo_url}/forks"},
+                "watchers": {"href": f"{repo_url}/watchers"},
+                "branches": {"href": f"{repo_url}/refs/branches"},
+                "tags": {"href": f"{repo_url}/refs/tags"},
+                "downloads": {"href": f"{repo_url}/downloads"},
+                "source": {"href": f"{repo_url}/src"},
+                "hooks": {"href": f"{repo_url}/hooks"},
+                "clone": [
+                    {"name": "https", "href": f"{self.ui_url}/{self.workspace}/{self.slug}.git"},
+                    {"name": "ssh", "href": f"git@bitbucket.org:{self.workspace}/{self.slug}.git"},
+                ],
+            },
+        }
+
+    def branch_to_json(self, name, commit_hash=None):
+        commit_hash = commit_hash or self.resolve(name)
+        return {
+            "type": "branch",
+            "name": name,
+            "target": {"type": "commit", "hash": commit_hash},
+            "links": {
+                "self": {"href": f"{self.api_url}/repositories/{self.workspace}/{self.slug}/refs/branches/{name}"},
+                "commits": {"href": f"{self.api_url}/repositories/{self.workspace}/{self.slug}/commits/{name}"},
+                "html": {"href": f"{self.ui_url}/{self.workspace}/{self.slug}/branch/{name}"},
+            },
+        }
@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from git import GitCommandError, Repo
+
+try:
+    import fcntl
+except ImportError:  # Windows, mirrors are then only locked within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".tmp/git-mirrors"
+# Remote branches are kept under refs/remotes/origin, so worktrees can check them out without owning them
+FETCH_REFSPEC = "+refs/heads/*:refs/remotes/origin/*"
+# Names of the environment variables the credential helper reads
+USERNAME_VARIABLE = "BITBUCKET_GIT_USERNAME"
+PASSWORD_VARIABLE = "BITBUCKET_GIT_PASSWORD"
+# Answers `git credential fill` from the environment, so secrets never appear in URLs, arguments or config files
+CREDENTIAL_HELPER = (f"!f() {{ test \"$1\" = get && printf 'username=%s\\npassword=%s\\n' "
+                     f"\"${USERNAME_VARIABLE}\" \"${PASSWORD_VARIABLE}\"; }}; f")
+
+
+def credential_environment(username, password):
+    """
+    Environment variables making every git command of a process authenticate with the given credentials through
+    a credential helper (`GIT_CONFIG_*` needs git 2.31 or later). Helpers configured elsewhere are disabled, and
+    git fails instead of prompting when the credentials are rejected.
+
+    :return: Dictionary of environment variables.
+    """
+    return {
+        "GIT_CONFIG_COUNT": "2",
+        # An empty helper resets the list of helpers configured globally
+        "GIT_CONFIG_KEY_0": "credential.helper",
+        "GIT_CONFIG_VALUE_0": "",
+        "GIT_CONFIG_KEY_1": "credential.helper",
+        "GIT_CONFIG_VALUE_1": CREDENTIAL_HELPER,
+        "GIT_TERMINAL_PROMPT": "0",
+        USERNAME_VARIABLE: username,
+        PASSWORD_VARIABLE: password,
+    }
+
+
+class CloneStats:
+    """
+    Duration and transferred bytes of one clone manager operation.
+
+    `bytes_received` is the growth of the object store of the mirror, which is close to the size of the packs
+    received: fetched packs are stored as they are sent.
+    """
+    __slots__ = ("url", "operation", "elapsed", "bytes_received")
+
+    def __init__(self, url, operation, elapsed, bytes_received):
+        self.url = url
+        self.operation = operation
+        self.elapsed = elapsed
+        self.bytes_received = bytes_received
+
+    def __repr__(self):
+        return (f"CloneStats({self.operation} {self.url} elapsed={self.elapsed:.3f}s "
+                f"received={self.bytes_received})")
+
+
+def _redact(url):
+    """
+    The URL without credentials, safe to log and to derive cache keys from.
+    """
+    parts = urlsplit(url)
+    netloc = parts.hostname or ""
+    if parts.port:
+        netloc = f"{netloc}:{parts.port}"
+    return parts._replace(netloc=netloc).geturl()
+
+
+def _object_store_size(repo):
+    """
+    Size in bytes of the loose objects and packs of a repository.
+    """
+    total = 0
+    for directory, _, files in os.walk(os.path.join(repo.git_dir, "objects")):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+class CloneManager:
+    """
+    Keeps a persistent cache of bare mirrors and checks out per-test worktrees from them, instead of cloning a
+    repository from scratch for every test.
+
+    The first use of a repository clones the mirror, later uses only fetch what changed. Mirrors can be
+    shallow (`depth`) and blobless (`blobless`, file contents are downloaded when a worktree needs them)
+    when the tests do not need the full history. The cache is shared by the pytest-xdist workers,
+    a lock file serializes the updates of each mirror.
+
+    The cache is kept on disk, so repository URLs must not carry credentials: they are handed to git through
+    `environment`, e.g. `credential_environment(username, password)`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, depth=None, blobless=False, environment=None):
+        """
+        :param cache_dir: Directory of the mirror cache, kept between runs.
+        :param depth: Number of commits fetched per branch, the full history if None.
+        :param blobless: If True, file contents are only downloaded when a worktree checks them out.
+        :param environment: Extra environment variables of the git commands of the mirrors and worktrees,
+                            e.g. `credential_environment(username, password)`.
+        """
+        self.cache_dir = cache_dir
+        self.depth = depth
+        self.blobless = blobless
+        self.environment = dict(environment or {})
+        self.stats = []
+        self._lock = threading.Lock()
+        # Serializes the mirror updates of the threads of this process, the lock files those of other processes
+        self._update_lock = threading.RLock()
+
+    def mirror_path(self, url):
+        """
+        Cache directory of the mirror of a repository. Shallow and blobless mirrors are kept apart from full ones.
+        """
+        parts = urlsplit(url)
+        name = os.path.basename(parts.path.rstrip("/")).removesuffix(".git") or "repository"
+        key = hashlib.sha256(_redact(url).encode()).hexdigest()[:12]
+        variant = f"{'-depth' + str(self.depth) if self.depth else ''}{'-blobless' if self.blobless else ''}"
+        return os.path.join(self.cache_dir, f"{name}-{key}{variant}.git")
+
+    @contextmanager
+    def _locked(self, path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._update_lock, open(f"{path}.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _record(self, url, operation, started, repo, size_before):
+        stats = CloneStats(_redact(url), operation, time.perf_counter() - started,
+                           max(_object_store_size(repo) - size_before, 0))
+        with self._lock:
+            self.stats.append(stats)
+        logger.info(f"{operation} of {stats.url} took {stats.elapsed:.2f}s, received {stats.bytes_received} bytes")
+        return stats
+
+    def _repo(self, path):
+        repo = Repo(path)
+        repo.git.update_environment(**self.environment)
+        return repo
+
+    def _update_mirror(self, url, path):
+        started = time.perf_counter()
+        depth = {"depth": self.depth} if self.depth else {}
+        if os.path.isdir(path):
+            mirror = self._repo(path)
+            size_before = _object_store_size(mirror)
+            # Mirrors of earlier versions stored the URL with its credentials
+            mirror.git.remote("set-url", "origin", url)
+            mirror.git.fetch("origin", prune=True, **depth)
+            self._record(url, "fetch", started, mirror, size_before)
+            return mirror
+
+        options = ["--bare"] + (["--filter=blob:none"] if self.blobless else [])
+        Repo.clone_from(url, path, env=self.environment, multi_options=options, **depth)
+        mirror = self._repo(path)
+        mirror.git.config("remote.origin.fetch", FETCH_REFSPEC)
+        # A bare clone maps the remote branches onto its own, fetching again sets up refs/remotes/origin
+        mirror.git.fetch("origin", **depth)
+        self._record(url, "clone", started, mirror, 0)
+        return mirror
+
+    def mirror(self, url):
+        """
+        Clones the mirror of a repository, or fetches the latest changes into it if it is cached already.
+
+        :param url: The URL of the repository, without credentials.
+        :return: GitPython Repo of the bare mirror.
+        """
+        if url != _redact(url):
+            raise ValueError(f"{_redact(url)}: the URL carries credentials, they would be stored in the mirror "
+                             f"cache. Pass them with `credential_environment` instead.")
+        path = self.mirror_path(url)
+        with self._locked(path):
+            try:
+                return self._update_mirror(url, path)
+            except GitCommandError as e:
+                # A mirror left broken by an interrupted run is cloned again
+                logger.warning(f"Updating the mirror {path} failed, cloning it again: {e.stderr.strip()}")
+                shutil.rmtree(path, ignore_errors=True)
+                return self._update_mirror(url, path)
+
+    def worktree(self, url, path, branch="main"):
+        """
+        Checks out a branch of a repository into a new worktree of its (updated) mirror.
+
+        The worktree has a detached HEAD, so any number of worktrees can use the same branch.
+        Push commits with `repo.remotes.origin.push(f"HEAD:refs/heads/{branch}")`, the git commands of the
+        returned Repo use the environment of the manager.
+
+        :param url: The URL of the repository, without credentials.
+        :param path: Directory of the worktree, it must not exist or be empty.
+        :param branch: The branch to check out.
+        :return: GitPython Repo of the worktree.
+        """
+        mirror = self.mirror(url)
+        started = time.perf_counter()
+        with self._locked(mirror.git_dir):
+            size_before = _object_store_size(mirror)
+            # Worktrees of earlier runs whose directories are gone
+            mirror.git.worktree("prune")
+            mirror.git.worktree("add", "--detach", "--force", os.path.abspath(path), f"origin/{branch}")
+            self._record(url, "worktree", started, mirror, size_before)
+        return self._repo(path)
+
+    def remove_worktree(self, repo):
+        """
+        Removes a worktree created by `worktree`, its commits stay in the mirror.
+        """
+        mirror = Repo(repo.common_dir)
+        with self._locked(mirror.git_dir):
+            mirror.git.worktree("remove", "--force", repo.working_tree_dir)
+
+    def summary(self):
+        """
+        Totals of time and bytes received per operation, e.g. to log at the end of a session.
+        """
+        totals = {}
+        with self._lock:
+            for stats in self.stats:
+                count, elapsed, received = totals.get(stats.operation, (0, 0.0, 0))
+                totals[stats.operation] = (count + 1, elapsed + stats.elapsed, received + stats.bytes_received)
+        return "\n".join(f"{count:5d}x {operation:8s} {elapsed:8.2f}s {received:12d} bytes received"
+                         for operation, (count, elapsed, received) in sorted(totals.items()))
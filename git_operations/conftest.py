@@ -0,0 +1,24 @@
+import logging
+
+import pytest
+
+import config
+from git_operations.clone_manager import CloneManager, credential_environment
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="session")
+def clone_manager():
+    """
+    Provides the cache of repository mirrors the git tests check out worktrees from. The tests only need
+    the latest commit, so the mirrors are shallow and blobless. Time and bytes received are logged at the end.
+    Git gets the credentials from a credential helper, the cached mirrors only store URLs without them.
+    """
+    git = config.settings("git")
+    manager = CloneManager(depth=1, blobless=True,
+                           environment=credential_environment(git.username, git.app_password))
+    yield manager
+    summary = manager.summary()
+    if summary:
+        logger.info(f"Git clone manager:\n{summary}")
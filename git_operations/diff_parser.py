@@ -0,0 +1,221 @@
+import itertools
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+FILE_HEADER = re.compile(r"^diff --git (?:\"?a/(?P<old>.+?)\"?) (?:\"?b/(?P<new>.+?)\"?)$")
+HUNK_HEADER = re.compile(r"^@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? "
+                         r"\+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@")
+NO_NEWLINE_MARKER = "\\ No newline at end of file"
+# Extended header lines that describe the change itself, `index` lines are left out on purpose:
+# the length of the abbreviated hashes depends on the git version and settings of the producer
+SIGNIFICANT_HEADERS = ("new file mode", "deleted file mode", "old mode", "new mode", "rename from", "rename to",
+                       "copy from", "copy to", "Binary files", "GIT binary patch")
+
+
+class DiffFile:
+    """
+    Header of the changes of one file: paths, file mode changes, renames and whether it is binary.
+    """
+    __slots__ = ("old_path", "new_path", "headers")
+
+    def __init__(self, old_path, new_path):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.headers = []
+
+    @property
+    def path(self):
+        return self.new_path
+
+    def key(self):
+        return self.old_path, self.new_path, tuple(self.headers)
+
+    def __eq__(self, other):
+        return isinstance(other, DiffFile) and self.key() == other.key()
+
+    def __repr__(self):
+        changes = f" {'; '.join(self.headers)}" if self.headers else ""
+        return f"DiffFile(a/{self.old_path} b/{self.new_path}{changes})"
+
+
+class DiffHunk:
+    """
+    One hunk of the changes of a file: its ranges and its context, removed and added lines.
+    Only one hunk is held in memory at a time while a diff is streamed.
+    """
+    __slots__ = ("path", "index", "old_start", "old_count", "new_start", "new_count", "lines")
+
+    def __init__(self, path, index, old_start, old_count, new_start, new_count):
+        self.path = path
+        self.index = index
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.lines = []
+
+    @property
+    def header(self):
+        return f"@@ -{self.old_start},{self.old_count} +{self.new_start},{self.new_count} @@"
+
+    def key(self):
+        return self.path, self.old_start, self.old_count, self.new_start, self.new_count, tuple(self.lines)
+
+    def __eq__(self, other):
+        return isinstance(other, DiffHunk) and self.key() == other.key()
+
+    def __repr__(self):
+        return f"DiffHunk({self.path} #{self.index} {self.header}, {len(self.lines)} lines)"
+
+    def text(self):
+        return "\n".join([self.header] + self.lines)
+
+
+def iter_lines(chunks):
+    """
+    Splits a stream of byte chunks (e.g. `response.iter_content()` or the stdout of git) into decoded lines,
+    without the line endings. Only the current chunk is buffered, however large the stream is.
+    """
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        # Lines are cut out one at a time, splitting the whole chunk would hold all of its lines at once
+        while (end := pending.find(b"\n", start)) >= 0:
+            yield pending[start:end].rstrip(b"\r").decode("utf-8", errors="replace")
+            start = end + 1
+        pending = pending[start:]
+    if pending:
+        yield pending.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def iter_git_diff_lines(repo, *args):
+    """
+    Lines of `git diff <args>` of a GitPython repository, read from the running process.
+    """
+    process = repo.git.diff("--no-color", *args, as_process=True)
+    try:
+        yield from iter_lines(iter(lambda: process.stdout.read(DEFAULT_CHUNK_SIZE), b""))
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def parse_unified_diff(lines):
+    """
+    Parses a unified diff in git format, yielding a DiffFile for every file followed by its DiffHunk records.
+
+    Each record is yielded as soon as it is complete, so a diff of any size is parsed in the memory
+    of its largest hunk. Line endings, blank lines after the last hunk and `index` lines are ignored.
+
+    :param lines: Iterable of lines without line endings, e.g. from `iter_lines`.
+    """
+    diff_file = None  # Not yielded yet, its extended headers are still being read
+    path = None
+    hunk = None
+    hunk_index = old_remaining = new_remaining = 0
+    for line in lines:
+        if hunk is not None and (old_remaining > 0 or new_remaining > 0 or line == NO_NEWLINE_MARKER):
+            # Some producers strip the single space of empty context lines
+            line = line or " "
+            hunk.lines.append(line)
+            if line[0] in " -":
+                old_remaining -= 1
+            if line[0] in " +":
+                new_remaining -= 1
+            continue
+
+        if line.startswith("diff --git "):
+            if hunk is not None:
+                yield hunk
+            elif diff_file is not None:
+                yield diff_file
+            match = FILE_HEADER.match(line)
+            diff_file = DiffFile(*match.group("old", "new")) if match else DiffFile(line[11:], line[11:])
+            path = diff_file.path
+            hunk = None
+            hunk_index = 0
+        elif line.startswith("@@ ") and path is not None:
+            match = HUNK_HEADER.match(line)
+            if match is None:
+                raise ValueError(f"Invalid hunk header in diff of {path}: {line}")
+            if hunk is not None:
+                yield hunk
+            elif diff_file is not None:
+                yield diff_file
+                diff_file = None
+            hunk_index += 1
+            old_remaining = int(match["old_count"] or 1)
+            new_remaining = int(match["new_count"] or 1)
+            hunk = DiffHunk(path, hunk_index, int(match["old_start"]), old_remaining, int(match["new_start"]),
+                            new_remaining)
+        elif diff_file is not None and line.startswith(SIGNIFICANT_HEADERS):
+            diff_file.headers.append(line)
+    if hunk is not None:
+        yield hunk
+    elif diff_file is not None:
+        yield diff_file
+
+
+class DiffComparison:
+    """
+    Outcome of comparing two diffs. When they differ, `expected` and `actual` hold the first differing
+    records (either may be None when one diff ended early).
+    """
+
+    def __init__(self, files, hunks, expected=None, actual=None):
+        self.files = files
+        self.hunks = hunks
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def ok(self):
+        return self.expected is None and self.actual is None
+
+    def __bool__(self):
+        return self.ok
+
+    def describe(self):
+        if self.ok:
+            return f"Diffs are equal ({self.files} files, {self.hunks} hunks)"
+        lines = [f"Diffs differ after {self.files} files and {self.hunks} hunks:",
+                 f"expected: {self.expected!r}", f"actual:   {self.actual!r}"]
+        for name, record in (("expected", self.expected), ("actual", self.actual)):
+            if isinstance(record, DiffHunk):
+                lines += [f"--- {name} hunk ---", record.text()]
+        return "\n".join(lines)
+
+
+def compare_diffs(expected, actual):
+    """
+    Compares two diffs record by record, stopping at the first difference, so neither diff is held in memory.
+
+    :param expected: Iterable of lines (or of records from `parse_unified_diff`) of the expected diff.
+    :param actual: Iterable of lines (or records) of the actual diff.
+    :return: DiffComparison with the counts of the equal records and the first mismatching pair, if any.
+    """
+    files = hunks = 0
+    for expected_record, actual_record in itertools.zip_longest(_records(expected), _records(actual)):
+        if expected_record != actual_record:
+            logger.debug(f"Diff mismatch: expected {expected_record!r}, actual {actual_record!r}")
+            return DiffComparison(files, hunks, expected_record, actual_record)
+        if isinstance(expected_record, DiffFile):
+            files += 1
+        else:
+            hunks += 1
+    return DiffComparison(files, hunks)
+
+
+def _records(diff):
+    iterator = iter(diff)
+    first = next(iterator, None)
+    if first is None:
+        return iter(())
+    if isinstance(first, (DiffFile, DiffHunk)):
+        return itertools.chain([first], iterator)
+    return parse_unified_diff(itertools.chain([first], iterator))
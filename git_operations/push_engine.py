@@ -0,0 +1,244 @@
+import itertools
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from git_operations.clone_manager import DEFAULT_CACHE_DIR, CloneManager, _redact, credential_environment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORK_DIR = ".tmp/push-engine"
+
+
+@dataclass
+class GitJob:
+    """
+    Changes to push to one branch of a repository.
+
+    :param url: The URL of the repository, without credentials.
+    :param files: Mapping of path (in the repository) to the new content (bytes or str). A None content deletes
+                  the file. Without files the branch is only checked out, e.g. to warm the mirror cache.
+    :param message: The commit message.
+    :param branch: The branch to commit to, it must exist.
+    """
+    url: str
+    files: dict = field(default_factory=dict)
+    message: str = "Automated commit"
+    branch: str = "main"
+
+
+@dataclass
+class GitJobResult:
+    """
+    Outcome of a single job.
+
+    :param url: The URL of the repository, without credentials.
+    :param branch: The branch of the job.
+    :param ok: True if every phase succeeded.
+    :param commit_hash: Hash of the pushed commit, None if nothing was pushed.
+    :param phase: The last phase that was executed (the failing one if `ok` is False).
+    :param error: Description of the error, if any (exceptions of git are not always picklable).
+    :param timings: Duration in seconds of each phase: "checkout", "commit" and "push".
+    :param elapsed: Duration of the job in seconds, including the wait for earlier jobs of the same branch.
+    :param worker: Process id of the worker that ran the job.
+    """
+    url: str
+    branch: str
+    ok: bool = True
+    commit_hash: str = None
+    phase: str = None
+    error: str = None
+    timings: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+    worker: int = None
+
+
+class PushReport:
+    """
+    Results of a run of the engine, in the order the jobs were given.
+    """
+
+    def __init__(self, results, elapsed, max_workers):
+        self.results = results
+        self.elapsed = elapsed
+        self.max_workers = max_workers
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def throughput(self):
+        """
+        Jobs completed per second of wall-clock time.
+        """
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+    def phase_totals(self):
+        """
+        :return: Total time per phase over all jobs, e.g. to see whether checkouts or pushes dominate.
+        """
+        totals = {}
+        for result in self.results:
+            for phase, elapsed in result.timings.items():
+                totals[phase] = totals.get(phase, 0.0) + elapsed
+        return totals
+
+    def summary(self):
+        phases = ", ".join(f"{phase} {elapsed:.2f}s" for phase, elapsed in self.phase_totals().items())
+        lines = [f"{len(self.results) - len(self.failures)}/{len(self.results)} git jobs succeeded in "
+                 f"{self.elapsed:.2f}s on {self.max_workers} processes ({self.throughput:.1f} jobs/s; {phases})"]
+        lines += [f"  {result.url}@{result.branch}: failed at '{result.phase}': {result.error}"
+                  for result in self.failures]
+        return "\n".join(lines)
+
+    def raise_for_failures(self):
+        """
+        Raises an AssertionError listing every failed job, if there are any.
+        """
+        assert self.ok, self.summary()
+
+
+# State of a worker process, set up once by `_initialize_worker`
+_clone_manager = None
+_work_dir = None
+_worktree_names = itertools.count()
+
+
+def _initialize_worker(environment, cache_dir, depth, blobless, work_dir):
+    global _clone_manager, _work_dir
+    _clone_manager = CloneManager(cache_dir, depth=depth, blobless=blobless, environment=environment)
+    _work_dir = work_dir
+
+
+def _write_files(working_tree_dir, files):
+    for path, content in files.items():
+        file_path = os.path.join(working_tree_dir, path)
+        if content is None:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            continue
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(content.encode() if isinstance(content, str) else content)
+
+
+def _run_job(job, started):
+    result = GitJobResult(_redact(job.url), job.branch, worker=os.getpid())
+    path = os.path.join(_work_dir, f"worktree-{os.getpid()}-{next(_worktree_names)}")
+    repo = None
+    try:
+        result.phase = "checkout"
+        phase_started = time.perf_counter()
+        repo = _clone_manager.worktree(job.url, path, branch=job.branch)
+        result.timings["checkout"] = time.perf_counter() - phase_started
+
+        if job.files:
+            result.phase = "commit"
+            phase_started = time.perf_counter()
+            _write_files(repo.working_tree_dir, job.files)
+            repo.git.add(A=True)
+            commit = repo.index.commit(job.message)
+            result.timings["commit"] = time.perf_counter() - phase_started
+
+            result.phase = "push"
+            phase_started = time.perf_counter()
+            # The worktree shares the remote of the mirror, whose URL has no credentials
+            repo.git.push("origin", f"HEAD:refs/heads/{job.branch}")
+            result.timings["push"] = time.perf_counter() - phase_started
+            result.commit_hash = commit.hexsha
+    except Exception as e:
+        logger.error(f"Git job on {result.url}@{job.branch} failed at '{result.phase}': {e!r}")
+        result.ok = False
+        result.error = str(getattr(e, "stderr", "") or e).strip()
+    finally:
+        if repo is not None:
+            try:
+                _clone_manager.remove_worktree(repo)
+            except Exception as e:
+                logger.warning(f"Failed to remove the worktree {path}: {e!r}")
+        shutil.rmtree(path, ignore_errors=True)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def _run_jobs(jobs):
+    """
+    Runs the jobs of one branch in order, in a worker process. Pushes to the same branch are never concurrent,
+    so they are not rejected as non fast-forward.
+    """
+    started = time.perf_counter()
+    return [_run_job(job, started) for job in jobs]
+
+
+class PushEngine:
+    """
+    Checks out, commits and pushes changes to many repositories in parallel, on a pool of processes.
+
+    Every worker process checks out worktrees from the shared mirror cache of `CloneManager`, so a repository
+    is only cloned once and later jobs only fetch what changed. Credentials are handed to git through a credential
+    helper reading the environment of the workers: repository URLs stay free of secrets, and so do the remote
+    configuration, the logs and the process list. Jobs on the same branch run one after the other, in order.
+    """
+
+    def __init__(self, username=None, password=None, max_workers=None, cache_dir=DEFAULT_CACHE_DIR,
+                 work_dir=DEFAULT_WORK_DIR, depth=1, blobless=True):
+        """
+        :param username: Username of the credential helper, e.g. `config.BITBUCKET_USERNAME`. Without it (and
+                         the password), git uses the credentials configured on the machine.
+        :param password: Password of the credential helper, e.g. `config.BITBUCKET_APP_PASSWORD`.
+        :raises ValueError: If only one of the username and the password is given.
+        :param max_workers: Maximum number of worker processes, the number of CPUs if None. Git operations
+                            mostly wait for the network, more workers than CPUs can pay off.
+        :param cache_dir: Directory of the mirror cache shared by the workers.
+        :param work_dir: Directory under which the worktrees of the jobs are created.
+        :param depth: Number of commits fetched per branch into the mirrors, the full history if None.
+        :param blobless: If True, file contents are only downloaded when a worktree checks them out.
+        """
+        if bool(username) != bool(password):
+            raise ValueError("The username and the password of the push engine must be given together")
+        self.environment = credential_environment(username, password) if username else {}
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.work_dir = work_dir
+        self.depth = depth
+        self.blobless = blobless
+
+    def run(self, jobs):
+        """
+        Runs the jobs on the process pool.
+
+        :param jobs: Iterable of GitJob objects.
+        :return: PushReport with the results in the order of `jobs`.
+        """
+        jobs = list(jobs)
+        groups = {}
+        for index, job in enumerate(jobs):
+            groups.setdefault((_redact(job.url), job.branch), []).append((index, job))
+        os.makedirs(self.work_dir, exist_ok=True)
+        results = [None] * len(jobs)
+        max_workers = max(1, min(self.max_workers, len(groups)))
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker,
+                                 initargs=(self.environment, self.cache_dir, self.depth, self.blobless,
+                                           self.work_dir)) as executor:
+            futures = [(group, executor.submit(_run_jobs, [job for _, job in group])) for group in groups.values()]
+            for group, future in futures:
+                for (index, _), result in zip(group, future.result()):
+                    results[index] = result
+        report = PushReport(results, time.perf_counter() - started, max_workers)
+        logger.info(report.summary())
+        return report
@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Bitbucket usually shows a pushed commit within a second, but it can take much longer under load
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_INITIAL_DELAY = 0.25
+DEFAULT_MAX_DELAY = 5.0
+# Kept below the default per-host pool size of the shared session, like the provisioning pool
+DEFAULT_MAX_WORKERS = 16
+
+
+@dataclass
+class PushExpectation:
+    """
+    Describes what a push is expected to have changed on Bitbucket.
+
+    :param repo_name: The name of the repository.
+    :param commit_hash: Hash of the pushed commit.
+    :param paths: Paths expected in the diffstat of the commit (added, removed, modified or renamed).
+    :param contents: Mapping of path to the expected file content (bytes) at the commit. The content is
+                     compared by hash, and the paths are expected in the diffstat as well.
+    """
+    repo_name: str
+    commit_hash: str
+    paths: list = field(default_factory=list)
+    contents: dict = field(default_factory=dict)
+
+
+@dataclass
+class PushVerificationResult:
+    """
+    Outcome of verifying a single push.
+
+    :param repo_name: The name of the repository.
+    :param commit_hash: Hash of the pushed commit.
+    :param ok: True if the commit, the changed paths and the contents were all found.
+    :param reason: Why the verification failed, if it did.
+    :param attempts: Number of times the commit was polled.
+    :param elapsed: Time spent on the verification in seconds.
+    :param changed_paths: Paths of the diffstat of the commit.
+    """
+    repo_name: str
+    commit_hash: str
+    ok: bool = True
+    reason: str = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    changed_paths: list = field(default_factory=list)
+
+
+class PushVerificationReport:
+    """
+    Results of verifying many pushes, in the order the pushes were given.
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.ok]
+
+    def summary(self):
+        lines = [f"{len(self.results) - len(self.failures)}/{len(self.results)} pushes verified "
+                 f"in {self.elapsed:.2f}s"]
+        lines += [f"  {result.repo_name}@{result.commit_hash[:12]}: {result.reason}" for result in self.failures]
+        return "\n".join(lines)
+
+    def raise_for_failures(self):
+        """
+        Raises an AssertionError listing every push that could not be verified, if there are any.
+        """
+        assert self.ok, self.summary()
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class PushVerifier:
+    """
+    Confirms that pushed commits arrived on Bitbucket with a few small API calls instead of downloading their diff:
+    the commit itself (`/commit/{hash}`), the paths it changed (`/diffstat/{hash}`) and, optionally, the content
+    hashes of some files.
+
+    Bitbucket is eventually consistent, so the commit is polled with jittered exponential backoff until it shows
+    up or `timeout` expires.
+    """
+
+    def __init__(self, client, timeout=DEFAULT_TIMEOUT, initial_delay=DEFAULT_INITIAL_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param client: The `Repositories` client.
+        :param timeout: Time (in seconds) a push may take to show up before its verification fails.
+        :param initial_delay: Delay (in seconds) before the second poll, doubled after every poll.
+        :param max_delay: Upper bound (in seconds) of the delay between two polls.
+        :param max_workers: Maximum number of pushes verified concurrently by `verify_many`.
+        """
+        self.client = client
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.max_workers = max_workers
+
+    def poll_delay(self, attempt):
+        """
+        Delay before the next poll after the given (one based) attempt, between half and all of the
+        exponential delay, so many verifications do not poll in lockstep.
+        """
+        delay = min(self.max_delay, self.initial_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _poll(self, fetch, deadline, result):
+        """
+        Calls `fetch` until it returns something other than None or the deadline passes.
+        """
+        while True:
+            result.attempts += 1
+            value = fetch()
+            if value is not None:
+                return value
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_delay(result.attempts), remaining))
+
+    def _diffstat(self, expectation):
+        try:
+            return [stat.path for stat in self.client.iter_diffstat(
+                expectation.repo_name, expectation.commit_hash,
+                fields="values.status,values.old.path,values.new.path", prefetch=False)]
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                # The commit is visible, but its diffstat is not computed yet
+                return None
+            raise
+
+    def verify(self, expectation):
+        """
+        Verifies a single push.
+
+        :param expectation: PushExpectation describing the push.
+        :return: PushVerificationResult, failed verifications are not raised.
+        """
+        result = PushVerificationResult(expectation.repo_name, expectation.commit_hash)
+        started = time.monotonic()
+        deadline = started + self.timeout
+        try:
+            commit = self._poll(lambda: self.client.get_commit(expectation.repo_name, expectation.commit_hash,
+                                                               fields="hash"), deadline, result)
+            if commit is None:
+                result.ok, result.reason = False, f"Commit did not show up within {self.timeout}s"
+                return result
+
+            changed_paths = self._poll(lambda: self._diffstat(expectation), deadline, result)
+            if changed_paths is None:
+                result.ok, result.reason = False, f"Diffstat did not show up within {self.timeout}s"
+                return result
+            result.changed_paths = changed_paths
+            missing = [path for path in dict.fromkeys([*expectation.paths, *expectation.contents])
+                       if path not in changed_paths]
+            if missing:
+                result.ok, result.reason = False, f"Paths not changed by the commit: {', '.join(missing)}"
+                return result
+
+            for path, expected in expectation.contents.items():
+                content = self.client.get_file(expectation.repo_name, path, expectation.commit_hash)
+                if content is None or _digest(content) != _digest(expected):
+                    result.ok, result.reason = False, f"Content of {path} differs at the commit"
+                    return result
+        except Exception as e:
+            logger.error(f"Verification of {expectation.repo_name}@{expectation.commit_hash} failed: {e!r}")
+            result.ok, result.reason = False, repr(e)
+        finally:
+            result.elapsed = time.monotonic() - started
+        return result
+
+    def verify_many(self, expectations):
+        """
+        Verifies many pushes concurrently on a bounded thread pool.
+
+        :param expectations: Iterable of PushExpectation objects.
+        :return: PushVerificationReport with the results in the order of `expectations`.
+        """
+        expectations = list(expectations)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(expectations) or 1)),
+                                thread_name_prefix="push-verification") as executor:
+            results = list(executor.map(self.verify, expectations))
+        report = PushVerificationReport(results, time.monotonic() - started)
+        logger.info(report.summary())
+        return report
@@ -0,0 +1,77 @@
+import os
+
+import allure
+import pytest
+
+from fake_bitbucket import FakeBitbucketServer
+from git_operations.clone_manager import CloneManager, credential_environment
+
+
+@pytest.fixture(scope="function")
+def fake_repository_url():
+    """
+    Serves a repository with a larger file from an in-process fake Bitbucket server.
+    """
+    with FakeBitbucketServer() as server:
+        server.add_repository("fake-workspace", "clone-repo", files={"README.md": b"initial\n",
+                                                                    "data.bin": os.urandom(64 * 1024)})
+        yield server.clone_url("fake-workspace", "clone-repo")
+
+
+@allure.epic('Git Operations')
+@allure.story('Clone manager')
+@allure.description('The mirror is cloned once, later worktrees only fetch the new commits.')
+def test_worktrees_reuse_the_mirror(fake_repository_url, tmp_path):
+    manager = CloneManager(str(tmp_path / "mirrors"))
+
+    first = manager.worktree(fake_repository_url, str(tmp_path / "first"))
+    with open(os.path.join(first.working_tree_dir, "README.md"), "w") as file:
+        file.write("changed\n")
+    first.git.add(A=True)
+    first.index.commit("Change README")
+    first.remotes.origin.push("HEAD:refs/heads/main")
+    second = manager.worktree(fake_repository_url, str(tmp_path / "second"))
+
+    with open(os.path.join(second.working_tree_dir, "README.md")) as file:
+        assert file.read() == "changed\n"
+    assert [stats.operation for stats in manager.stats] == ["clone", "worktree", "fetch", "worktree"]
+    assert manager.stats[0].bytes_received > 64 * 1024
+    assert "@" not in manager.stats[0].url
+    assert len(os.listdir(tmp_path / "mirrors")) == 2  # The mirror and its lock file
+
+    manager.remove_worktree(first)
+    assert not os.path.exists(tmp_path / "first")
+    assert "clone" in manager.summary()
+
+
+@allure.epic('Git Operations')
+@allure.story('Clone manager')
+@allure.description('Shallow, blobless mirrors download file contents only when a worktree checks them out.')
+def test_shallow_blobless_mirror(fake_repository_url, tmp_path):
+    manager = CloneManager(str(tmp_path / "mirrors"), depth=1, blobless=True)
+
+    mirror = manager.mirror(fake_repository_url)
+    worktree = manager.worktree(fake_repository_url, str(tmp_path / "worktree"))
+
+    assert mirror.git_dir.endswith("-depth1-blobless.git")
+    assert os.path.exists(os.path.join(mirror.git_dir, "shallow"))
+    assert manager.stats[0].bytes_received < 64 * 1024
+    # The large file is downloaded by the checkout of the worktree
+    assert manager.stats[-1].operation == "worktree" and manager.stats[-1].bytes_received > 64 * 1024
+    assert os.path.getsize(os.path.join(worktree.working_tree_dir, "data.bin")) == 64 * 1024
+
+
+@allure.epic('Git Operations')
+@allure.story('Clone manager')
+@allure.description('Credentials are handed to git through the environment, the mirror cache never stores them.')
+def test_credentials_stay_out_of_the_cache(fake_repository_url, tmp_path):
+    manager = CloneManager(str(tmp_path / "mirrors"), environment=credential_environment("mirror-user", "s3cret"))
+
+    worktree = manager.worktree(fake_repository_url, str(tmp_path / "worktree"))
+
+    assert worktree.git.config("credential.helper", get_all=True).splitlines()[-1].startswith("!f()")
+    with open(os.path.join(manager.mirror(fake_repository_url).git_dir, "config")) as file:
+        assert "s3cret" not in file.read()
+    secret_url = fake_repository_url.replace("://", "://mirror-user:s3cret@")
+    with pytest.raises(ValueError, match="credential_environment"):
+        manager.mirror(secret_url)
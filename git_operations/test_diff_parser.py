@@ -0,0 +1,142 @@
+import tracemalloc
+
+import allure
+from git import Repo
+
+from git_operations.diff_parser import DiffFile, DiffHunk, compare_diffs, iter_git_diff_lines, iter_lines, \
+    parse_unified_diff
+
+DIFF = b"""diff --git a/README.md b/README.md
+index 7898192..9a2f1b0 100644
+--- a/README.md
++++ b/README.md
+@@ -1 +1 @@
+-a
+\\ No newline at end of file
++ab
+\\ No newline at end of file
+diff --git a/logo.png b/logo.png
+new file mode 100644
+index 0000000..5e1c309
+Binary files /dev/null and b/logo.png differ
+diff --git a/src/app.py b/src/app.py
+index 3b18e51..1c0f4d2 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -1,3 +1,4 @@
+ import os
++import sys
+ 
+ def main():
+@@ -10,2 +11,2 @@ def main():
+-    return 0
++    return 1
+     # end
+"""
+
+
+def chunks(data, size=7):
+    return (data[index:index + size] for index in range(0, len(data), size))
+
+
+@allure.epic('Git Operations')
+@allure.story('Diff verification')
+@allure.description('A streamed diff is parsed into file and hunk records, whatever the chunk boundaries are.')
+def test_parse_unified_diff():
+    records = list(parse_unified_diff(iter_lines(chunks(DIFF))))
+
+    assert [type(record) for record in records] == [DiffFile, DiffHunk, DiffFile, DiffFile, DiffHunk, DiffHunk]
+    assert records[2].headers == ["new file mode 100644", "Binary files /dev/null and b/logo.png differ"]
+    assert records[4].header == "@@ -1,3 +1,4 @@"
+    assert records[4].lines == [" import os", "+import sys", " ", " def main():"]
+    assert (records[5].path, records[5].index, records[5].lines) == ("src/app.py", 2,
+                                                                    ["-    return 0", "+    return 1", "     # end"])
+
+
+@allure.epic('Git Operations')
+@allure.story('Diff verification')
+@allure.description('Line endings, index lines and trailing newlines do not make diffs differ.')
+def test_equal_diffs_ignore_formatting():
+    reformatted = (DIFF.replace(b"index 3b18e51..1c0f4d2", b"index 3b18e51a..1c0f4d2b").replace(b"\n", b"\r\n")
+                   + b"\n")
+
+    comparison = compare_diffs(iter_lines([DIFF]), iter_lines(chunks(reformatted, 5)))
+
+    assert comparison.ok, comparison.describe()
+    assert (comparison.files, comparison.hunks) == (3, 3)
+
+
+@allure.epic('Git Operations')
+@allure.story('Diff verification')
+@allure.description('The comparison stops at the first mismatching hunk and reports it.')
+def test_mismatch_reports_the_hunk():
+    changed = DIFF.replace(b"+    return 1", b"+    return 2")
+    consumed = []
+
+    def tracked(lines):
+        for line in lines:
+            consumed.append(line)
+            yield line
+
+    comparison = compare_diffs(iter_lines([DIFF]), tracked(iter_lines([changed + b"diff --git a/x b/x\n" * 100])))
+
+    assert not comparison.ok
+    assert (comparison.files, comparison.hunks) == (3, 2)
+    assert comparison.actual.lines[1] == "+    return 2"
+    assert "+    return 2" in comparison.describe()
+    # Stopped right after the mismatching hunk
+    assert len(consumed) < DIFF.count(b"\n") + 3
+    missing = compare_diffs(iter_lines([DIFF]), iter_lines([DIFF.split(b"diff --git a/src")[0]]))
+    assert missing.actual is None and missing.expected.path == "src/app.py"
+
+
+def large_diff(files=100, hunks=100):
+    """
+    Generates a multi-megabyte diff one file at a time.
+    """
+    for index in range(files):
+        lines = [f"diff --git a/file{index}.txt b/file{index}.txt", "index 1111111..2222222 100644",
+                 f"--- a/file{index}.txt", f"+++ b/file{index}.txt"]
+        for hunk in range(hunks):
+            start = hunk * 20 + 1
+            lines += [f"@@ -{start},7 +{start},7 @@", f" line {start}", f" line {start + 1}", f" line {start + 2}",
+                      f"-line {start + 3}", f"+line {start + 3} changed in file {index}", f" line {start + 4}",
+                      f" line {start + 5}", f" line {start + 6}"]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+@allure.epic('Git Operations')
+@allure.story('Diff verification')
+@allure.description('Multi-megabyte diffs are compared in constant memory.')
+def test_large_diff_in_constant_memory():
+    size = sum(len(chunk) for chunk in large_diff())
+
+    tracemalloc.start()
+    comparison = compare_diffs(iter_lines(large_diff()), iter_lines(large_diff()))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert comparison.ok, comparison.describe()
+    assert (comparison.files, comparison.hunks) == (100, 10000)
+    assert size > 2 ** 20
+    assert peak < size / 4
+
+
+@allure.epic('Git Operations')
+@allure.story('Diff verification')
+@allure.description('The diff of a commit is read from a running git process.')
+def test_git_diff_lines(tmp_path):
+    repo = Repo.init(tmp_path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test").set_value("user", "email", "test@example.invalid")
+    (tmp_path / "README.md").write_bytes(b"a")
+    repo.git.add(A=True)
+    repo.index.commit("Initial")
+    (tmp_path / "README.md").write_bytes(b"ab")
+    repo.git.add(A=True)
+    commit = repo.index.commit("Change")
+
+    comparison = compare_diffs(iter_git_diff_lines(repo, f"{commit.hexsha}~1", commit.hexsha),
+                               iter_lines(chunks(DIFF.split(b"diff --git a/logo.png")[0])))
+
+    assert comparison.ok, comparison.describe()
@@ -0,0 +1,89 @@
+import os
+import subprocess
+
+import allure
+import pytest
+
+from api.repositories import Repositories
+from fake_bitbucket import FakeBitbucketServer
+from git_operations.push_engine import GitJob, PushEngine, credential_environment
+
+FAKE_AUTH = ("fake-user", "fake-app-password")
+FAKE_WORKSPACE = "fake-workspace"
+
+
+@pytest.fixture(scope="function")
+def server():
+    """
+    In-process fake Bitbucket server with eight repositories holding a README on main.
+    """
+    with FakeBitbucketServer() as server:
+        for index in range(8):
+            server.add_repository(FAKE_WORKSPACE, f"mirrored-{index}", files={"README.md": b"initial\n"})
+        yield server
+
+
+def engine_of(tmp_path, max_workers=4):
+    return PushEngine(*FAKE_AUTH, max_workers=max_workers, cache_dir=str(tmp_path / "mirrors"),
+                      work_dir=str(tmp_path / "work"))
+
+
+@allure.epic('Git Operations')
+@allure.story('Push engine')
+@allure.description('Changes are pushed to many repositories in parallel processes, with per-phase timings.')
+def test_push_to_many_repositories(server, tmp_path):
+    jobs = [GitJob(server.clone_url(FAKE_WORKSPACE, f"mirrored-{index}"),
+                   files={"README.md": f"mirrored {index}\n", f"docs/{index}.md": b"page\n"},
+                   message=f"Mirror change {index}") for index in range(8)]
+
+    report = engine_of(tmp_path).run(jobs)
+
+    report.raise_for_failures()
+    assert len(report) == 8 and report.throughput > 0
+    assert len({result.worker for result in report}) > 1
+    assert all(set(result.timings) == {"checkout", "commit", "push"} for result in report)
+    assert set(report.phase_totals()) == {"checkout", "commit", "push"}
+    client = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=server.api_url)
+    for index, result in enumerate(report):
+        assert client.get_file(f"mirrored-{index}", "README.md") == f"mirrored {index}\n".encode()
+        assert client.get_commit(f"mirrored-{index}", "main", fields="hash").hash == result.commit_hash
+    # Worktrees are removed, the mirrors are kept for the next run
+    assert os.listdir(tmp_path / "work") == []
+    assert len([name for name in os.listdir(tmp_path / "mirrors") if name.endswith(".git")]) == 8
+
+
+@allure.epic('Git Operations')
+@allure.story('Push engine')
+@allure.description('Jobs on the same branch run in order, a failing job does not stop the others.')
+def test_jobs_of_a_branch_run_in_order(server, tmp_path):
+    url = server.clone_url(FAKE_WORKSPACE, "mirrored-0")
+    jobs = [GitJob(url, files={"README.md": "first\n"}, message="First"),
+            GitJob(server.clone_url(FAKE_WORKSPACE, "mirrored-1"), files={"README.md": "x\n"}, branch="missing"),
+            GitJob(url, files={"README.md": "second\n", "notes.txt": "notes\n"}, message="Second"),
+            GitJob(url, files={"notes.txt": None}, message="Third")]
+
+    report = engine_of(tmp_path, max_workers=2).run(jobs)
+
+    assert [result.ok for result in report] == [True, False, True, True]
+    assert report.results[1].phase == "checkout" and "missing" in report.results[1].error
+    assert "failed at 'checkout'" in report.summary()
+    client = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=server.api_url)
+    assert client.get_file("mirrored-0", "README.md") == b"second\n"
+    assert client.get_file("mirrored-0", "notes.txt") is None
+    assert client.get_file("mirrored-0", "notes.txt", report.results[2].commit_hash) == b"notes\n"
+
+
+@allure.epic('Git Operations')
+@allure.story('Push engine')
+@allure.description('Git gets the credentials from the helper, they appear neither in its arguments nor in URLs.')
+def test_credential_helper():
+    environment = {**os.environ, **credential_environment("mirror-user", "s3cret")}
+
+    output = subprocess.run(["git", "credential", "fill"], input="protocol=https\nhost=bitbucket.org\n\n",
+                            env=environment, capture_output=True, text=True, check=True).stdout
+
+    assert "username=mirror-user" in output.splitlines()
+    assert "password=s3cret" in output.splitlines()
+    assert "s3cret" not in environment["GIT_CONFIG_VALUE_1"]
+    with pytest.raises(ValueError):
+        PushEngine("mirror-user", None)
@@ -0,0 +1,95 @@
+import allure
+import pytest
+
+from api.repositories import Repositories
+from fake_bitbucket import FakeBitbucketServer
+from git_operations.push_verification import PushExpectation, PushVerifier
+
+FAKE_AUTH = ("fake-user", "fake-app-password")
+FAKE_WORKSPACE = "fake-workspace"
+
+
+@pytest.fixture(scope="function")
+def client():
+    """
+    API client of an in-process fake Bitbucket server with a repository holding a README on main.
+    """
+    with FakeBitbucketServer() as server:
+        repositories = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=server.api_url)
+        repositories.create_repositories("pushed-repo")
+        repositories.initialize_main_branch("pushed-repo", "Initial commit", {"README.md": ("README.md", b"a")})
+        yield repositories
+
+
+class LaggingClient:
+    """
+    Hides commits for a number of polls, like Bitbucket does right after a push.
+    """
+
+    def __init__(self, client, hidden_polls):
+        self.client = client
+        self.hidden_polls = hidden_polls
+        self.polls = 0
+
+    def get_commit(self, *args, **kwargs):
+        self.polls += 1
+        return None if self.polls <= self.hidden_polls else self.client.get_commit(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+@allure.epic('Git Operations')
+@allure.story('Push verification')
+@allure.description('Many pushes are verified concurrently from their commit, diffstat and content hashes.')
+def test_verify_many_pushes(client):
+    expectations = []
+    for index in range(30):
+        files = [(f"docs/page{index}.md", f"page {index}".encode()), ("README.md", f"readme {index}".encode())]
+        commit_hash = client.commit_files("pushed-repo", f"branch-{index}", files, f"Push {index}")[-1]
+        expectations.append(PushExpectation("pushed-repo", commit_hash, paths=[f"docs/page{index}.md"],
+                                            contents={"README.md": f"readme {index}".encode()}))
+
+    report = PushVerifier(client, max_workers=8).verify_many(expectations)
+
+    report.raise_for_failures()
+    assert len(report) == 30
+    assert sorted(report.results[3].changed_paths) == ["README.md", "docs/page3.md"]
+    assert all(result.attempts == 2 for result in report)  # One poll of the commit, one of the diffstat
+
+
+@allure.epic('Git Operations')
+@allure.story('Push verification')
+@allure.description('A commit that shows up late is polled with backoff until it is visible.')
+def test_verify_polls_until_the_commit_shows_up(client):
+    commit_hash = client.get_branch("pushed-repo", "main").target_hash
+    lagging = LaggingClient(client, hidden_polls=3)
+
+    result = PushVerifier(lagging, initial_delay=0.01).verify(PushExpectation("pushed-repo", commit_hash,
+                                                                              paths=["README.md"]))
+
+    assert result.ok, result.reason
+    assert lagging.polls == 4
+    assert result.attempts == 5
+
+
+@allure.epic('Git Operations')
+@allure.story('Push verification')
+@allure.description('Missing commits, unchanged paths and different contents fail the verification.')
+def test_verify_reports_failures(client):
+    commit_hash = client.get_branch("pushed-repo", "main").target_hash
+    verifier = PushVerifier(client, timeout=0.2, initial_delay=0.01)
+
+    report = verifier.verify_many([
+        PushExpectation("pushed-repo", "0" * 40),
+        PushExpectation("pushed-repo", commit_hash, paths=["missing.md"]),
+        PushExpectation("pushed-repo", commit_hash, contents={"README.md": b"b"}),
+    ])
+
+    assert [result.ok for result in report] == [False, False, False]
+    assert report.results[0].reason == "Commit did not show up within 0.2s"
+    assert report.results[0].attempts > 2
+    assert report.results[1].reason == "Paths not changed by the commit: missing.md"
+    assert report.results[2].reason == "Content of README.md differs at the commit"
+    with pytest.raises(AssertionError, match="0 of 3|0/3"):
+        report.raise_for_failures()
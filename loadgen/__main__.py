@@ -0,0 +1,95 @@
+"""
+Load generator driving repository, branch and commit churn through the `Repositories` client at a target rate,
+with an open-loop schedule. Prints per-operation latency percentiles, both from the actual and from the intended
+start of each operation (the latter corrected for coordinated omission).
+
+Against the local fake Bitbucket server, no credentials or network access needed:
+
+    python -m loadgen --fake --rate 50 --duration 10 --mix create=1,branch=2,commit=6,delete=1
+
+Against Bitbucket (or a proxy, see `BITBUCKET_API_URL`), with the credentials of the API tests:
+
+    python -m loadgen --rate 2 --duration 60 --json .tmp/loadgen.json
+"""
+import argparse
+import contextlib
+import logging
+import sys
+
+import config
+from api.repositories import Repositories
+from api.resources import ResourceLeases
+from api.scheduler import RequestScheduler
+from api.session import create_session
+from fake_bitbucket import FakeBitbucketServer
+from loadgen.generator import ARRIVALS, DEFAULT_INITIAL_REPOSITORIES, DEFAULT_MAX_WORKERS, LoadGenerator, parse_mix
+
+FAKE_AUTH = ("loadgen", "loadgen")
+FAKE_WORKSPACE = "loadgen"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadgen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10.0, help="Target operations started per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duration of the run in seconds")
+    parser.add_argument("--mix", type=parse_mix, default="create=1,branch=2,commit=6,delete=1",
+                        help="Weights of the operations, e.g. create=1,branch=2,commit=6,delete=1")
+    parser.add_argument("--arrival", choices=ARRIVALS, default="uniform",
+                        help="Evenly spaced operations, or exponential gaps (bursty traffic)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Maximum number of operations running at the same time")
+    parser.add_argument("--max-outstanding", type=int, default=None,
+                        help="Operations started or queued beyond which new ones are dropped, 4 * workers by default")
+    parser.add_argument("--initial-repositories", type=int, default=DEFAULT_INITIAL_REPOSITORIES,
+                        help="Repositories created before the measurements start")
+    parser.add_argument("--file-size", type=int, default=1024, help="Size in bytes of the file of each commit")
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Retries of throttled or failed requests, 0 shows every failure")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the operation choices")
+    parser.add_argument("--fake", action="store_true", help="Run against an in-process fake Bitbucket server")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency of the fake server (seconds)")
+    parser.add_argument("--keep", action="store_true", help="Do not delete the repositories at the end")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Log every request of the client")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s:%(levelname)s: %(message)s")
+
+    with contextlib.ExitStack() as stack:
+        if args.fake:
+            server = stack.enter_context(FakeBitbucketServer(latency=args.latency))
+            auth, workspace, base_url = FAKE_AUTH, FAKE_WORKSPACE, server.api_url
+        else:
+            try:
+                settings = config.settings("api")
+            except config.ConfigurationError as e:
+                print(e, file=sys.stderr)
+                return 2
+            auth, workspace, base_url = (settings.username, settings.app_password), settings.workspace, None
+        session = stack.enter_context(create_session(pool_maxsize=max(args.workers, 1)))
+        client = Repositories(auth, workspace, session=session, base_url=base_url,
+                              scheduler=RequestScheduler(max_retries=args.retries))
+        generator = LoadGenerator(client, args.rate, args.duration, mix=args.mix, max_workers=args.workers,
+                                  max_outstanding=args.max_outstanding, arrival=args.arrival, seed=args.seed,
+                                  leases=ResourceLeases(prefix="loadgen"),
+                                  initial_repositories=args.initial_repositories, file_size=args.file_size)
+        try:
+            report = generator.run()
+        finally:
+            if not args.keep:
+                generator.cleanup()
+
+    print(report.summary())
+    if args.json:
+        with open(args.json, "w") as file:
+            file.write(report.to_json(indent=2))
+    return 0 if not report.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.provisioning import DEFAULT_MAX_WORKERS
+from api.resources import ResourceLeases
+from loadgen.histogram import HdrHistogram
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("create", "branch", "commit", "delete")
+DEFAULT_MIX = {"create": 1, "branch": 2, "commit": 6, "delete": 1}
+ARRIVALS = ("uniform", "poisson")
+# Repositories created before the clock starts, so the first branches and commits have somewhere to go
+DEFAULT_INITIAL_REPOSITORIES = 4
+DEFAULT_FILE_SIZE = 1024
+
+
+def parse_mix(value):
+    """
+    Parses an operation mix such as "create=1,branch=2,commit=6,delete=1" into a dictionary of weights.
+    Operations left out get a weight of 0.
+
+    :raises ValueError: If an operation is unknown, a weight is negative or all weights are 0.
+    """
+    mix = dict.fromkeys(OPERATIONS, 0.0)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in mix:
+            raise ValueError(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight of '{name}' must not be negative")
+    if not any(mix.values()):
+        raise ValueError(f"The mix '{value}' does not select any operation")
+    return mix
+
+
+class OperationStats:
+    """
+    Latencies (in microseconds) and errors of one operation.
+
+    `service` is measured from the moment a worker started the operation, `response` from the moment the
+    open-loop schedule intended to start it. When the target rate cannot be sustained, operations wait for a
+    worker and only `response` shows it: it is the latency corrected for coordinated omission.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.service = HdrHistogram()
+        self.response = HdrHistogram()
+        self.errors = 0
+        self.last_error = None
+
+    def snapshot(self):
+        return {
+            "count": self.service.count,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "service_us": self.service.snapshot(),
+            "response_us": self.response.snapshot(),
+        }
+
+
+class LoadReport:
+    """
+    Outcome of a load generation run.
+    """
+
+    def __init__(self, operations, rate, elapsed, scheduled, dropped):
+        self.operations = operations
+        self.rate = rate
+        self.elapsed = elapsed
+        self.scheduled = scheduled
+        self.dropped = dropped
+
+    @property
+    def completed(self):
+        return sum(stats.service.count + stats.errors for stats in self.operations.values())
+
+    @property
+    def errors(self):
+        return sum(stats.errors for stats in self.operations.values())
+
+    @property
+    def achieved_rate(self):
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def snapshot(self):
+        return {
+            "target_rate": self.rate,
+            "achieved_rate": self.achieved_rate,
+            "elapsed": self.elapsed,
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "operations": {name: stats.snapshot() for name, stats in self.operations.items()},
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def summary(self):
+        lines = [f"{self.completed}/{self.scheduled} operations in {self.elapsed:.2f}s, "
+                 f"{self.achieved_rate:.1f}/s of {self.rate:g}/s targeted, {self.errors} errors, "
+                 f"{self.dropped} dropped",
+                 f"{'operation':<10} {'count':>7} {'errors':>6}  {'latency (ms)':<9} "
+                 f"{'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9}"]
+        for name, stats in self.operations.items():
+            if not stats.service.count and not stats.errors:
+                continue
+            for label, histogram in (("service", stats.service), ("response", stats.response)):
+                values = " ".join(f"{value / 1000:9.2f}" for value in histogram.percentiles().values())
+                prefix = f"{name:<10} {stats.service.count:>7} {stats.errors:>6}" if label == "service" else " " * 25
+                lines.append(f"{prefix}  {label:<12} {values}")
+        return "\n".join(lines)
+
+
+class LoadGenerator:
+    """
+    Drives repository, branch and commit churn through `Repositories` at a target request rate.
+
+    The schedule is open loop: operations start at the times the rate dictates, whether or not the previous
+    ones completed, like independent users would. Operations waiting for a free worker are measured from their
+    intended start, so a saturated server shows up in the latencies instead of silently lowering the rate.
+    Operations that cannot even be queued (more than `max_outstanding` in flight) are counted as dropped.
+    """
+
+    def __init__(self, client, rate, duration, mix=None, max_workers=DEFAULT_MAX_WORKERS, max_outstanding=None,
+                 arrival="uniform", seed=None, leases=None, initial_repositories=DEFAULT_INITIAL_REPOSITORIES,
+                 file_size=DEFAULT_FILE_SIZE):
+        """
+        :param client: The `Repositories` client, e.g. of a local fake server.
+        :param rate: Target number of operations started per second.
+        :param duration: Duration of the run in seconds.
+        :param mix: Dictionary of operation ("create", "branch", "commit", "delete") to weight, see `parse_mix`.
+        :param max_workers: Maximum number of operations running at the same time.
+        :param max_outstanding: Maximum number of operations started or queued, 4 * max_workers if None.
+        :param arrival: "uniform" spaces operations evenly, "poisson" draws exponential gaps (bursty traffic).
+        :param seed: Seed of the operation and arrival choices, for reproducible runs.
+        :param leases: ResourceLeases naming (and finally deleting) the repositories, "loadgen-" prefixed if None.
+        :param initial_repositories: Number of repositories created before the run starts.
+        :param file_size: Size in bytes of the file of each commit.
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be positive")
+        if arrival not in ARRIVALS:
+            raise ValueError(f"Unknown arrival '{arrival}', expected one of {', '.join(ARRIVALS)}")
+        self.client = client
+        self.rate = rate
+        self.duration = duration
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.max_workers = max_workers
+        self.max_outstanding = max_outstanding or 4 * max_workers
+        self.arrival = arrival
+        self.leases = leases or ResourceLeases(prefix="loadgen")
+        self.initial_repositories = initial_repositories
+        self.file_size = file_size
+        self.operations = {name: OperationStats(name) for name in OPERATIONS}
+        self._random = random.Random(seed)
+        self._names = itertools.count(1)
+        # Live repositories and their branches, and the number of operations using each repository
+        self._repositories = {}
+        self._in_use = {}
+        self._outstanding = 0
+        self._lock = threading.Lock()
+
+    def _next_name(self, kind):
+        with self._lock:
+            return f"{kind}-{next(self._names)}"
+
+    def _acquire(self, exclusive):
+        """
+        Picks a live repository for an operation. An exclusive pick (for a deletion) is only made among unused
+        repositories and removes the repository from the live ones.
+
+        :return: Tuple of (repository name, its branches), or None if there is no suitable repository.
+        """
+        with self._lock:
+            candidates = [name for name in self._repositories if not exclusive or not self._in_use.get(name)]
+            if not candidates:
+                return None
+            name = self._random.choice(candidates)
+            if exclusive:
+                return name, self._repositories.pop(name)
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+            return name, list(self._repositories[name])
+
+    def _release(self, name, branch=None):
+        with self._lock:
+            self._in_use[name] -= 1
+            if branch is not None and name in self._repositories:
+                self._repositories[name].append(branch)
+
+    def _create(self):
+        repo_name = self.leases.repo_name(self._next_name("repo"))
+        self.client.create_repositories(repo_name)
+        self.client.initialize_main_branch(repo_name, "Initial commit", {"README.md": ("README.md", b"load")})
+        with self._lock:
+            self._repositories[repo_name] = ["main"]
+
+    def _branch(self, repo_name, branches):
+        branch = self._next_name("branch")
+        try:
+            self.client.create_branch(repo_name, branch)
+        except Exception:
+            # Commits must not target a branch that was not created
+            self._release(repo_name)
+            raise
+        self._release(repo_name, branch)
+
+    def _commit(self, repo_name, branches):
+        try:
+            with self._lock:
+                branch = self._random.choice(branches)
+            path = f"load/{self._next_name('file')}.txt"
+            content = f"{path}\n".encode().ljust(self.file_size, b".")
+            self.client.commit_files(repo_name, branch, [(path, content)], f"Load commit {path}")
+        finally:
+            self._release(repo_name)
+
+    def _delete(self, repo_name, branches):
+        if not self.client.delete_repository(repo_name):
+            raise RuntimeError(f"Repository {repo_name} was not deleted")
+        self.leases.release(repo_name)
+
+    def _prepare(self, operation):
+        """
+        Binds an operation to a repository when it is dispatched, so the mix holds even when operations queue up.
+        Operations without a suitable repository create one instead.
+
+        :return: Tuple of (operation name, callable).
+        """
+        if operation != "create":
+            picked = self._acquire(exclusive=operation == "delete")
+            if picked is not None:
+                action = {"branch": self._branch, "commit": self._commit, "delete": self._delete}[operation]
+                return operation, lambda: action(*picked)
+        return "create", self._create
+
+    def _execute(self, operation, action, intended):
+        started = time.perf_counter()
+        error = None
+        try:
+            action()
+        except Exception as e:
+            error = e
+        finished = time.perf_counter()
+        stats = self.operations[operation]
+        if error is None:
+            stats.service.record((finished - started) * 1e6)
+            stats.response.record((finished - intended) * 1e6)
+        else:
+            logger.debug(f"Operation '{operation}' failed: {error!r}")
+            with self._lock:
+                stats.errors += 1
+                stats.last_error = repr(error)
+        with self._lock:
+            self._outstanding -= 1
+
+    def _schedule(self, started):
+        """
+        Intended start times of the operations (from `time.perf_counter`), for the whole duration.
+        """
+        intended = started
+        for index in itertools.count():
+            if self.arrival == "poisson":
+                intended += self._random.expovariate(self.rate)
+            else:
+                intended = started + index / self.rate
+            if intended - started >= self.duration:
+                return
+            yield intended
+
+    def setup(self):
+        """
+        Creates the initial repositories, outside of the measurements.
+        """
+        for _ in range(self.initial_repositories):
+            self._create()
+
+    def run(self):
+        """
+        Runs the load for `duration` seconds and waits for the operations in flight.
+
+        :return: LoadReport with the per-operation latencies.
+        """
+        self.setup()
+        operations = [name for name in OPERATIONS if self.mix.get(name)]
+        weights = [self.mix[name] for name in operations]
+        scheduled = dropped = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="loadgen") as executor:
+            for intended in self._schedule(started):
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                scheduled += 1
+                with self._lock:
+                    if self._outstanding >= self.max_outstanding:
+                        dropped += 1
+                        continue
+                    self._outstanding += 1
+                    operation = self._random.choices(operations, weights)[0]
+                operation, action = self._prepare(operation)
+                executor.submit(self._execute, operation, action, intended)
+        report = LoadReport(self.operations, self.rate, time.perf_counter() - started, scheduled, dropped)
+        logger.info(report.summary())
+        return report
+
+    def cleanup(self):
+        """
+        Deletes every repository created by the run that still exists.
+        """
+        return self.leases.reap(self.client, max_workers=self.max_workers)
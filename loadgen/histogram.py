@@ -0,0 +1,128 @@
+import threading
+
+# Two significant digits: every recorded value is kept with a relative error below 1%
+DEFAULT_SIGNIFICANT_DIGITS = 2
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 100.0)
+
+
+class HdrHistogram:
+    """
+    Histogram of non-negative integer values (e.g. latencies in microseconds) in the style of HdrHistogram:
+    values are bucketed log-linearly, so any value from 1 to hours is kept with a fixed number of significant
+    digits in a few kilobytes, recording is O(1) and percentiles are exact up to that precision.
+
+    Values below `2 ** sub_bucket_bits` are counted exactly, larger ones share a bucket with the values having the
+    same `sub_bucket_bits` leading bits.
+    """
+
+    def __init__(self, significant_digits=DEFAULT_SIGNIFICANT_DIGITS):
+        """
+        :param significant_digits: Number of significant decimal digits kept, from 1 to 5.
+        """
+        if not 1 <= significant_digits <= 5:
+            raise ValueError(f"significant_digits must be between 1 and 5, got {significant_digits}")
+        self.significant_digits = significant_digits
+        # Enough linear sub-buckets per power of two for the precision, i.e. 2 * 10 ** digits
+        self.sub_bucket_bits = (2 * 10 ** significant_digits - 1).bit_length()
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.counts = [0] * self.sub_bucket_count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.sub_bucket_half + (value >> shift) - self.sub_bucket_half
+
+    def _range(self, index):
+        """
+        :return: Lowest and highest value counted by a bucket.
+        """
+        if index < self.sub_bucket_count:
+            return index, index
+        shift, offset = divmod(index - self.sub_bucket_count, self.sub_bucket_half)
+        shift += 1
+        lowest = (offset + self.sub_bucket_half) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+    def record(self, value, count=1):
+        """
+        Records a value, `count` times.
+
+        :param value: Non-negative number, rounded to an integer.
+        """
+        value = int(round(value))
+        if value < 0:
+            raise ValueError(f"Cannot record negative value {value}")
+        index = self._index(value)
+        with self._lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += count
+            self.count += count
+            self.total += value * count
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = max(self.max, value)
+
+    def merge(self, other):
+        """
+        Adds the values of another histogram with the same precision, e.g. of another worker.
+        """
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms of different precision")
+        with other._lock:
+            counts, count, total, minimum, maximum = list(other.counts), other.count, other.total, other.min, other.max
+        with self._lock:
+            if len(counts) > len(self.counts):
+                self.counts.extend([0] * (len(counts) - len(self.counts)))
+            for index, bucket_count in enumerate(counts):
+                self.counts[index] += bucket_count
+            self.count += count
+            self.total += total
+            if minimum is not None:
+                self.min = minimum if self.min is None else min(self.min, minimum)
+            self.max = max(self.max, maximum)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def value_at_percentile(self, percentile):
+        """
+        The value below or at which the given percentage of the recorded values are, within the precision of
+        the histogram. The 100th percentile is the exact maximum.
+
+        :param percentile: Percentage from 0 to 100.
+        """
+        with self._lock:
+            if not self.count:
+                return 0
+            if percentile >= 100:
+                return self.max
+            rank = max(1, -(-percentile * self.count // 100))
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return min(self._range(index)[1], self.max)
+            return self.max
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        :return: Dictionary of percentile (e.g. "p99.9") to value.
+        """
+        return {f"p{percentile:g}": self.value_at_percentile(percentile) for percentile in percentiles}
+
+    def snapshot(self, percentiles=DEFAULT_PERCENTILES):
+        return {
+            "count": self.count,
+            "min": self.min or 0,
+            "mean": self.mean,
+            "max": self.max,
+            **self.percentiles(percentiles),
+        }
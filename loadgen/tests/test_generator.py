@@ -0,0 +1,103 @@
+import json
+
+import allure
+import pytest
+
+from api.repositories import Repositories
+from api.resources import ResourceLeases
+from api.scheduler import RequestScheduler
+from fake_bitbucket import FakeBitbucketServer
+from loadgen.__main__ import main
+from loadgen.generator import LoadGenerator, parse_mix
+
+FAKE_AUTH = ("fake-user", "fake-app-password")
+FAKE_WORKSPACE = "fake-workspace"
+
+
+def client_of(server):
+    return Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=server.api_url, scheduler=RequestScheduler(max_retries=0))
+
+
+@allure.epic('Load generation')
+@allure.story('Load generator')
+@allure.description('Operation mixes are parsed into weights, invalid ones are rejected.')
+def test_parse_mix():
+    assert parse_mix("create=1, commit=6") == {"create": 1.0, "branch": 0.0, "commit": 6.0, "delete": 0.0}
+    for invalid in ("merge=1", "create=-1", "create=0"):
+        with pytest.raises(ValueError):
+            parse_mix(invalid)
+
+
+@allure.epic('Load generation')
+@allure.story('Load generator')
+@allure.description('The generator sustains the target rate with the requested mix against the fake server, '
+                    'and deletes its repositories at the end.')
+def test_mix_at_target_rate():
+    with FakeBitbucketServer() as server:
+        client = client_of(server)
+        generator = LoadGenerator(client, rate=40, duration=1.5, seed=3, leases=ResourceLeases(prefix="loadgen"))
+
+        report = generator.run()
+        generator.cleanup()
+
+        assert report.scheduled == 60 and report.dropped == 0 and report.errors == 0
+        assert report.completed == 60
+        counts = {name: stats.service.count for name, stats in report.operations.items()}
+        assert counts["commit"] > counts["branch"] > 0 and counts["create"] > 0 and counts["delete"] > 0
+        assert all(stats.response.value_at_percentile(50) >= stats.service.value_at_percentile(50)
+                   for stats in report.operations.values() if stats.service.count)
+        assert list(client.iter_repositories(query='name ~ "loadgen-"')) == []
+
+
+@allure.epic('Load generation')
+@allure.story('Load generator')
+@allure.description('A branch whose creation failed is not used by later operations.')
+def test_failed_branch_is_not_used():
+    with FakeBitbucketServer() as server:
+        generator = LoadGenerator(client_of(server), rate=1, duration=0, initial_repositories=1)
+        generator.setup()
+        repo_name, branches = generator._acquire(exclusive=False)
+
+        server.fail_next(1, status=500, method="POST", path="/refs/branches")
+        with pytest.raises(Exception):
+            generator._branch(repo_name, branches)
+        generator._branch(*generator._acquire(exclusive=False))
+        generator.cleanup()
+
+    assert generator._repositories[repo_name] == ["main", "branch-3"]
+    assert generator._in_use[repo_name] == 0
+
+
+@allure.epic('Load generation')
+@allure.story('Load generator')
+@allure.description('When the server cannot keep up, the latency from the intended start grows while the service '
+                    'time does not: the open-loop schedule does not hide the queueing (coordinated omission).')
+def test_saturation_shows_in_corrected_latency():
+    with FakeBitbucketServer(latency=0.02) as server:
+        generator = LoadGenerator(client_of(server), rate=120, duration=1, mix={"branch": 1}, max_workers=1,
+                                  max_outstanding=1000, seed=3, initial_repositories=1)
+
+        report = generator.run()
+        generator.cleanup()
+
+    branch = report.operations["branch"]
+    assert report.dropped == 0 and branch.service.count == report.scheduled
+    # One worker serves at most 50 branches/s here, so the queue grows with every operation while each
+    # operation still takes one round trip. The backlog scales with the service time, however loaded the host is.
+    assert branch.service.value_at_percentile(99) * 10 < branch.response.max
+    assert branch.response.value_at_percentile(99) > 5 * branch.service.value_at_percentile(99)
+
+
+@allure.epic('Load generation')
+@allure.story('Load generator')
+@allure.description('`python -m loadgen --fake` runs a self-test and writes the report as JSON.')
+def test_command_line_against_fake_server(tmp_path, capsys):
+    path = tmp_path / "report.json"
+
+    assert main(["--fake", "--rate", "20", "--duration", "0.5", "--arrival", "poisson", "--seed", "1",
+                 "--json", str(path)]) == 0
+
+    assert "operations in" in capsys.readouterr().out
+    report = json.loads(path.read_text())
+    assert report["errors"] == 0 and report["completed"] == report["scheduled"]
+    assert set(report["operations"]) == {"create", "branch", "commit", "delete"}
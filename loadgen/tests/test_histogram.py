@@ -0,0 +1,47 @@
+import math
+import random
+
+import allure
+import pytest
+
+from loadgen.histogram import HdrHistogram
+
+
+@allure.epic('Load generation')
+@allure.story('Latency histogram')
+@allure.description('Percentiles of values spanning several orders of magnitude are within 1% of the exact ones.')
+def test_percentiles_keep_two_significant_digits():
+    generator = random.Random(7)
+    values = [int(generator.lognormvariate(8, 2)) for _ in range(50_000)]
+    histogram = HdrHistogram()
+    for value in values:
+        histogram.record(value)
+
+    values.sort()
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[math.ceil(len(values) * percentile / 100) - 1]
+        assert histogram.value_at_percentile(percentile) == pytest.approx(exact, rel=0.01)
+    assert histogram.value_at_percentile(100) == histogram.max == values[-1]
+    assert histogram.min == values[0] and histogram.count == len(values)
+    # A few thousand buckets cover values from microseconds to hours
+    assert len(histogram.counts) < 4000
+
+
+@allure.epic('Load generation')
+@allure.story('Latency histogram')
+@allure.description('Histograms of several workers merge into one with the same percentiles.')
+def test_merge():
+    first, second, both = HdrHistogram(), HdrHistogram(), HdrHistogram()
+    for value in range(1, 10_001):
+        (first if value % 2 else second).record(value * 10)
+        both.record(value * 10)
+
+    first.merge(second)
+
+    assert first.counts == both.counts
+    assert first.percentiles() == both.percentiles()
+    assert first.mean == both.mean == 50005
+    with pytest.raises(ValueError):
+        first.merge(HdrHistogram(significant_digits=3))
+    with pytest.raises(ValueError):
+        first.record(-1)
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Scenarios mix API calls, git operations and browsers, a few steps at a time is enough to overlap them
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class Step:
+    """
+    One step of a scenario.
+
+    :param name: Unique name of the step within the scenario.
+    :param action: Callable without arguments, e.g. a `functools.partial` of a `Repositories` method, a git
+                   operation or a page object action. Its return value is available via `Scenario.result`.
+    :param requires: Names of the steps that must succeed before this one starts.
+    :param resource: Name of a resource the step uses exclusively, e.g. "admin-browser": steps sharing a
+                     resource never run at the same time (a WebDriver is not thread safe).
+    """
+    name: str
+    action: object
+    requires: tuple = ()
+    resource: str = None
+
+
+@dataclass
+class StepResult:
+    """
+    Outcome of a single step.
+
+    :param name: The name of the step.
+    :param ok: True if the action returned without raising.
+    :param skipped: True if the step did not run because a step it requires failed.
+    :param error: The exception raised by the action, if any.
+    :param reason: Why the step was skipped, if it was.
+    :param value: The return value of the action.
+    :param started: Start of the step, in seconds since the start of the scenario.
+    :param elapsed: Duration of the step in seconds.
+    """
+    name: str
+    ok: bool = True
+    skipped: bool = False
+    error: Exception = None
+    reason: str = None
+    value: object = None
+    started: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def finished(self):
+        return self.started + self.elapsed
+
+
+class ScenarioReport:
+    """
+    Per-step results of a scenario run, in the order the steps were declared, with the critical path of the run.
+    """
+
+    def __init__(self, name, steps, results, elapsed):
+        self.name = name
+        self.steps = steps
+        self.results = results
+        self.elapsed = elapsed
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, name):
+        return next(result for result in self.results if result.name == name)
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.ok and not result.skipped]
+
+    @property
+    def skipped(self):
+        return [result for result in self.results if result.skipped]
+
+    def _predecessor(self, result, executed):
+        """
+        The step whose end let the given step start: the last of its requirements, or of the earlier steps
+        on its resource, to finish.
+        """
+        step = self.steps[result.name]
+        candidates = [executed[name] for name in step.requires if name in executed]
+        if step.resource is not None:
+            candidates += [other for other in executed.values() if other.name != result.name
+                           and self.steps[other.name].resource == step.resource and other.finished <= result.started]
+        return max(candidates, key=lambda other: other.finished, default=None)
+
+    def critical_path(self):
+        """
+        The chain of steps that determined the duration of the run, traced back from the step that finished
+        last. Shortening any other step does not make the scenario faster.
+
+        :return: List of StepResult objects, first step first.
+        """
+        executed = {result.name: result for result in self.results if not result.skipped}
+        current = max(executed.values(), key=lambda result: result.finished, default=None)
+        path = []
+        while current is not None:
+            path.append(current)
+            current = self._predecessor(current, executed)
+        return path[::-1]
+
+    def summary(self):
+        path = self.critical_path()
+        on_path = {result.name for result in path}
+        succeeded = sum(result.ok for result in self.results)
+        lines = [f"Scenario '{self.name}': {succeeded}/{len(self.results)} steps succeeded in {self.elapsed:.2f}s, "
+                 f"critical path {sum(result.elapsed for result in path):.2f}s: "
+                 f"{' > '.join(result.name for result in path)}"]
+        for result in sorted(self.results, key=lambda result: (result.skipped, result.started)):
+            if result.skipped:
+                status = f" skipped: {result.reason}"
+            elif not result.ok:
+                status = f" failed: {result.error!r}"
+            else:
+                status = ""
+            marker = "*" if result.name in on_path else " "
+            lines.append(f"  {marker} [{result.started:7.3f}s +{result.elapsed:7.3f}s] {result.name}{status}")
+        return "\n".join(lines)
+
+    def raise_for_failures(self):
+        """
+        Raises an AssertionError listing every step of the run, if any step failed.
+        """
+        assert self.ok, self.summary()
+
+
+class Scenario:
+    """
+    Declares an end-to-end scenario as a graph of steps (`Repositories` calls, git operations, page object
+    actions) and runs it, starting every step as soon as the steps it requires succeeded.
+
+    Independent branches (e.g. provisioning a repository while a browser logs in) run concurrently on a thread
+    pool. Every step is timed, and the report shows the critical path, i.e. the steps worth optimizing.
+
+        scenario = Scenario("permissions")
+        scenario.step("provision", functools.partial(provision, spec))
+        scenario.step("login", functools.partial(session_store.login, driver, email, password), resource="admin")
+        scenario.step("open", page.open, requires=("provision", "login"), resource="admin")
+        scenario.run().raise_for_failures()
+    """
+
+    def __init__(self, name, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param name: Name of the scenario, used in the logs and the report.
+        :param max_workers: Maximum number of steps running at the same time.
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.steps = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def step(self, name, action=None, requires=(), resource=None):
+        """
+        Adds a step. Without `action` it returns a decorator adding the decorated function as the action.
+
+        :param name: Unique name of the step.
+        :param action: Callable without arguments.
+        :param requires: Name, or names, of the steps that must succeed first. They must be declared already.
+        :param resource: Name of a resource the step uses exclusively.
+        :return: The action.
+        """
+        if action is None:
+            return lambda function: self.step(name, function, requires, resource)
+        requires = (requires,) if isinstance(requires, str) else tuple(requires)
+        if name in self.steps:
+            raise ValueError(f"Step '{name}' is declared twice in scenario '{self.name}'")
+        unknown = [requirement for requirement in requires if requirement not in self.steps]
+        if unknown:
+            # Requirements must be declared first, so the steps cannot form a cycle
+            raise ValueError(f"Step '{name}' requires undeclared steps: {', '.join(unknown)}")
+        self.steps[name] = Step(name, action, requires, resource)
+        return action
+
+    def result(self, name):
+        """
+        The return value of a step that succeeded, e.g. for the action of a step requiring it.
+
+        :raises KeyError: If the step did not run (yet) or failed.
+        """
+        with self._lock:
+            result = self._results.get(name)
+        if result is None or not result.ok:
+            raise KeyError(f"Step '{name}' of scenario '{self.name}' has no result")
+        return result.value
+
+    def _execute(self, step, origin):
+        result = StepResult(step.name, started=time.perf_counter() - origin)
+        try:
+            result.value = step.action()
+        except Exception as e:
+            logger.error(f"Step '{step.name}' of scenario '{self.name}' failed: {e!r}")
+            result.ok = False
+            result.error = e
+        result.elapsed = time.perf_counter() - origin - result.started
+        return result
+
+    def _ready(self, step, busy):
+        """
+        :return: True if the step can start, False if it has to wait, or a failed requirement (a StepResult).
+        """
+        requirements = [self._results.get(name) for name in step.requires]
+        if any(requirement is None for requirement in requirements):
+            return False
+        failed = next((requirement for requirement in requirements if not requirement.ok), None)
+        if failed is not None:
+            return failed
+        return step.resource is None or step.resource not in busy
+
+    def run(self):
+        """
+        Runs every step once. Failures are not raised: the steps requiring a failed step are skipped,
+        the independent ones still run.
+
+        :return: ScenarioReport with the results in the order the steps were declared.
+        """
+        with self._lock:
+            self._results = {}
+        pending = list(self.steps.values())
+        running = {}
+        busy = set()
+        origin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending) or 1)),
+                                thread_name_prefix="scenario-step") as executor:
+            while pending or running:
+                for step in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    ready = self._ready(step, busy)
+                    if ready is False:
+                        continue
+                    pending.remove(step)
+                    if isinstance(ready, StepResult):
+                        with self._lock:
+                            self._results[step.name] = StepResult(
+                                step.name, ok=False, skipped=True, reason=f"'{ready.name}' did not succeed",
+                                started=time.perf_counter() - origin)
+                        continue
+                    if step.resource is not None:
+                        busy.add(step.resource)
+                    running[executor.submit(self._execute, step, origin)] = step
+                if not running:
+                    # Only skipped steps were found, the steps requiring them are skipped by the next pass
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    busy.discard(step.resource)
+                    with self._lock:
+                        self._results[step.name] = future.result()
+        report = ScenarioReport(self.name, dict(self.steps), [self._results[name] for name in self.steps],
+                                time.perf_counter() - origin)
+        logger.info(report.summary())
+        return report
@@ -0,0 +1,144 @@
+import functools
+import threading
+import time
+
+import allure
+import pytest
+
+from api.provisioning import RepositorySpec
+from api.repositories import Repositories
+from fake_bitbucket import FakeBitbucketServer
+from scenarios.runner import Scenario
+
+FAKE_AUTH = ("fake-user", "fake-app-password")
+FAKE_WORKSPACE = "fake-workspace"
+
+
+def sleeper(seconds, value=None):
+    return lambda: time.sleep(seconds) or value
+
+
+@allure.epic('Scenarios')
+@allure.story('Scenario runner')
+@allure.description('Independent branches run concurrently and the critical path follows the slowest branch.')
+def test_independent_branches_run_concurrently():
+    scenario = Scenario("branches")
+    scenario.step("provision", sleeper(0.3, "repo"))
+    scenario.step("login", sleeper(0.2))
+    scenario.step("open", sleeper(0.1), requires=("provision", "login"))
+    scenario.step("check", lambda: scenario.result("provision").upper(), requires="open")
+
+    report = scenario.run()
+
+    report.raise_for_failures()
+    assert report.elapsed < 0.55  # 0.6s when run one step after the other
+    assert report["check"].value == "REPO"
+    assert report["login"].started < 0.05 and report["open"].started >= 0.3
+    assert [result.name for result in report.critical_path()] == ["provision", "open", "check"]
+    assert "critical path" in report.summary()
+
+
+@allure.epic('Scenarios')
+@allure.story('Scenario runner')
+@allure.description('Steps sharing a resource (e.g. a browser) never run at the same time.')
+def test_steps_sharing_a_resource_are_serialized():
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def use_browser():
+        with lock:
+            overlaps.append(len(active))
+            active.append(1)
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    scenario = Scenario("browser")
+    for index in range(4):
+        scenario.step(f"page-{index}", use_browser, resource="browser")
+    scenario.step("api", sleeper(0.05))
+
+    report = scenario.run()
+
+    report.raise_for_failures()
+    assert overlaps == [0, 0, 0, 0]
+    assert report["api"].started < 0.05
+    # Each page waited for the previous one, so they are all on the critical path
+    assert [result.name for result in report.critical_path()] == [f"page-{index}" for index in range(4)]
+
+
+@allure.epic('Scenarios')
+@allure.story('Scenario runner')
+@allure.description('A failed step skips the steps requiring it, independent steps still run.')
+def test_failure_skips_dependent_steps():
+    def fail():
+        raise AssertionError("Read only user should not have permission to create branch")
+
+    scenario = Scenario("failure")
+    scenario.step("grant", sleeper(0.01))
+    scenario.step("read_checks", fail, requires="grant")
+    scenario.step("commit", sleeper(0.01), requires="read_checks")
+    scenario.step("merge", sleeper(0.01), requires="commit")
+    scenario.step("audit", sleeper(0.01), requires="grant")
+
+    report = scenario.run()
+
+    assert not report.ok
+    assert [result.name for result in report.failures] == ["read_checks"]
+    assert [result.name for result in report.skipped] == ["commit", "merge"]
+    assert report["audit"].ok and report["commit"].reason == "'read_checks' did not succeed"
+    with pytest.raises(KeyError):
+        scenario.result("read_checks")
+    with pytest.raises(AssertionError, match="permission to create branch"):
+        report.raise_for_failures()
+
+
+@allure.epic('Scenarios')
+@allure.story('Scenario runner')
+@allure.description('Steps must be unique and may only require steps declared before them.')
+def test_invalid_steps_are_rejected():
+    scenario = Scenario("invalid")
+    scenario.step("create", sleeper(0))
+
+    with pytest.raises(ValueError, match="twice"):
+        scenario.step("create", sleeper(0))
+    with pytest.raises(ValueError, match="undeclared steps: merge"):
+        scenario.step("open", sleeper(0), requires=("create", "merge"))
+
+    @scenario.step("decorated", requires="create")
+    def decorated():
+        return 42
+
+    assert scenario.run()["decorated"].value == 42
+
+
+@allure.epic('Scenarios')
+@allure.story('Scenario runner')
+@allure.description('A repository lifecycle over the API: two repositories are prepared concurrently, '
+                    'then a pull request is opened, merged and the permission revoked.')
+def test_repository_lifecycle_over_api():
+    with FakeBitbucketServer() as server:
+        client = Repositories(FAKE_AUTH, FAKE_WORKSPACE, base_url=server.api_url)
+        scenario = Scenario("lifecycle")
+        for name in ("first", "second"):
+            scenario.step(f"provision:{name}", functools.partial(
+                client.provision_many, [RepositorySpec(name, files={"README.md": ("README.md", b"a")})]))
+            scenario.step(f"grant:{name}", functools.partial(client.set_user_permission, name, "{user}", "write"),
+                          requires=f"provision:{name}")
+            scenario.step(f"commit:{name}", functools.partial(
+                client.commit_files, name, "test", [("README.md", b"ab")], "Edit README"),
+                requires=f"provision:{name}")
+            scenario.step(f"open:{name}", functools.partial(client.create_pull_request, name, "Edit", "test"),
+                          requires=f"commit:{name}")
+            scenario.step(f"merge:{name}", lambda name=name: client.merge_pull_request(
+                name, scenario.result(f"open:{name}").id), requires=(f"open:{name}", f"grant:{name}"))
+            scenario.step(f"revoke:{name}", functools.partial(client.remove_user_permission, name, "{user}"),
+                          requires=f"merge:{name}")
+
+        report = scenario.run()
+
+        report.raise_for_failures()
+        assert client.get_file("first", "README.md", "main") == b"ab"
+        assert client.get_file("second", "README.md", "main") == b"ab"
+        assert report.critical_path()[-1].name.startswith("revoke:")
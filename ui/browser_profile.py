@@ -0,0 +1,163 @@
+import logging
+import threading
+
+from selenium import webdriver
+from selenium.common import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+PERFORMANCE_PROFILE = "performance"
+PROFILES = (DEFAULT_PROFILE, PERFORMANCE_PROFILE)
+
+# Fixed viewport of the performance profile, large enough for the desktop layout of Bitbucket
+VIEWPORT = (1920, 1080)
+
+# Third-party analytics and telemetry requests, blocked in the performance profile (CDP URL patterns).
+# None of them is needed to render Bitbucket, they only cost bandwidth, CPU and memory.
+BLOCKED_URL_PATTERNS = (
+    "*://as.atlassian.com/*",
+    "*/gasv3/*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*segment.io*",
+    "*segment.com/analytics*",
+    "*sentry.io*",
+    "*nr-data.net*",
+    "*newrelic.com*",
+    "*optimizely.com*",
+    "*amplitude.com*",
+    "*fullstory.com*",
+    "*hotjar.com*",
+)
+
+# Load time of the current document, in milliseconds since the navigation started (0 while it is still loading)
+READ_PAGE_LOAD = """
+const entry = performance.getEntriesByType("navigation")[0];
+return entry ? entry.loadEventEnd : null;
+"""
+READ_JS_HEAP = "return performance.memory ? performance.memory.usedJSHeapSize : null;"
+
+
+def browser_options(profile=DEFAULT_PROFILE):
+    """
+    Chrome options of a browser profile.
+
+    :param profile: "default" for a maximized, regular browser, or "performance" for a headless browser with a fixed
+                    viewport, no images and no extensions, which needs less CPU and memory per browser.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown browser profile {profile!r}, expected one of {', '.join(PROFILES)}")
+    options = Options()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if profile == DEFAULT_PROFILE:
+        options.add_argument("--start-maximized")
+        return options
+
+    options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={VIEWPORT[0]},{VIEWPORT[1]}")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    # Background services that are of no use to a test browser
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-component-update")
+    options.add_argument("--disable-default-apps")
+    options.add_argument("--disable-sync")
+    options.add_argument("--disable-features=Translate,OptimizationHints,MediaRouter")
+    options.add_argument("--mute-audio")
+    options.add_argument("--no-first-run")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def configure_driver(driver, profile=DEFAULT_PROFILE):
+    """
+    Applies the DevTools settings of a profile to a started browser: the performance profile blocks
+    `BLOCKED_URL_PATTERNS`. The settings survive navigation and the resets of the driver pool.
+    """
+    if profile != PERFORMANCE_PROFILE or not hasattr(driver, "execute_cdp_cmd"):
+        return driver
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+    driver.execute_cdp_cmd("Performance.enable", {})
+    return driver
+
+
+def create_driver(profile=DEFAULT_PROFILE):
+    """
+    Starts a Chrome browser with the given profile.
+    """
+    return configure_driver(webdriver.Chrome(options=browser_options(profile)), profile)
+
+
+class BrowserMetrics:
+    """
+    Page load times and memory usage of every browser, sampled after page objects open a page.
+    Used to size the number of parallel browsers per machine.
+    """
+
+    def __init__(self):
+        self._browsers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _heap_size(driver):
+        if hasattr(driver, "execute_cdp_cmd"):
+            metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            values = {metric["name"]: metric["value"] for metric in metrics}
+            if "JSHeapUsedSize" in values:
+                return values["JSHeapUsedSize"]
+        return driver.execute_script(READ_JS_HEAP)
+
+    def record_page_load(self, driver, page=None):
+        """
+        Records the load time of the current document and the JavaScript heap size of the browser.
+        Failures are logged and ignored, measuring must not fail a test.
+
+        :param driver: The WebDriver that just opened a page.
+        :param page: Name of the page object, only used for logging.
+        """
+        try:
+            load_ms = driver.execute_script(READ_PAGE_LOAD)
+            heap_size = self._heap_size(driver)
+        except WebDriverException as e:
+            logger.debug(f"Failed to read browser metrics of {page}: {e!r}")
+            return
+        with self._lock:
+            stats = self._browsers.setdefault(getattr(driver, "session_id", None) or id(driver), {
+                "pages": 0, "loads": 0, "load_total": 0.0, "load_max": 0.0, "heap_last": 0, "heap_max": 0})
+            stats["pages"] += 1
+            if load_ms:
+                load_time = load_ms / 1000
+                stats["loads"] += 1
+                stats["load_total"] += load_time
+                stats["load_max"] = max(stats["load_max"], load_time)
+            if heap_size:
+                stats["heap_last"] = heap_size
+                stats["heap_max"] = max(stats["heap_max"], heap_size)
+
+    def snapshot(self):
+        """
+        :return: Dictionary keyed by browser session id with its page count, load times (seconds)
+                 and JavaScript heap sizes (bytes).
+        """
+        with self._lock:
+            return {str(browser): {**stats, "load_mean": stats["load_total"] / max(stats["loads"], 1)}
+                    for browser, stats in self._browsers.items()}
+
+    def reset(self):
+        with self._lock:
+            self._browsers.clear()
+
+    def summary(self):
+        return "\n".join(f"{stats['pages']:5d} pages {stats['load_mean']:6.2f}s mean load "
+                         f"{stats['load_max']:6.2f}s max load {stats['heap_max'] / 2 ** 20:8.1f} MiB peak heap  "
+                         f"browser {browser}"
+                         for browser, stats in self.snapshot().items())
+
+
+# Shared by all page objects of the process
+browser_metrics = BrowserMetrics()
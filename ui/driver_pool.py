@@ -0,0 +1,168 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from selenium.common import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Number of tests a browser serves before it is replaced, which bounds leaks in long runs
+DEFAULT_MAX_USES = 25
+# Number of idle browsers kept warm, extra ones are quit when released
+DEFAULT_MAX_IDLE = 2
+
+
+class PooledDriver:
+    """
+    A browser owned by the pool together with its usage count.
+    """
+    __slots__ = ("driver", "uses")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    Pool of warm WebDriver instances shared by the tests of one process (i.e. one pytest-xdist worker).
+
+    Starting Chrome is the largest fixed cost of a UI test, so browsers are handed out again after
+    their state (cookies, storage, extra windows) is reset. A browser is replaced after `max_uses`
+    tests, or as soon as it stops responding.
+    """
+
+    def __init__(self, factory, max_uses=DEFAULT_MAX_USES, max_idle=DEFAULT_MAX_IDLE):
+        """
+        :param factory: Callable creating a new WebDriver.
+        :param max_uses: Number of leases after which a browser is quit and replaced.
+        :param max_idle: Maximum number of idle browsers kept open between tests.
+        """
+        self.factory = factory
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self._idle = []
+        self._leased = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        """
+        Hands out a clean browser, reusing an idle one when possible.
+
+        :return: The WebDriver instance, to be given back with `release`.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                pooled = PooledDriver(self.factory())
+                with self._lock:
+                    self.created += 1
+                logger.info(f"Started browser #{self.created}")
+            elif not self.is_alive(pooled.driver):
+                self._quit(pooled)
+                continue
+            else:
+                with self._lock:
+                    self.reused += 1
+            pooled.uses += 1
+            with self._lock:
+                self._leased[id(pooled.driver)] = pooled
+            return pooled.driver
+
+    def release(self, driver, broken=False):
+        """
+        Gives a browser back to the pool. Its state is reset so the next test starts from a blank page.
+
+        :param driver: A WebDriver obtained from `acquire`.
+        :param broken: If True, the browser is quit instead of being reused (e.g. after a crash).
+        """
+        with self._lock:
+            pooled = self._leased.pop(id(driver), None)
+        if pooled is None:
+            raise ValueError("Driver does not belong to this pool")
+
+        if broken or pooled.uses >= self.max_uses or not self.reset(driver):
+            self._quit(pooled)
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(pooled)
+                return
+        self._quit(pooled)
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager lending a browser for the duration of the block.
+        The browser is recycled if the block fails with a WebDriver error.
+        """
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    @staticmethod
+    def is_alive(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def reset(driver):
+        """
+        Clears cookies, storage and extra windows of a browser and navigates it to about:blank.
+
+        :return: True if the browser was reset, False if it no longer responds.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            if hasattr(driver, "execute_cdp_cmd"):
+                # Clears every origin at once, `delete_all_cookies` only covers the current one
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": "*", "storageTypes": "all"})
+            else:
+                driver.delete_all_cookies()
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            driver.get("about:blank")
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Failed to reset browser, it will be replaced: {e!r}")
+            return False
+
+    def _quit(self, pooled):
+        with self._lock:
+            self.recycled += 1
+        try:
+            pooled.driver.quit()
+        except WebDriverException as e:
+            logger.warning(f"Failed to quit browser: {e!r}")
+
+    def close(self):
+        """
+        Quits every browser of the pool, including the ones still leased.
+        """
+        with self._lock:
+            self._closed = True
+            pooled_drivers = self._idle + list(self._leased.values())
+            self._idle, self._leased = [], {}
+        for pooled in pooled_drivers:
+            self._quit(pooled)
+        logger.info(f"Driver pool closed: {self.created} browsers started, {self.reused} reuses")
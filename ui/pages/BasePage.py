@@ -1,14 +1,29 @@
 from abc import ABC, abstractmethod
 
-from selenium.common import NoSuchElementException
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as ec
+
+from ui.browser_profile import browser_metrics
+from ui.pages.waits import TimedWait
 
 
 class BasePage(ABC):
     """
     A base class that should be inherited by all page classes in the framework.
     It provides common functionality such as opening a page and waiting for it to load.
+
+    Waits poll frequently and return as soon as their condition holds, the duration of every wait
+    is recorded in `ui.pages.waits.wait_timings`. Page objects must not use fixed sleeps, see
+    `ui.pages.conditions` for conditions covering dropdowns, pickers and network/DOM activity.
     """
+    # Maximum time (in seconds) a wait may take before it fails
+    TIMEOUT = 30
+    # Delay (in seconds) between two checks of a condition, i.e. the latency added to every wait
+    POLL_FREQUENCY = 0.05
+    # Shown instead of the page when the user has no access (Bitbucket answers with a "not found" page)
+    ACCESS_DENIED = (By.XPATH, '//h1[contains(., "have access") or contains(., "can\'t find") or '
+                               'contains(., "not found") or contains(., "Not Found")]')
 
     def __init__(self, page_url, driver):
         """
@@ -19,7 +34,24 @@ class BasePage(ABC):
         """
         self.page_url = page_url
         self.driver = driver
-        self.wait = WebDriverWait(self.driver, 30, poll_frequency=0.2, ignored_exceptions=[NoSuchElementException])
+        self.wait = self.create_wait(self.TIMEOUT)
+
+    def create_wait(self, timeout):
+        """
+        Creates a timed wait for this page with the given timeout (in seconds).
+        """
+        return TimedWait(self.driver, timeout, page=type(self).__name__, poll_frequency=self.POLL_FREQUENCY,
+                         ignored_exceptions=[NoSuchElementException])
+
+    def wait_until(self, condition, timeout=None):
+        """
+        Waits until the condition returns a truthy value, which is returned.
+
+        :param condition: An expected condition, i.e. a callable taking the driver.
+        :param timeout: Optional timeout (in seconds) overriding the page default.
+        """
+        wait = self.wait if timeout is None else self.create_wait(timeout)
+        return wait.until(condition)
 
     def open(self):
         """
@@ -27,9 +59,45 @@ class BasePage(ABC):
 
         This method uses the `is_page_loaded` method to verify if the page was loaded correctly.
         If the page is not loaded correctly, an assertion error will be raised.
+        The load time and memory usage of the browser are recorded in `ui.browser_profile.browser_metrics`.
         """
         self.driver.get(self.page_url)
         assert self.is_page_loaded(), "Page is not loaded correctly"
+        browser_metrics.record_page_load(self.driver, type(self).__name__)
+
+    def wait_for_any(self, outcomes, timeout=None):
+        """
+        Races several expected outcomes and returns as soon as one of them holds, e.g. an editor versus
+        an access denied page. Negative checks do not have to wait for the full timeout this way.
+
+        :param outcomes: Mapping of outcome name to expected condition, checked in order on every poll.
+        :param timeout: Optional timeout (in seconds) overriding the page default.
+        :return: Tuple of the name of the first outcome that holds and the value its condition returned.
+        """
+        def first_outcome(driver):
+            for name, condition in outcomes.items():
+                try:
+                    value = condition(driver)
+                except (NoSuchElementException, StaleElementReferenceException):
+                    continue
+                if value:
+                    return name, value
+            return False
+
+        first_outcome.__qualname__ = f"any_outcome({', '.join(outcomes)})"
+        return self.wait_until(first_outcome, timeout)
+
+    def open_if_accessible(self, loaded_condition):
+        """
+        Navigates to the page URL and waits until either the page or an access denied page is shown.
+
+        :param loaded_condition: Expected condition that holds once the page is shown.
+        :return: True if the page is shown, False if access is denied.
+        """
+        self.driver.get(self.page_url)
+        outcome, _ = self.wait_for_any({"loaded": loaded_condition,
+                                        "denied": ec.visibility_of_element_located(self.ACCESS_DENIED)})
+        return outcome == "loaded"
 
     @abstractmethod
     def is_page_loaded(self):
@@ -5,6 +5,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import absent_when_stable, element_disabled
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ class BranchesPage(BasePage):
     and verifying branch creation permissions.
     """
     CREATE_BRANCH_BUTTON = (By.ID, 'open-create-branch-modal')
+    BRANCH_LIST = (By.XPATH, '//main//table')
 
     def __init__(self, workspace, repo_name, driver):
         """
@@ -46,8 +48,14 @@ class BranchesPage(BasePage):
         """
         Checks if the user has permission to create a branch.
 
-        This is determined by checking if the 'Create Branch' button is visible and enabled.
+        This is determined by checking if the 'Create Branch' button is visible and enabled, the check
+        returns as soon as the button is enabled, disabled or missing from the rendered branch list.
 
         :return: True if the user can create a branch, False otherwise.
         """
-        return self.wait.until(ec.visibility_of_element_located(self.CREATE_BRANCH_BUTTON)).is_enabled()
+        outcome, _ = self.wait_for_any({
+            "allowed": ec.element_to_be_clickable(self.CREATE_BRANCH_BUTTON),
+            "disabled": element_disabled(self.CREATE_BRANCH_BUTTON),
+            "missing": absent_when_stable(self.BRANCH_LIST, self.CREATE_BRANCH_BUTTON),
+        })
+        return outcome == "allowed"
@@ -1,5 +1,4 @@
 import logging
-from time import sleep
 
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
@@ -7,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import select2_results_loaded
 
 logger = logging.getLogger(__name__)
 
@@ -59,8 +59,8 @@ class RepositoryPage(BasePage):
         """
         select_project = self.wait.until(ec.element_to_be_clickable(self.PROJECT_NAME_DROPDOWN_BUTTON))
         select_project.click()
-        # TODO: figure out how to fix loading of items
-        sleep(1)
+        # The project list is loaded asynchronously after the dropdown opens
+        self.wait.until(select2_results_loaded())
 
         select_input = self.wait.until(ec.element_to_be_clickable(self.PROJECT_NAME_DROPDOWN_INPUT))
         select_input.send_keys("Untitled project")
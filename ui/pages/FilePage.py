@@ -5,6 +5,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import absent_when_stable, element_disabled
 
 logger = logging.getLogger(__name__)
 
@@ -44,13 +45,27 @@ class FilePage(BasePage):
             logger.error(e)
             return False
 
+    def is_accessible(self):
+        """
+        Opens the file page and checks if the user can see it.
+
+        :return: True if the file is shown, False if an access denied page is shown instead.
+        """
+        return self.open_if_accessible(ec.visibility_of_element_located(self.FILE_CONTENT))
+
     def can_edit(self):
         """
         Checks if the user has permission to edit the file.
+        Returns as soon as the 'Edit' button is enabled, disabled or clearly missing from the rendered file.
 
         :return: True if the 'Edit' button is enabled, False otherwise.
         """
-        return self.wait.until(ec.visibility_of_element_located(self.EDIT_BUTTON)).is_enabled()
+        outcome, _ = self.wait_for_any({
+            "editable": ec.element_to_be_clickable(self.EDIT_BUTTON),
+            "disabled": element_disabled(self.EDIT_BUTTON),
+            "missing": absent_when_stable(self.FILE_CONTENT, self.EDIT_BUTTON),
+        })
+        return outcome == "editable"
 
     def edit(self):
         """
@@ -65,10 +80,12 @@ class FilePage(BasePage):
         textarea = self.driver.find_element(By.CSS_SELECTOR, ".CodeMirror textarea")
         self.driver.execute_script("arguments[0].value = arguments[1];", textarea, 'b')
 
-    def commit(self):
+    def commit(self, branch_name="test"):
         """
         Commits the changes made to the file. This involves selecting the 'Create Pull Request' checkbox,
         filling out the branch name, and submitting the commit form.
+
+        :param branch_name: The branch the commit (and so the pull request) is made from.
         """
         self.wait.until(ec.element_to_be_clickable(self.COMMIT_BUTTON)).click()
         commit_form = self.wait.until(ec.visibility_of_element_located(self.COMMIT_FORM))
@@ -81,7 +98,7 @@ class FilePage(BasePage):
 
         branch_name_input = self.wait.until(ec.element_to_be_clickable((By.ID, "id_branch-name")))
         branch_name_input.clear()
-        branch_name_input.send_keys("test")
+        branch_name_input.send_keys(branch_name)
 
         commit_button = commit_form.find_element(By.XPATH,
                                                  "//div[@class='dialog-button-panel']//button[contains(., 'Commit')]")
@@ -55,6 +55,22 @@ class LoginPage(BasePage):
             logger.info("Pull request section was not available in give time. Login was not successful")
             return False
 
+    def has_valid_session(self):
+        """
+        Opens the Bitbucket dashboard and checks whether the browser is already authenticated.
+        Returns as soon as either the dashboard or the login form shows up.
+
+        :return: True if the dashboard is shown, False if Bitbucket redirected to the login form.
+        """
+        self.driver.get(f"{config.BITBUCKET_UI_URL}/")
+        try:
+            self.wait.until(ec.any_of(ec.visibility_of_element_located(self.PULL_REQUEST_SECTION),
+                                      ec.presence_of_element_located(self.USERNAME_FIELD)))
+        except selenium.common.exceptions.TimeoutException:
+            logger.info("Neither the dashboard nor the login form was shown in given time")
+            return False
+        return not self.driver.find_elements(*self.USERNAME_FIELD)
+
     def login(self, username, password):
         """
         Logs into Bitbucket with the provided username and password.
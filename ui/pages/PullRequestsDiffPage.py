@@ -6,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import dom_stable
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +64,8 @@ class PullRequestsDiffPage(BasePage):
         ensuring the merge is confirmed successfully.
         """
         self.wait.until(ec.visibility_of_element_located(self.MERGE_BUTTON)).click()
+        # The merge dialog re-renders while it loads the merge strategies
+        self.wait.until(dom_stable())
 
         for _ in range(100):
             try:
@@ -5,6 +5,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import element_disabled
 
 logger = logging.getLogger(__name__)
 
@@ -49,4 +50,8 @@ class PullRequestsPage(BasePage):
 
         :return: True if the user can create a pull request, False otherwise.
         """
-        return self.wait.until(ec.visibility_of_element_located(self.CREATE_PR_BUTTON)).is_enabled()
+        outcome, _ = self.wait_for_any({
+            "allowed": ec.element_to_be_clickable(self.CREATE_PR_BUTTON),
+            "disabled": element_disabled(self.CREATE_PR_BUTTON),
+        })
+        return outcome == "allowed"
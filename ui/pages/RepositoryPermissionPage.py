@@ -1,5 +1,4 @@
 import logging
-import time
 
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
@@ -7,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as ec
 
 import config
 from ui.pages.BasePage import BasePage
+from ui.pages.conditions import user_picker_option
 
 logger = logging.getLogger(__name__)
 
@@ -63,8 +63,8 @@ class RepositoryPermissionPage(BasePage):
         x = self.wait.until(ec.element_to_be_clickable(
             (By.XPATH, '//div[contains(., "Add a group or user by name")][1]/following-sibling::div//input[1]')))
         x.send_keys(user)
-        # Unfortunately there was not enough time to figure out how they custom list work to wait properly
-        time.sleep(3)
+        # ENTER selects the highlighted option, so wait until the searched user is listed
+        self.wait.until(user_picker_option(user))
         x.send_keys(Keys.ENTER)
         # Click confirm
         self.wait.until(ec.element_to_be_clickable((By.XPATH, '//button[contains(., "Confirm")][1]'))).click()
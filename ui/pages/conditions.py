@@ -0,0 +1,160 @@
+# Custom expected conditions for `BasePage.wait`, used instead of fixed sleeps. Like the ones in
+# `selenium.webdriver.support.expected_conditions`, each is a callable taking the driver.
+from selenium.common import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+# Counts in-flight fetch/XHR requests and records DOM mutations of the current document.
+# Installing it twice is a no-op, it has to be installed again after every navigation.
+INSTALL_ACTIVITY_TRACKER = """
+if (!window.__activity) {
+    const activity = window.__activity = {pending: 0, lastChange: performance.now()};
+    const touch = () => { activity.lastChange = performance.now(); };
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            activity.pending++; touch();
+            return originalFetch.apply(this, arguments).finally(() => { activity.pending--; touch(); });
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        activity.pending++; touch();
+        this.addEventListener("loadend", () => { activity.pending--; touch(); });
+        return originalSend.apply(this, arguments);
+    };
+    new MutationObserver(touch).observe(document, {childList: true, subtree: true, attributes: true,
+                                                   characterData: true});
+}
+return [window.__activity.pending, performance.now() - window.__activity.lastChange, document.readyState];
+"""
+
+
+class select2_results_loaded:
+    """
+    The results list of an open select2 dropdown finished loading and shows at least one option.
+    Optionally waits for an option containing `text`.
+    """
+
+    def __init__(self, text=None):
+        self.text = text
+
+    def __call__(self, driver):
+        if driver.find_elements(By.CSS_SELECTOR, ".select2-drop-active .select2-searching, "
+                                                 ".select2-drop-active .select2-active"):
+            return False
+        options = driver.find_elements(By.CSS_SELECTOR, ".select2-drop-active .select2-result")
+        try:
+            options = [option for option in options if option.is_displayed()
+                       and (self.text is None or self.text in option.text)]
+        except StaleElementReferenceException:
+            # The list was re-rendered while it was being read
+            return False
+        return options[0] if options else False
+
+    def __repr__(self):
+        return f"select2_results_loaded({self.text!r})"
+
+
+class user_picker_option:
+    """
+    The user picker of the permissions page (a react-select menu) shows an option containing `text`.
+    """
+    OPTIONS = (By.CSS_SELECTOR, '[role="option"], [id*="-option-"]')
+    LOADING = (By.CSS_SELECTOR, '[class*="loadingMessage"], [class*="loading-message"]')
+
+    def __init__(self, text):
+        self.text = text
+
+    def __call__(self, driver):
+        if driver.find_elements(*self.LOADING):
+            return False
+        try:
+            for option in driver.find_elements(*self.OPTIONS):
+                if option.is_displayed() and self.text in option.text:
+                    return option
+        except StaleElementReferenceException:
+            return False
+        return False
+
+    def __repr__(self):
+        return f"user_picker_option({self.text!r})"
+
+
+class network_idle:
+    """
+    The document is loaded, no fetch/XHR request is in flight and nothing changed for `quiet_period` seconds.
+
+    Requests started before the first evaluation are not tracked, so this complements (and does not replace)
+    waiting for the element that the page is expected to show.
+    """
+
+    def __init__(self, quiet_period=0.3):
+        self.quiet_period = quiet_period
+
+    def __call__(self, driver):
+        pending, idle_ms, ready_state = driver.execute_script(INSTALL_ACTIVITY_TRACKER)
+        return ready_state == "complete" and pending == 0 and idle_ms >= self.quiet_period * 1000
+
+    def __repr__(self):
+        return f"network_idle({self.quiet_period})"
+
+
+class dom_stable:
+    """
+    No DOM mutation happened for `quiet_period` seconds, e.g. a list finished re-rendering.
+    """
+
+    def __init__(self, quiet_period=0.2):
+        self.quiet_period = quiet_period
+
+    def __call__(self, driver):
+        _, idle_ms, _ = driver.execute_script(INSTALL_ACTIVITY_TRACKER)
+        return idle_ms >= self.quiet_period * 1000
+
+    def __repr__(self):
+        return f"dom_stable({self.quiet_period})"
+
+
+class element_disabled:
+    """
+    The element is visible but disabled (natively or through aria-disabled), e.g. an action the user may not take.
+    """
+
+    def __init__(self, locator):
+        self.locator = locator
+
+    def __call__(self, driver):
+        for element in driver.find_elements(*self.locator):
+            try:
+                if element.is_displayed() and (not element.is_enabled()
+                                               or element.get_attribute("aria-disabled") == "true"):
+                    return element
+            except StaleElementReferenceException:
+                return False
+        return False
+
+    def __repr__(self):
+        return f"element_disabled({self.locator!r})"
+
+
+class absent_when_stable:
+    """
+    The page shows `anchor` but not `locator`, and the DOM stopped changing for `quiet_period` seconds,
+    so the missing element is not merely rendered later.
+    """
+
+    def __init__(self, anchor, locator, quiet_period=0.3):
+        self.anchor = anchor
+        self.locator = locator
+        self.stable = dom_stable(quiet_period)
+
+    def __call__(self, driver):
+        try:
+            if not any(element.is_displayed() for element in driver.find_elements(*self.anchor)):
+                return False
+        except StaleElementReferenceException:
+            return False
+        return not driver.find_elements(*self.locator) and self.stable(driver)
+
+    def __repr__(self):
+        return f"absent_when_stable({self.anchor!r}, {self.locator!r})"
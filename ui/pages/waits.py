@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+from selenium.webdriver.support.wait import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+
+class WaitTimings:
+    """
+    Durations of the waits of all page objects, used to find the slowest ones.
+    """
+
+    def __init__(self):
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed, timed_out=False):
+        with self._lock:
+            count, total, maximum, timeouts = self._timings.get(name, (0, 0.0, 0.0, 0))
+            self._timings[name] = (count + 1, total + elapsed, max(maximum, elapsed), timeouts + timed_out)
+
+    def slowest(self, limit=10):
+        """
+        :return: List of (name, stats) tuples sorted by total time spent waiting, slowest first.
+        """
+        with self._lock:
+            timings = sorted(self._timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [(name, {"count": count, "total": total, "max": maximum, "timeouts": timeouts})
+                for name, (count, total, maximum, timeouts) in timings]
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+
+    def summary(self, limit=10):
+        return "\n".join(f"{stats['total']:8.2f}s total {stats['max']:6.2f}s max {stats['count']:5d}x "
+                         f"{stats['timeouts']:3d} timeouts  {name}" for name, stats in self.slowest(limit))
+
+
+# Shared by all page objects of the process
+wait_timings = WaitTimings()
+
+
+def describe_condition(condition):
+    """
+    Readable name of an expected condition, e.g. "visibility_of_element_located(('id', 'username'))".
+    """
+    if not hasattr(condition, "__code__") and type(condition).__repr__ is not object.__repr__:
+        # Custom conditions (see `ui.pages.conditions`) describe themselves
+        return repr(condition)
+    name = getattr(condition, "__qualname__", type(condition).__name__)
+    if "<locals>" in name:
+        # Selenium conditions are closures, their locator or text is kept in the closure cells
+        arguments = ", ".join(repr(cell.cell_contents) for cell in (condition.__closure__ or ())
+                              if _is_plain(cell.cell_contents))
+        return f"{name.split('.<locals>')[0]}({arguments})"
+    return name
+
+
+def _is_plain(value):
+    if isinstance(value, tuple):
+        return all(isinstance(item, str) for item in value)
+    return isinstance(value, (str, int, float))
+
+
+class TimedWait(WebDriverWait):
+    """
+    WebDriverWait recording how long every `until` / `until_not` call took in `wait_timings`.
+    """
+
+    def __init__(self, driver, timeout, page=None, timings=wait_timings, **kwargs):
+        super().__init__(driver, timeout, **kwargs)
+        self.page = page
+        self.timings = timings
+
+    def _timed(self, wait, method, message):
+        name = f"{self.page}: {describe_condition(method)}" if self.page else describe_condition(method)
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return wait(method, message)
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings.record(name, elapsed, timed_out)
+            logger.debug(f"Waited {elapsed:.3f}s for {name}")
+
+    def until(self, method, message=""):
+        return self._timed(super().until, method, message)
+
+    def until_not(self, method, message=""):
+        return self._timed(super().until_not, method, message)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from selenium.common import WebDriverException
+
+import config
+from ui.pages.LoginPage import LoginPage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = ".tmp/sessions"
+# Bitbucket sessions live much longer, but a short expiry keeps stale tokens from piling up
+DEFAULT_TTL = 8 * 60 * 60
+
+# Copies localStorage into a plain object, so it can be serialized
+READ_LOCAL_STORAGE = "return Object.assign({}, window.localStorage);"
+WRITE_LOCAL_STORAGE = ("for (const [key, value] of Object.entries(arguments[0])) "
+                       "{ window.localStorage.setItem(key, value); }")
+
+
+class SessionStore:
+    """
+    Caches authenticated browser sessions (cookies and local storage) on disk, one per user.
+
+    The full login flow takes several seconds, so it runs once per user per run (and across runs
+    until the saved session expires). New browsers get the saved session injected instead, and
+    only log in again when Bitbucket rejects it.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, ttl=DEFAULT_TTL, ui_url=None):
+        """
+        :param directory: Directory holding the saved sessions, it is created if needed.
+        :param ttl: Time (in seconds) a saved session is reused before logging in again.
+        :param ui_url: Bitbucket web application URL, `config.BITBUCKET_UI_URL` if None.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.ui_url = (ui_url or config.BITBUCKET_UI_URL).rstrip("/")
+        self.logins = 0
+        self.restored = 0
+
+    def _path(self, username):
+        # The file name must not reveal the user, and sessions of different Bitbucket instances must not mix
+        key = hashlib.sha256(f"{self.ui_url}|{username}".encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, username):
+        """
+        Reads the saved session of a user.
+
+        :return: The session dictionary, None if there is none or it has expired.
+        """
+        try:
+            with open(self._path(username)) as file:
+                session = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if session.get("expires_at", 0) <= time.time():
+            logger.info("Saved browser session has expired")
+            self.invalidate(username)
+            return None
+        return session
+
+    def save(self, driver, username):
+        """
+        Captures the cookies and local storage of a logged in browser and writes them to disk.
+        """
+        if hasattr(driver, "execute_cdp_cmd"):
+            # Includes the cookies of every domain (e.g. the Atlassian login domain), not only the current one
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        else:
+            cookies = driver.get_cookies()
+        now = time.time()
+        session = {
+            "saved_at": now,
+            "expires_at": now + self.ttl,
+            "origin": self.ui_url,
+            "cookies": cookies,
+            "local_storage": driver.execute_script(READ_LOCAL_STORAGE) if self._on_origin(driver) else {},
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # Written atomically and readable only by the owner, the file holds session tokens
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(session, file)
+        os.replace(temporary_path, self._path(username))
+        logger.info(f"Saved browser session with {len(cookies)} cookies")
+
+    def invalidate(self, username):
+        try:
+            os.remove(self._path(username))
+        except FileNotFoundError:
+            pass
+
+    def _on_origin(self, driver):
+        current = urlsplit(driver.current_url)
+        return f"{current.scheme}://{current.netloc}" == self.ui_url
+
+    def inject(self, driver, session):
+        """
+        Loads a saved session into a browser.
+
+        :return: True if the session was injected, False if the browser refused it.
+        """
+        try:
+            if hasattr(driver, "execute_cdp_cmd"):
+                cookies = [{name: value for name, value in cookie.items()
+                            if name in ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")}
+                           for cookie in session["cookies"]]
+                driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+                # Local storage can only be written from a page of its origin
+                driver.get(f"{self.ui_url}/robots.txt")
+            else:
+                driver.get(f"{self.ui_url}/robots.txt")
+                for cookie in session["cookies"]:
+                    if urlsplit(self.ui_url).hostname.endswith(cookie["domain"].lstrip(".")):
+                        driver.add_cookie({name: value for name, value in cookie.items() if name != "sameSite"})
+            driver.execute_script(WRITE_LOCAL_STORAGE, session.get("local_storage", {}))
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Failed to inject saved browser session: {e!r}")
+            return False
+
+    def login(self, driver, username, password):
+        """
+        Logs a browser in, reusing the saved session of the user when Bitbucket still accepts it.
+
+        :param driver: The WebDriver instance to log in.
+        :param username: The Bitbucket username (email) for login.
+        :param password: The Bitbucket password for login.
+        :return: True if the browser is logged in, False otherwise.
+        """
+        login_page = LoginPage(driver)
+        session = self.load(username)
+        if session is not None and self.inject(driver, session):
+            if login_page.has_valid_session():
+                self.restored += 1
+                logger.info("Restored saved browser session")
+                return True
+            logger.info("Saved browser session was rejected, logging in again")
+            self.invalidate(username)
+            driver.delete_all_cookies()
+
+        login_page.open()
+        if not login_page.login(username, password):
+            return False
+        self.logins += 1
+        self.save(driver, username)
+        return True
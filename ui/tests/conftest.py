@@ -1,43 +1,99 @@
+import logging
+
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
 import config
-from ui.pages.LoginPage import LoginPage
+from api.provisioning import RepositorySpec
+from api.repositories import Repositories
+from ui.browser_profile import browser_metrics, create_driver
+from ui.driver_pool import DriverPool
+from ui.pages.waits import wait_timings
+from ui.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+@pytest.fixture(scope="session", autouse=True)
+def report_wait_timings():
+    """
+        This fixture logs the slowest page object waits of the run when the session ends.
+    """
+    yield
+    summary = wait_timings.summary()
+    if summary:
+        logger.info(f"Slowest waits:\n{summary}")
+    summary = browser_metrics.summary()
+    if summary:
+        logger.info(f"Browser page loads and memory:\n{summary}")
+
+
+@pytest.fixture(scope="session")
+def driver_pool(request):
+    """
+        This fixture creates the pool of warm browsers shared by the UI tests of this process
+        (each pytest-xdist worker has its own pool). Browsers are quit at the end of the session.
+        They are started with the profile selected by `--browser-profile`.
+    """
+    profile = request.config.getoption("--browser-profile")
+    pool = DriverPool(lambda: create_driver(profile))
+    yield pool
+    pool.close()
 
-def get_default_browser_options():
-    options = Options()
-    options.add_argument("start-maximized")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--start-maximized")
-    return options
 
 @pytest.fixture(scope="function")
-def ui_fixture():
+def ui_fixture(driver_pool):
     """
-        This fixture sets up the Selenium WebDriver for the UI tests.
-        It configures the Chrome options and returns a WebDriver instance.
+        This fixture lends a Selenium WebDriver from the pool for the UI tests.
 
-        The fixture is scoped to the function, meaning it is invoked before each test
-        and cleaned up afterward.
+        The browser is reset (cookies, storage, about:blank) when the test ends and handed out
+        to the next test. A browser that crashed or stopped responding is replaced instead.
     """
-    driver = webdriver.Chrome(options=get_default_browser_options())
+    driver = driver_pool.acquire()
     yield driver
-    driver.quit()
+    driver_pool.release(driver)
+
+
+@pytest.fixture(scope="session")
+def session_store():
+    """
+        This fixture provides the store of saved login sessions, so each user goes through
+        the login form at most once per run.
+    """
+    return SessionStore()
 
 
 @pytest.fixture(scope="function")
-def login(ui_fixture):
+def login(ui_fixture, session_store):
     """
         This fixture logs into Bitbucket before each test.
 
-        It opens the Bitbucket login page, performs login with provided credentials,
-        and then yields the logged-in WebDriver for tests.
+        It restores the saved session of the admin user, or performs the login with the provided
+        credentials if there is none (or it was rejected), and then yields the logged-in WebDriver for tests.
     """
     driver = ui_fixture
-    """Logs into Bitbucket before each test."""
-    login_page = LoginPage(driver)
-    login_page.open()
-    login_page.login(config.BITBUCKET_USERNAME_EMAIL, config.BITBUCKET_PASSWORD)
+    settings = config.settings("ui")
+    assert session_store.login(driver, settings.username_email, settings.password), "Login failed"
     yield driver
+
+
+@pytest.fixture(scope="session")
+def api_repositories():
+    """
+        This fixture provides an admin API client, used to build test preconditions (repositories, files,
+        permissions, pull requests) instead of clicking through the web application.
+    """
+    return Repositories((config.BITBUCKET_USERNAME, config.BITBUCKET_APP_PASSWORD), config.BITBUCKET_WORKSPACE)
+
+
+@pytest.fixture(scope="function")
+def provision(api_repositories):
+    """
+        This fixture provides a function provisioning repositories over the API, in parallel.
+        It takes `RepositorySpec` objects (or repository names) and returns the ProvisioningReport,
+        failing the test setup if any repository could not be provisioned.
+    """
+    def provision_repositories(*specs):
+        report = api_repositories.provision_many(
+            [spec if isinstance(spec, RepositorySpec) else RepositorySpec(spec) for spec in specs])
+        report.raise_for_failures()
+        return report
+    return provision_repositories
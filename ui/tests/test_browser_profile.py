@@ -0,0 +1,85 @@
+import allure
+import pytest
+from selenium.common import WebDriverException
+
+from ui.browser_profile import BLOCKED_URL_PATTERNS, BrowserMetrics, browser_options, configure_driver
+
+
+class StubDriver:
+    """
+    Answers the DevTools commands and scripts used by the browser profile, without starting a browser.
+    """
+
+    def __init__(self, session_id="session-1", load_ms=1500, heap_size=32 * 2 ** 20, crashed=False):
+        self.session_id = session_id
+        self.load_ms = load_ms
+        self.heap_size = heap_size
+        self.crashed = crashed
+        self.cdp_commands = []
+
+    def execute_cdp_cmd(self, command, parameters):
+        if self.crashed:
+            raise WebDriverException("chrome not reachable")
+        self.cdp_commands.append((command, parameters))
+        if command == "Performance.getMetrics":
+            return {"metrics": [{"name": "Nodes", "value": 100}, {"name": "JSHeapUsedSize", "value": self.heap_size}]}
+        return {}
+
+    def execute_script(self, script):
+        if self.crashed:
+            raise WebDriverException("chrome not reachable")
+        return self.load_ms
+
+
+@allure.epic('UI operations')
+@allure.story('Browser profiles')
+@allure.description('The performance profile runs headless with a fixed viewport and without images or extensions.')
+def test_browser_options_of_profiles():
+    default = browser_options("default").arguments
+    performance = browser_options("performance")
+
+    assert "--start-maximized" in default
+    assert "--headless=new" not in default
+    assert {"--headless=new", "--window-size=1920,1080", "--disable-extensions",
+            "--blink-settings=imagesEnabled=false"} <= set(performance.arguments)
+    assert performance.experimental_options["prefs"] == {"profile.managed_default_content_settings.images": 2}
+    with pytest.raises(ValueError):
+        browser_options("turbo")
+
+
+@allure.epic('UI operations')
+@allure.story('Browser profiles')
+@allure.description('Analytics and telemetry requests are only blocked in the performance profile.')
+def test_configure_driver_blocks_analytics():
+    default, performance = StubDriver(), StubDriver()
+
+    configure_driver(default, "default")
+    configure_driver(performance, "performance")
+
+    assert default.cdp_commands == []
+    assert ("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)}) in performance.cdp_commands
+
+
+@allure.epic('UI operations')
+@allure.story('Browser profiles')
+@allure.description('Page load times and the peak memory are aggregated per browser, failures are ignored.')
+def test_browser_metrics_per_browser():
+    metrics = BrowserMetrics()
+    first = StubDriver("first")
+
+    metrics.record_page_load(first, "FilePage")
+    first.load_ms, first.heap_size = 500, 16 * 2 ** 20
+    metrics.record_page_load(first, "FilePage")
+    metrics.record_page_load(StubDriver("second", load_ms=0), "BranchesPage")
+    metrics.record_page_load(StubDriver("crashed", crashed=True), "BranchesPage")
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {"first", "second"}
+    assert snapshot["first"]["pages"] == 2
+    assert snapshot["first"]["load_mean"] == pytest.approx(1.0)
+    assert snapshot["first"]["load_max"] == pytest.approx(1.5)
+    assert snapshot["first"]["heap_max"] == 32 * 2 ** 20
+    assert snapshot["first"]["heap_last"] == 16 * 2 ** 20
+    # The load event of the page had not fired yet
+    assert snapshot["second"]["loads"] == 0
+    assert "MiB peak heap" in metrics.summary()
@@ -0,0 +1,90 @@
+import allure
+import pytest
+from selenium.common import WebDriverException
+
+from ui.driver_pool import DriverPool
+
+
+class StubDriver:
+    """
+    Records the calls the pool makes, so the pool can be tested without starting a browser.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.crashed = False
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise WebDriverException("chrome not reachable")
+        return "about:blank"
+
+    @property
+    def window_handles(self):
+        self.current_url  # Fails like a real driver once the browser crashed
+        return ["main"]
+
+    @property
+    def switch_to(self):
+        return self
+
+    def window(self, handle):
+        self.calls.append(("window", handle))
+
+    def delete_all_cookies(self):
+        self.calls.append("delete_all_cookies")
+
+    def execute_script(self, script):
+        self.calls.append("execute_script")
+
+    def get(self, url):
+        self.calls.append(("get", url))
+
+    def quit(self):
+        self.quit_called = True
+
+
+@allure.epic('UI operations')
+@allure.story('Driver pool')
+@allure.description('Released browsers are reset and handed out again instead of starting new ones.')
+def test_pool_reuses_and_resets_browsers():
+    pool = DriverPool(StubDriver)
+
+    for _ in range(5):
+        with pool.lease() as driver:
+            pass
+
+    assert pool.created == 1
+    assert pool.reused == 4
+    assert "delete_all_cookies" in driver.calls
+    assert driver.calls[-1] == ("get", "about:blank")
+    pool.close()
+    assert driver.quit_called
+
+
+@allure.epic('UI operations')
+@allure.story('Driver pool')
+@allure.description('Browsers are replaced after max_uses leases and after a crash.')
+def test_pool_recycles_used_and_crashed_browsers():
+    pool = DriverPool(StubDriver, max_uses=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)
+    assert first.quit_called
+
+    second = pool.acquire()
+    assert second is not first
+    with pytest.raises(WebDriverException):
+        with pool.lease() as third:
+            third.crashed = True
+            third.current_url
+    assert third.quit_called
+
+    second.crashed = True
+    pool.release(second)
+    assert second.quit_called
+    assert pool.created == 3
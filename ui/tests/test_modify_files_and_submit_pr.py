@@ -1,7 +1,10 @@
+import functools
+
 import allure
 
 import config
-from api.repositories import Repositories
+from api.provisioning import RepositorySpec
+from scenarios.runner import Scenario
 from ui.pages.FilePage import FilePage
 from ui.pages.PullRequestsDiffPage import PullRequestsDiffPage
 
@@ -13,39 +16,53 @@ from ui.pages.PullRequestsDiffPage import PullRequestsDiffPage
     'This test performs the following steps: modifying a file in a repository, creating a pull request (PR), '
     'reviewing the PR diff, merging the PR, and validating that the changes have been applied successfully in the repository.'
 )
-def test_modify_files_and_submit_pr(login):
+def test_modify_files_and_submit_pr(ui_fixture, session_store, provision, resources, api_repositories):
     """
     This test simulates the process of modifying a file, creating a pull request,
     reviewing and merging the PR, and ensuring that the changes are applied to the repository.
     """
-    driver = login
-    repo_name = "ui-test-modify_files_and_submit_pr"
-    repo = Repositories((config.BITBUCKET_USERNAME, config.BITBUCKET_APP_PASSWORD), config.BITBUCKET_WORKSPACE)
-    repo.delete_repository(repo_name)
-    repo.create_repositories(repo_name)
-    repo.initialize_main_branch(repo_name, "Initial commit to create main",
-                                {'README.md': ('README.md', b'a')})
-
-    # Modify Files and Submit Pull Request
+    driver = ui_fixture
+    repo_name = resources.repo_name("ui-test-modify_files_and_submit_pr")
     file_page = FilePage(config.BITBUCKET_WORKSPACE, repo_name, "main", "README.md", driver)
-    file_page.open()
-    assert file_page.get_content() == "a"
-    file_page.edit()
-    file_page.commit()
-
-    # Create a pull request for the changes
-    pr_page = PullRequestsDiffPage(config.BITBUCKET_WORKSPACE, repo_name, 1, driver)
-    pr_page.open()
-
-    # Review and Merge Pull Request
-    (files, diff) = pr_page.get_diff()
-    expected_diff_file_list = 'Modified file\nREADME.md\n+1\n1 line added,\n-1\n1 line removed,'
-    expected_file_diff = '@@ -1 +1 @@\n1\na\n1\nab'
-
-    # Validate the file list and diff
-    assert files == expected_diff_file_list, "There is something not expected with modified files"
-    assert diff == expected_file_diff, "There is something not expected with diff in changed file"
-
-    pr_page.merge()
-    file_page.open()
-    assert file_page.get_content() == "ab"
+    # The repository is provisioned over the API while the browser logs in
+    scenario = Scenario("modify files and submit pull request")
+    scenario.step("provision", functools.partial(provision, RepositorySpec(
+        repo_name, files={'README.md': ('README.md', b'a')})))
+
+    @scenario.step("login", resource="browser")
+    def login():
+        assert session_store.login(driver, config.BITBUCKET_USERNAME_EMAIL, config.BITBUCKET_PASSWORD), "Login failed"
+
+    @scenario.step("modify_file", requires=("provision", "login"), resource="browser")
+    def modify_file():
+        # Modify Files and Submit Pull Request
+        file_page.open()
+        assert file_page.get_content() == "a"
+        file_page.edit()
+        file_page.commit("test")
+
+    @scenario.step("review", requires="modify_file", resource="browser")
+    def review():
+        # Create a pull request for the changes
+        pr_id = resources.track_pull_request(repo_name, api_repositories.find_pull_request_id(repo_name, "test"))
+        pr_page = PullRequestsDiffPage(config.BITBUCKET_WORKSPACE, repo_name, pr_id, driver)
+        pr_page.open()
+
+        # Review and Merge Pull Request
+        (files, diff) = pr_page.get_diff()
+        expected_diff_file_list = 'Modified file\nREADME.md\n+1\n1 line added,\n-1\n1 line removed,'
+        expected_file_diff = '@@ -1 +1 @@\n1\na\n1\nab'
+
+        # Validate the file list and diff
+        assert files == expected_diff_file_list, "There is something not expected with modified files"
+        assert diff == expected_file_diff, "There is something not expected with diff in changed file"
+        return pr_page
+
+    scenario.step("merge", lambda: scenario.result("review").merge(), requires="review", resource="browser")
+
+    @scenario.step("verify", requires="merge", resource="browser")
+    def verify():
+        file_page.open()
+        assert file_page.get_content() == "ab"
+
+    scenario.run().raise_for_failures()
@@ -1,16 +1,14 @@
-import allure
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import functools
 
+import allure
 import config
-from api.repositories import Repositories
+from api.provisioning import RepositorySpec
+from scenarios.runner import Scenario
 from ui.pages.BranchesPage import BranchesPage
 from ui.pages.FilePage import FilePage
-from ui.pages.LoginPage import LoginPage
 from ui.pages.PullRequestsDiffPage import PullRequestsDiffPage
 from ui.pages.PullRequestsPage import PullRequestsPage
 from ui.pages.RepositoryPermissionPage import RepositoryPermissionPage, RepositoryPermission
-from ui.tests.conftest import get_default_browser_options
 
 
 @allure.epic('UI operations')
@@ -23,76 +21,88 @@ from ui.tests.conftest import get_default_browser_options
     '3. Switching the new user’s role to write access, and verifying the user can push commits and approve/merge PRs. '
     '4. Removing the user from the repository and verifying that access is denied.'
 )
-def test_repository_role_permissions(ui_fixture):
+def test_repository_role_permissions(ui_fixture, driver_pool, session_store, provision, resources, api_repositories):
     """
     Test to validate the repository permissions by switching the user role.
     The test ensures that the user with read access cannot modify the repository,
     while the user with write access can perform modifications.
     """
     driver = ui_fixture
-    repo_name = "ui-test-permissions"
-    repo = Repositories((config.BITBUCKET_USERNAME, config.BITBUCKET_APP_PASSWORD), config.BITBUCKET_WORKSPACE)
-    repo.delete_repository(repo_name)
-    repo.create_repositories(repo_name)
-    repo.initialize_main_branch(repo_name, "Initial commit to create main",
-                                {'README.md': ('README.md', b'a')})
-
-    """Logs into Bitbucket as admin user."""
-    login_page = LoginPage(driver)
-    login_page.open()
-    login_page.login(config.BITBUCKET_USERNAME_EMAIL, config.BITBUCKET_PASSWORD)
-
-    perm_page = RepositoryPermissionPage(config.BITBUCKET_WORKSPACE, repo_name, driver)
-    perm_page.open()
-    perm_page.add_privilege(config.BITBUCKET_SECOND_USERNAME_NAME)
-    perm_page.change_privilege(config.BITBUCKET_SECOND_USERNAME_NAME, RepositoryPermission.READ)
-
-    driver2 = webdriver.Chrome(options=get_default_browser_options())
-    try:
-        login_page2 = LoginPage(driver2)
-        login_page2.open()
-        login_page2.login(config.BITBUCKET_SECOND_USERNAME_EMAIL, config.BITBUCKET_SECOND_USER_PASSWORD)
-
-        branches_page = BranchesPage(config.BITBUCKET_WORKSPACE, repo_name, driver2)
-        branches_page.open()
-        assert not branches_page.have_permission_to_create_branch(), "Read only user should not have permission to create branch"
-        file_page = FilePage(config.BITBUCKET_WORKSPACE, repo_name, "main", "README.md", driver2)
-        # Test if we can view repository
-        file_page.open()
-        assert file_page.get_content() == "a", "Read user should be able to view repository"
-        assert not file_page.can_edit(), "Read user should not be able to modify file"
-
-        pr_page = PullRequestsPage(config.BITBUCKET_WORKSPACE, repo_name, driver2)
-        pr_page.open()
-        assert not pr_page.have_permission_to_create_pull_request(), "Read only user should not have permission to create pull request"
+    repo_name = resources.repo_name("ui-test-permissions")
+    workspace = config.BITBUCKET_WORKSPACE
+    # Steps of the admin and of the second user only wait for each other where the scenario needs it,
+    # each browser runs one step at a time
+    scenario = Scenario("repository role permissions")
 
-        # Change permission to write
-        perm_page.change_privilege(config.BITBUCKET_SECOND_USERNAME_NAME, RepositoryPermission.WRITE)
+    # The repository is a precondition, set up over the API. The permissions are under test, so they are
+    # granted, changed and removed through the UI
+    scenario.step("provision", functools.partial(provision, RepositorySpec(
+        repo_name, files={'README.md': ('README.md', b'a')})))
 
-        # Try to push a commit
-        file_page = FilePage(config.BITBUCKET_WORKSPACE, repo_name, "main", "README.md", driver2)
-        file_page.open()
-        file_page.edit()
-        file_page.commit()
+    @scenario.step("admin_login", resource="admin")
+    def admin_login():
+        """Logs into Bitbucket as admin user."""
+        assert session_store.login(driver, config.BITBUCKET_USERNAME_EMAIL, config.BITBUCKET_PASSWORD)
 
-        # Try to approve and merge a PR
-        pr_page = PullRequestsDiffPage(config.BITBUCKET_WORKSPACE, repo_name, 1, driver2)
-        pr_page.open()
-        pr_page.merge()
+    # The second user gets its own warm browser from the pool
+    with driver_pool.lease() as driver2:
+        @scenario.step("user_login", resource="user")
+        def user_login():
+            assert session_store.login(driver2, config.BITBUCKET_SECOND_USERNAME_EMAIL,
+                                       config.BITBUCKET_SECOND_USER_PASSWORD)
 
-        # Remove user
-        perm_page.remove_user(config.BITBUCKET_SECOND_USERNAME_NAME)
+        perm_page = RepositoryPermissionPage(workspace, repo_name, driver)
+        scenario.step("open_permissions", perm_page.open, requires=("provision", "admin_login"), resource="admin")
 
-        # Check access
-        file_page = FilePage(config.BITBUCKET_WORKSPACE, repo_name, "main", "README.md", driver2)
-        try:
-            # TODO: this could be done better by not waiting full timeout
+        @scenario.step("grant_read", requires="open_permissions", resource="admin")
+        def grant_read():
+            perm_page.add_privilege(config.BITBUCKET_SECOND_USERNAME_NAME)
+            perm_page.change_privilege(config.BITBUCKET_SECOND_USERNAME_NAME, RepositoryPermission.READ)
+
+        @scenario.step("read_only_checks", requires=("grant_read", "user_login"), resource="user")
+        def read_only_checks():
+            branches_page = BranchesPage(workspace, repo_name, driver2)
+            branches_page.open()
+            assert not branches_page.have_permission_to_create_branch(), "Read only user should not have permission to create branch"
+            file_page = FilePage(workspace, repo_name, "main", "README.md", driver2)
+            # Test if we can view repository
             file_page.open()
-            assert False, "User should not be able to open repository page, If does not have permissions"
-        except Exception:
-            pass
+            assert file_page.get_content() == "a", "Read user should be able to view repository"
+            assert not file_page.can_edit(), "Read user should not be able to modify file"
+
+            pr_page = PullRequestsPage(workspace, repo_name, driver2)
+            pr_page.open()
+            assert not pr_page.have_permission_to_create_pull_request(), "Read only user should not have permission to create pull request"
+
+        # Change permission to write
+        scenario.step("grant_write", functools.partial(
+            perm_page.change_privilege, config.BITBUCKET_SECOND_USERNAME_NAME, RepositoryPermission.WRITE),
+            requires="read_only_checks", resource="admin")
+
+        @scenario.step("commit", requires="grant_write", resource="user")
+        def commit():
+            # Try to push a commit
+            file_page = FilePage(workspace, repo_name, "main", "README.md", driver2)
+            file_page.open()
+            file_page.edit()
+            file_page.commit("test")
+
+        @scenario.step("merge", requires="commit", resource="user")
+        def merge():
+            # Try to approve and merge a PR
+            pr_id = resources.track_pull_request(repo_name, api_repositories.find_pull_request_id(repo_name, "test"))
+            pr_page = PullRequestsDiffPage(workspace, repo_name, pr_id, driver2)
+            pr_page.open()
+            pr_page.merge()
+
+        # Remove user
+        scenario.step("remove_user", functools.partial(perm_page.remove_user, config.BITBUCKET_SECOND_USERNAME_NAME),
+                      requires="merge", resource="admin")
 
-    finally:
-        driver2.quit()
+        @scenario.step("access_denied", requires="remove_user", resource="user")
+        def access_denied():
+            # Check access
+            file_page = FilePage(workspace, repo_name, "main", "README.md", driver2)
+            assert not file_page.is_accessible(), "User should not be able to open repository page, If does not have permissions"
 
-    pass
+        scenario.run().raise_for_failures()
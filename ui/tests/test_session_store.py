@@ -0,0 +1,63 @@
+import os
+
+import allure
+
+from ui.session_store import SessionStore
+
+UI_URL = "https://bitbucket.example"
+
+
+class StubDriver:
+    """
+    Minimal stand-in for a Chrome WebDriver exposing the calls used by the session store.
+    """
+
+    def __init__(self, cookies=None, local_storage=None):
+        self.cookies = list(cookies or [])
+        self.local_storage = dict(local_storage or {})
+        self.current_url = f"{UI_URL}/dashboard"
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Network.getAllCookies":
+            return {"cookies": list(self.cookies)}
+        if command == "Network.setCookies":
+            self.cookies = params["cookies"]
+        return {}
+
+    def execute_script(self, script, *args):
+        if args:
+            self.local_storage.update(args[0])
+            return None
+        return dict(self.local_storage)
+
+    def get(self, url):
+        self.current_url = url
+
+
+@allure.epic('UI operations')
+@allure.story('Session store')
+@allure.description('A saved session is restored into a new browser until it expires.')
+def test_save_and_inject_session(tmp_path):
+    store = SessionStore(directory=tmp_path, ui_url=UI_URL)
+    cookie = {"name": "cloud.session.token", "value": "token", "domain": ".example", "path": "/",
+              "expires": 2000000000, "httpOnly": True, "secure": True, "session": False, "size": 24}
+    store.save(StubDriver([cookie], {"theme": "dark"}), "admin@example.com")
+
+    assert [name for name in os.listdir(tmp_path)] == [os.path.basename(store._path("admin@example.com"))]
+    assert store.load("second@example.com") is None
+
+    driver = StubDriver()
+    assert store.inject(driver, store.load("admin@example.com"))
+    assert driver.cookies == [{name: value for name, value in cookie.items() if name not in ("session", "size")}]
+    assert driver.local_storage == {"theme": "dark"}
+
+
+@allure.epic('UI operations')
+@allure.story('Session store')
+@allure.description('Expired sessions are discarded.')
+def test_expired_session_is_discarded(tmp_path):
+    store = SessionStore(directory=tmp_path, ttl=-1, ui_url=UI_URL)
+    store.save(StubDriver(), "admin@example.com")
+
+    assert store.load("admin@example.com") is None
+    assert os.listdir(tmp_path) == []
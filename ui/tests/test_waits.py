@@ -0,0 +1,109 @@
+import time
+
+import allure
+import pytest
+from selenium.common import TimeoutException
+from selenium.webdriver.common.by import By
+
+from ui.pages.BasePage import BasePage
+from ui.pages.conditions import absent_when_stable, dom_stable, element_disabled
+from ui.pages.waits import TimedWait, WaitTimings
+
+CONTENT = (By.ID, "content")
+BUTTON = (By.ID, "button")
+
+
+class StubDriver:
+    """
+    Reports a DOM that stops changing after a number of checks.
+    """
+
+    def __init__(self, busy_checks):
+        self.busy_checks = busy_checks
+
+    def execute_script(self, script):
+        self.busy_checks -= 1
+        return [0, 0 if self.busy_checks > 0 else 1000, "complete"]
+
+
+@allure.epic('UI operations')
+@allure.story('Event-driven waits')
+@allure.description('Waits return as soon as their condition holds and their duration is recorded.')
+def test_timed_wait_records_durations():
+    timings = WaitTimings()
+    wait = TimedWait(StubDriver(busy_checks=3), 5, page="StubPage", timings=timings, poll_frequency=0.01)
+
+    assert wait.until(dom_stable())
+    with pytest.raises(TimeoutException):
+        TimedWait(StubDriver(busy_checks=1000), 0.05, page="StubPage", timings=timings,
+                  poll_frequency=0.01).until(dom_stable())
+
+    (name, stats), = timings.slowest()
+    assert name == "StubPage: dom_stable(0.2)"
+    assert stats["count"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["max"] < 1
+
+
+class StubElement:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return self.enabled
+
+    def get_attribute(self, name):
+        return None
+
+
+class StubPageDriver:
+    """
+    Renders the given elements (locator -> list of elements) once `render_after` polls have passed.
+    """
+
+    def __init__(self, elements, render_after=2):
+        self.elements = elements
+        self.polls = 0
+        self.render_after = render_after
+
+    def find_elements(self, by, value):
+        self.polls += 1
+        return self.elements.get((by, value), []) if self.polls > self.render_after else []
+
+    def execute_script(self, script):
+        return [0, 1000, "complete"]
+
+
+class StubPage(BasePage):
+    def __init__(self, driver):
+        super().__init__("about:blank", driver)
+
+    def is_page_loaded(self):
+        return True
+
+    def can_press_button(self):
+        outcome, _ = self.wait_for_any({
+            "enabled": lambda driver: any(element.is_enabled() for element in driver.find_elements(*BUTTON)),
+            "disabled": element_disabled(BUTTON),
+            "missing": absent_when_stable(CONTENT, BUTTON),
+        })
+        return outcome
+
+
+@allure.epic('UI operations')
+@allure.story('Event-driven waits')
+@allure.description('Negative outcomes are detected without waiting for the full timeout.')
+@pytest.mark.parametrize("elements, expected", [
+    ({CONTENT: [StubElement()], BUTTON: [StubElement()]}, "enabled"),
+    ({CONTENT: [StubElement()], BUTTON: [StubElement(enabled=False)]}, "disabled"),
+    ({CONTENT: [StubElement()]}, "missing"),
+])
+def test_wait_for_any_returns_first_outcome(elements, expected):
+    page = StubPage(StubPageDriver(elements))
+
+    started = time.perf_counter()
+    assert page.can_press_button() == expected
+    assert time.perf_counter() - started < 1